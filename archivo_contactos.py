@@ -0,0 +1,100 @@
+"""
+Archivo de contactos viejos.
+
+Los contactos cerrados o vendidos hace más de un año ya no se trabajan, pero
+seguían en la tabla contacto y los recorrían todos los reportes y búsquedas.
+archivar_contactos (comando "flask archivar-contactos", pensado para correr
+como tarea programada) los mueve por lotes a contacto_archivo, con el mismo
+id (contacto usa AUTOINCREMENT, así un id archivado no se vuelve a asignar),
+en una transacción por lote. Así la tabla de contactos queda chica y el
+historial se conserva.
+
+Los contactos archivados salen de las estadísticas, de la tabla del admin, del
+libro Excel y del índice de búsqueda. La exportación CSV/columnar los incluye
+si se pide (incluir_archivo), leyendo las dos tablas con UNION ALL mediante
+fuente_contactos; la búsqueda del admin también, recorriendo el archivo.
+"""
+
+from datetime import timedelta
+import logging
+
+from sqlalchemy import delete, insert, literal, select, union_all
+from sqlalchemy.orm import aliased
+
+from models import db, Contacto, ContactoArchivo, get_argentina_time
+from cache_exportacion import incrementar_version, incrementar_version_mes
+from estadisticas import aplicar_cambios, restar_contactos
+
+# Estados de los contactos que se archivan y antigüedad mínima (según created_at)
+ESTADOS_ARCHIVABLES = ('cerrado', 'vendido')
+DIAS_PARA_ARCHIVAR = 365
+TAMANO_LOTE_ARCHIVO = 1000
+
+# Columnas que tienen las dos tablas
+COLUMNAS = [columna.name for columna in Contacto.__table__.columns]
+
+
+def contactos_a_archivar(antes_de, limite):
+    """Ids de contactos archivables cargados antes de la fecha (usa ix_contacto_estado_created_at)"""
+    consulta = (select(Contacto.id)
+                .where(Contacto.estado.in_(ESTADOS_ARCHIVABLES), Contacto.created_at < antes_de)
+                .limit(limite))
+    return [fila[0] for fila in db.session.execute(consulta)]
+
+
+def _archivar_lote(ids):
+    connection = db.session.connection()
+    tabla, archivo = Contacto.__table__, ContactoArchivo.__table__
+    ahora = get_argentina_time()
+
+    # Los contactos salen de las estadísticas y de los bloques mensuales de la exportación
+    cambios = restar_contactos(connection, ids)
+    meses = {clave[0] for clave in cambios}
+
+    columnas = [tabla.c[nombre] for nombre in COLUMNAS]
+    connection.execute(insert(archivo).from_select(
+        COLUMNAS + ['archivado_at'],
+        select(*columnas, literal(ahora)).where(tabla.c.id.in_(ids))
+    ))
+    connection.execute(delete(tabla).where(tabla.c.id.in_(ids)))
+    aplicar_cambios(connection, cambios)
+    incrementar_version(connection)
+    incrementar_version_mes(connection, meses)
+    db.session.commit()
+
+
+def archivar_contactos(dias=DIAS_PARA_ARCHIVAR, lote=TAMANO_LOTE_ARCHIVO, ahora=None):
+    """Mueve a contacto_archivo los contactos cerrados o vendidos hace más de `dias` días.
+
+    Cada lote se confirma por separado, así la base no queda bloqueada durante
+    todo el proceso y si se interrumpe se retoma donde quedó. Devuelve la
+    cantidad de contactos archivados.
+    """
+    # created_at se guarda en hora de Argentina (get_argentina_time), no en la del servidor
+    antes_de = (ahora or get_argentina_time()) - timedelta(days=dias)
+    archivados = 0
+    while True:
+        ids = contactos_a_archivar(antes_de, lote)
+        if not ids:
+            break
+        _archivar_lote(ids)
+        archivados += len(ids)
+        logging.info(f"Contactos archivados: {archivados}")
+    return archivados
+
+
+def fuente_contactos(incluir_archivo=False):
+    """Entidad para consultar contactos: Contacto, o contacto UNION ALL contacto_archivo.
+
+    Las condiciones, columnas y orden se expresan sobre la entidad devuelta
+    (fuente.estado, fuente.created_at, ...). Las filas del archivo se leen
+    como Contacto, solo para mostrarlas o exportarlas.
+    """
+    if not incluir_archivo:
+        return Contacto
+    tabla, archivo = Contacto.__table__, ContactoArchivo.__table__
+    union = union_all(
+        select(*[tabla.c[nombre] for nombre in COLUMNAS]),
+        select(*[archivo.c[nombre] for nombre in COLUMNAS]),
+    )
+    return aliased(Contacto, union.subquery('contacto_con_archivo'))
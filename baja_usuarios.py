@@ -0,0 +1,81 @@
+"""
+Baja de usuarios con muchos contactos.
+
+Borrar un usuario con db.session.delete cargaba todos sus contactos y emitía
+un DELETE por cada uno. Ahora la relación Usuario.contactos usa
+passive_deletes: la base borra los contactos y trabajos de exportación en
+cascada (ON DELETE CASCADE, con las claves foráneas activadas en cada
+conexión por models.py) en una sola sentencia. Como esos borrados no pasan
+por el ORM, estadisticas.py elimina los grupos del usuario y marca sus meses
+como modificados antes de borrarlo.
+
+Si se indica otro usuario, los contactos (y los archivados) pasan a ese
+usuario con un solo UPDATE y sus grupos de estadísticas se suman a los del
+nuevo dueño.
+"""
+
+import logging
+
+from sqlalchemy import func, update
+
+from models import db, Usuario, Contacto, ContactoArchivo
+from cache_exportacion import incrementar_version, incrementar_version_mes
+from estadisticas import meses_del_usuario, reasignar_usuario
+
+
+class BajaInvalida(ValueError):
+    """Usuario a reasignar inexistente o igual al que se da de baja"""
+
+
+def reasignar_contactos(usuario, nuevo_usuario):
+    """Pasa todos los contactos de un usuario a otro; devuelve cuántos se movieron, sin contar los archivados"""
+    if nuevo_usuario.id == usuario.id:
+        raise BajaInvalida('Los contactos no se pueden reasignar al mismo usuario')
+    connection = db.session.connection()
+    # El email del usuario cargador aparece en las filas exportadas de esos meses
+    meses = meses_del_usuario(connection, usuario.id)
+    resultado = db.session.execute(
+        update(Contacto).where(Contacto.usuario_id == usuario.id).values(usuario_id=nuevo_usuario.id)
+    )
+    db.session.execute(
+        update(ContactoArchivo).where(ContactoArchivo.usuario_id == usuario.id).values(usuario_id=nuevo_usuario.id)
+    )
+    reasignar_usuario(connection, usuario.id, nuevo_usuario.id)
+    incrementar_version(connection)
+    incrementar_version_mes(connection, meses)
+    # Las colecciones cargadas ya no corresponden a la base
+    db.session.expire(usuario, ['contactos'])
+    db.session.expire(nuevo_usuario, ['contactos'])
+    return resultado.rowcount
+
+
+def eliminar_usuario(usuario, reasignar_a=None):
+    """Elimina un usuario y borra sus contactos, o los pasa a reasignar_a.
+
+    Devuelve la cantidad de contactos borrados o reasignados. Confirma la
+    transacción.
+    """
+    if reasignar_a is not None:
+        cantidad = reasignar_contactos(usuario, reasignar_a)
+    else:
+        cantidad = db.session.query(func.count(Contacto.id)).filter(Contacto.usuario_id == usuario.id).scalar()
+    db.session.delete(usuario)
+    db.session.commit()
+    if reasignar_a is not None:
+        logging.info(f"Usuario {usuario.email} eliminado; {cantidad} contactos reasignados a {reasignar_a.email}")
+    else:
+        logging.info(f"Usuario {usuario.email} eliminado junto con {cantidad} contactos")
+    return cantidad
+
+
+def eliminar_usuario_por_email(email, reasignar_a=None):
+    """Como eliminar_usuario, buscando los usuarios por email; None si el usuario no existe"""
+    usuario = Usuario.query.filter_by(email=email).first()
+    if usuario is None:
+        return None
+    nuevo_usuario = None
+    if reasignar_a:
+        nuevo_usuario = Usuario.query.filter_by(email=reasignar_a).first()
+        if nuevo_usuario is None:
+            raise BajaInvalida(f'No existe el usuario {reasignar_a}')
+    return eliminar_usuario(usuario, nuevo_usuario)
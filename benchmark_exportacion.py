@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de las exportaciones con datos sintéticos.
+
+Para cada tamaño crea una base SQLite descartable, la llena con contactos de
+ejemplo (generadores de insert_ejemplos.py, con inserts masivos) y mide el
+tiempo y el pico de memoria (tracemalloc) de cada etapa de las exportaciones.
+Los resultados se guardan en JSON para comparar entre commits:
+
+    python benchmark_exportacion.py --tamanos 1000 10000 --salida antes.json
+    python benchmark_exportacion.py --tamanos 1000 10000 --comparar antes.json
+"""
+
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from models import db, Usuario, Contacto
+import cache_exportacion
+import estadisticas
+import exportacion
+from insert_ejemplos import generar_contactos
+
+TAMANOS = [1000, 10000, 100000, 1000000]
+LOTE_INSERT = 10000
+CONTACTOS_POR_USUARIO = 250
+
+
+def crear_app(directorio):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'benchmark.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def poblar(cantidad):
+    """Inserta `cantidad` contactos repartidos entre varios usuarios con inserts masivos"""
+    hash_password = generate_password_hash("password123")
+    usuarios = max(1, cantidad // CONTACTOS_POR_USUARIO)
+    db.session.execute(insert(Usuario), [
+        dict(email=f"vendedor{i}@ejemplo.com", password=hash_password, email_confirmed=True)
+        for i in range(usuarios)
+    ])
+    usuarios_ids = [fila[0] for fila in db.session.query(Usuario.id)]
+
+    contactos = generar_contactos(usuarios_ids, cantidad, dias=365)
+    insertados = 0
+    while insertados < cantidad:
+        lote = [next(contactos) for _ in range(min(LOTE_INSERT, cantidad - insertados))]
+        db.session.execute(insert(Contacto), lote)
+        insertados += len(lote)
+    db.session.commit()
+
+    # Los inserts masivos no disparan los eventos que registran los meses ni
+    # los que cuentan los contactos para las hojas de resumen
+    cache_exportacion.asegurar_versiones_mes()
+    estadisticas.reconstruir_estadisticas()
+    resumidos = exportacion.ResumenExportacion.desde_estadisticas().total
+    if resumidos != cantidad:
+        raise RuntimeError(f"Las estadísticas cuentan {resumidos} contactos y se cargaron {cantidad}")
+
+
+class Medicion:
+    """Tiempo y pico de memoria de cada etapa"""
+
+    def __init__(self, con_memoria=True):
+        self.con_memoria = con_memoria
+        self.etapas = {}
+
+    def medir(self, nombre, funcion):
+        if self.con_memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        datos = {'segundos': round(segundos, 4)}
+        if self.con_memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            datos['pico_mb'] = round(pico / 1024 / 1024, 2)
+        self.etapas[nombre] = datos
+        print(f"    {nombre:<28} {segundos:8.2f} s" + (f" {datos['pico_mb']:9.2f} MB" if self.con_memoria else ""))
+        return resultado
+
+
+def _recorrer(iterable):
+    filas = 0
+    for _ in iterable:
+        filas += 1
+    return filas
+
+
+def medir_tamano(cantidad, con_memoria=True):
+    directorio = tempfile.mkdtemp(prefix='benchmark_exportacion_')
+    cache_exportacion.CACHE_DIR = os.path.join(directorio, 'cache')
+    exportacion.BLOQUES_DIR = os.path.join(directorio, 'cache', 'meses')
+    app = crear_app(directorio)
+    try:
+        with app.app_context():
+            db.create_all()
+            print(f"  {cantidad} contactos")
+            inicio = time.perf_counter()
+            poblar(cantidad)
+            segundos_carga = time.perf_counter() - inicio
+
+            medicion = Medicion(con_memoria)
+            medicion.medir('consulta_admin', lambda: _recorrer(exportacion.consultar_contactos_admin()))
+            medicion.medir('bloques_mensuales_frios', exportacion.preparar_bloques)
+            medicion.medir('bloques_mensuales_calientes', exportacion.preparar_bloques)
+
+            libro_admin = os.path.join(directorio, 'contactos.xlsx')
+            medicion.medir('libro_admin', lambda: exportacion.generar_libro_admin(libro_admin))
+
+            usuario_id = (db.session.query(Contacto.usuario_id)
+                          .group_by(Contacto.usuario_id)
+                          .order_by(func.count(Contacto.id).desc())
+                          .limit(1).scalar())
+            libro_usuario = os.path.join(directorio, 'mis_contactos.xlsx')
+            medicion.medir('libro_usuario', lambda: exportacion.generar_libro_usuario(usuario_id, libro_usuario))
+
+            medicion.medir('csv_admin', lambda: _recorrer(
+                exportacion.generar_csv(exportacion.consultar_contactos_admin(), con_usuario=True)))
+
+            tamanos = {
+                'libro_admin': os.path.getsize(libro_admin),
+                'libro_usuario': os.path.getsize(libro_usuario),
+            }
+            try:
+                import pyarrow  # noqa: F401
+                parquet = os.path.join(directorio, 'contactos.parquet')
+                medicion.medir('parquet_admin', lambda: exportacion.generar_columnar(parquet, 'parquet'))
+                tamanos['parquet_admin'] = os.path.getsize(parquet)
+            except ImportError:
+                print("    parquet_admin                omitido (falta pyarrow)")
+
+            db.session.remove()
+        return {
+            'contactos': cantidad,
+            'segundos_carga': round(segundos_carga, 2),
+            'etapas': medicion.etapas,
+            'tamanos_bytes': tamanos,
+        }
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultado, anterior):
+    """Muestra la variación de tiempo de cada etapa respecto de otra corrida"""
+    previos = {r['contactos']: r['etapas'] for r in anterior['resultados']}
+    print(f"\nComparación con {anterior.get('commit') or 'corrida anterior'}:")
+    for medicion in resultado['resultados']:
+        etapas_previas = previos.get(medicion['contactos'])
+        if not etapas_previas:
+            continue
+        print(f"  {medicion['contactos']} contactos")
+        for nombre, datos in medicion['etapas'].items():
+            if nombre in etapas_previas and etapas_previas[nombre]['segundos'] > 0:
+                variacion = datos['segundos'] / etapas_previas[nombre]['segundos']
+                print(f"    {nombre:<28} x{variacion:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las exportaciones con datos sintéticos")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS,
+                        help="cantidades de contactos a medir")
+    parser.add_argument('--salida', default='benchmark_exportacion.json',
+                        help="archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar tiempos")
+    parser.add_argument('--sin-memoria', action='store_true',
+                        help="no usar tracemalloc (más rápido, sin pico de memoria)")
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.semilla)
+    print("🚀 Benchmark de exportaciones")
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'semilla': args.semilla,
+        'resultados': [medir_tamano(cantidad, not args.sin_memoria) for cantidad in args.tamanos],
+    }
+
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"✨ Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(resultado, json.load(archivo))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
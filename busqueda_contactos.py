@@ -0,0 +1,179 @@
+"""
+Índice de texto completo (SQLite FTS5) para las búsquedas de contactos.
+
+Las búsquedas con ilike('%texto%') no pueden usar índices y recorrían toda la
+tabla contacto en cada búsqueda. contacto_fts es una tabla FTS5 de contenido
+externo sobre apellido_nombre, correo_electronico, telefono y observaciones:
+guarda solo el índice y lo mantienen los triggers de contacto en la misma
+transacción de cada escritura. Las palabras se indexan en minúsculas y sin
+acentos, así "perez" encuentra "Pérez".
+
+La tabla y los triggers los crea la migración; en una base nueva se crean con
+la tabla contacto (db.create_all). Una migración que recree la tabla contacto
+(batch_alter_table) elimina los triggers y debe volver a crearlos con
+crear_indice_busqueda.
+
+Además, apellido_nombre y correo_electronico tienen columnas normalizadas (en
+minúsculas, sin acentos y con los espacios colapsados, ver normalizar). Solo
+correo_normalizado está indexada, en contacto y contacto_archivo: la búsqueda
+por el comienzo del email es un rango del índice (empieza_con). El nombre se
+busca con el índice FTS y, en el archivo, con apellido_nombre_normalizado sin
+índice; similares_contactos.py también la lee. El teléfono tiene una clave al
+estilo E.164 (normalizar_telefono) para encontrar contactos repetidos; ver
+duplicados_contactos.py. models.py calcula las tres al guardar cada
+contacto; los inserts masivos deben incluir claves_busqueda.
+"""
+
+import logging
+import re
+import unicodedata
+
+from sqlalchemy import and_, bindparam, column, select, table, text
+
+from models import db
+
+# Columnas indexadas, en el orden de la tabla FTS
+COLUMNAS_BUSQUEDA = ('apellido_nombre', 'correo_electronico', 'telefono', 'observaciones')
+
+_COLUMNAS = ', '.join(COLUMNAS_BUSQUEDA)
+_NUEVAS = ', '.join(f'new.{c}' for c in COLUMNAS_BUSQUEDA)
+_VIEJAS = ', '.join(f'old.{c}' for c in COLUMNAS_BUSQUEDA)
+
+SENTENCIAS_INDICE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacto_fts USING fts5({_COLUMNAS}, "
+    "content='contacto', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS contacto_fts_insertar AFTER INSERT ON contacto BEGIN "
+    f"INSERT INTO contacto_fts(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVAS}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacto_fts_borrar AFTER DELETE ON contacto BEGIN "
+    f"INSERT INTO contacto_fts(contacto_fts, rowid, {_COLUMNAS}) VALUES ('delete', old.id, {_VIEJAS}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacto_fts_actualizar AFTER UPDATE OF {_COLUMNAS} ON contacto BEGIN "
+    f"INSERT INTO contacto_fts(contacto_fts, rowid, {_COLUMNAS}) VALUES ('delete', old.id, {_VIEJAS}); "
+    f"INSERT INTO contacto_fts(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVAS}); END",
+)
+
+# Tabla FTS y triggers que la mantienen
+OBJETOS_INDICE = ('contacto_fts', 'contacto_fts_insertar', 'contacto_fts_borrar', 'contacto_fts_actualizar')
+
+contacto_fts = table('contacto_fts', column('rowid'), column('contacto_fts'))
+
+
+def crear_indice_busqueda(connection):
+    """Crea la tabla FTS y los triggers si no existen"""
+    for sentencia in SENTENCIAS_INDICE:
+        connection.execute(text(sentencia))
+
+
+def borrar_indice_busqueda(connection):
+    connection.execute(text("DROP TABLE IF EXISTS contacto_fts"))
+
+
+def asegurar_indice_busqueda():
+    """Crea el índice y lo vuelve a cargar si falta la tabla FTS o alguno de sus triggers"""
+    consulta = text("SELECT name FROM sqlite_master WHERE name IN :nombres").bindparams(
+        bindparam('nombres', expanding=True))
+    existentes = {fila[0] for fila in db.session.execute(consulta, {'nombres': list(OBJETOS_INDICE)})}
+    if existentes == set(OBJETOS_INDICE):
+        return
+    crear_indice_busqueda(db.session.connection())
+    reconstruir_indice_busqueda()
+
+
+def reconstruir_indice_busqueda():
+    """Vuelve a indexar todos los contactos (comando "flask reconstruir-busqueda")"""
+    db.session.execute(text("INSERT INTO contacto_fts(contacto_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    logging.info("Índice de búsqueda de contactos reconstruido")
+
+
+def palabras(texto):
+    """Palabras del texto buscado, con el mismo corte que usa el índice"""
+    return re.findall(r'\w+', texto or '')
+
+
+def expresion_busqueda(texto, columnas=COLUMNAS_BUSQUEDA):
+    """Consulta MATCH de FTS5: cada palabra del texto como prefijo, todas en alguna de las columnas.
+
+    Devuelve None si el texto no tiene palabras.
+    """
+    buscadas = palabras(texto)
+    if not buscadas:
+        return None
+    # Las palabras van entre comillas: solo tienen letras y números, así no se interpretan como operadores
+    return '{%s} : (%s)' % (' '.join(columnas), ' AND '.join(f'"{p}"*' for p in buscadas))
+
+
+def ids_coincidentes(texto, columnas=COLUMNAS_BUSQUEDA):
+    """Subconsulta de los ids de contactos que coinciden, o None si el texto no tiene palabras"""
+    expresion = expresion_busqueda(texto, columnas)
+    if expresion is None:
+        return None
+    return select(contacto_fts.c.rowid).where(contacto_fts.c.contacto_fts.op('MATCH')(expresion))
+
+
+def normalizar(texto):
+    """Texto en minúsculas, sin acentos y con los espacios colapsados: "  Pérez  JUAN" -> "perez juan" """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+# Columna normalizada de cada columna de búsqueda que la tiene
+COLUMNAS_NORMALIZADAS = {
+    'apellido_nombre': 'apellido_nombre_normalizado',
+    'correo_electronico': 'correo_normalizado',
+}
+
+
+# Código de país de los teléfonos cargados sin él
+PREFIJO_PAIS = '54'
+
+
+def normalizar_telefono(telefono):
+    """Clave del teléfono al estilo E.164: +54 y los 10 dígitos del número nacional.
+
+    Se quitan el 0 de larga distancia, el 9 de los celulares después del
+    código de país y el 15 después de la característica, así "+54 9 11
+    1234-5678", "011 15 1234-5678" y "1112345678" dan "+541112345678". Los
+    números de otros países quedan como "+" y sus dígitos; los que no se
+    pueden completar (sin característica), solo con sus dígitos.
+    """
+    texto = (telefono or '').strip()
+    digitos = re.sub(r'\D', '', texto)
+    internacional = texto.startswith('+') or digitos.startswith('00')
+    digitos = digitos[2:] if digitos.startswith('00') else digitos
+    if internacional and not digitos.startswith(PREFIJO_PAIS):
+        return '+' + digitos if digitos else ''
+    if internacional or (digitos.startswith(PREFIJO_PAIS) and len(digitos) in (12, 13)):
+        digitos = digitos[len(PREFIJO_PAIS):]
+        if digitos.startswith('9') and len(digitos) == 11:
+            digitos = digitos[1:]
+    if digitos.startswith('0'):
+        digitos = digitos[1:]
+    if len(digitos) == 12:
+        # Característica de 2 a 4 dígitos seguida del 15 de los celulares
+        for largo in (2, 3, 4):
+            if digitos[largo:largo + 2] == '15':
+                digitos = digitos[:largo] + digitos[largo + 2:]
+                break
+    if len(digitos) == 10:
+        return '+' + PREFIJO_PAIS + digitos
+    return digitos
+
+
+def claves_busqueda(apellido_nombre, correo_electronico, telefono):
+    """Valores de las columnas normalizadas de un contacto"""
+    return {
+        COLUMNAS_NORMALIZADAS['apellido_nombre']: normalizar(apellido_nombre),
+        COLUMNAS_NORMALIZADAS['correo_electronico']: normalizar(correo_electronico),
+        'telefono_normalizado': normalizar_telefono(telefono),
+    }
+
+
+def empieza_con(columna, prefijo):
+    """Condición "columna empieza con prefijo" como rango, para que SQLite use el índice de la columna.
+
+    El prefijo debe estar normalizado, igual que la columna.
+    """
+    # Primer texto mayor que todos los que empiezan con el prefijo
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    return and_(columna >= prefijo, columna < siguiente)
@@ -0,0 +1,243 @@
+"""
+Caché de libros de exportación versionada por cambios en los datos.
+
+Cada insert/update/delete de Contacto o Usuario incrementa el contador de
+VersionDatos dentro de la misma transacción. Un libro generado para una
+versión sigue siendo válido mientras el contador no cambie, así que las
+descargas repetidas sirven el archivo guardado sin volver a generarlo.
+Los archivos se descartan por tamaño total, empezando por los usados hace
+más tiempo. Con la caché desactivada los libros se generan en un buffer en
+memoria que se envía directamente en la respuesta.
+
+Además cada mes de carga tiene su propio contador (VersionMes), que solo
+cambia cuando se escribe un contacto de ese mes; lo usa la caché de bloques
+mensuales de la hoja "Base de Datos".
+"""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Usuario, Contacto, VersionDatos, VersionMes
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'temp', 'cache')
+
+# Evita que dos hilos del mismo proceso generen a la vez el mismo libro
+_generando = threading.Lock()
+
+_PATRON_ARCHIVO = re.compile(r'^(?P<clave>.+)_v(?P<version>\d+)\.xlsx$')
+
+# Clave de mes de los contactos sin fecha de carga
+SIN_FECHA = 'sin-fecha'
+
+
+def incrementar_version(connection):
+    """Incrementa el contador de versión usando la conexión de la transacción en curso.
+
+    Los cambios masivos (query.update/delete) no disparan eventos de mapper y
+    deben llamar a esta función explícitamente.
+    """
+    tabla = VersionDatos.__table__
+    resultado = connection.execute(update(tabla).where(tabla.c.id == 1).values(version=tabla.c.version + 1))
+    if resultado.rowcount == 0:
+        connection.execute(insert(tabla).values(id=1, version=1))
+
+
+def clave_mes(fecha):
+    return fecha.strftime('%Y-%m') if fecha else SIN_FECHA
+
+
+def incrementar_version_mes(connection, meses=None):
+    """Incrementa el contador de los meses indicados, o de todos si meses es None"""
+    tabla = VersionMes.__table__
+    if meses is None:
+        connection.execute(update(tabla).values(version=tabla.c.version + 1))
+        return
+    for mes in set(meses):
+        sentencia = sqlite_insert(tabla).values(mes=mes, version=1)
+        connection.execute(sentencia.on_conflict_do_update(
+            index_elements=[tabla.c.mes],
+            set_={'version': tabla.c.version + 1}
+        ))
+
+
+def _meses_del_contacto(target):
+    """Meses afectados por la escritura de un contacto (None si no se puede saber)"""
+    if 'created_at' not in target.__dict__:
+        return None
+    historial = inspect(target).attrs.created_at.history
+    fechas = set(historial.added) | set(historial.deleted) | set(historial.unchanged)
+    return [clave_mes(fecha) for fecha in fechas] or [SIN_FECHA]
+
+
+def _al_modificar_contacto(mapper, connection, target):
+    incrementar_version(connection)
+    incrementar_version_mes(connection, _meses_del_contacto(target))
+
+
+def _al_modificar_usuario(mapper, connection, target):
+    incrementar_version(connection)
+    # El email del usuario cargador aparece en las filas de todos los meses
+    if inspect(target).attrs.email.history.has_changes():
+        incrementar_version_mes(connection)
+
+
+for _evento in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Contacto, _evento, _al_modificar_contacto)
+    event.listen(Usuario, _evento, _al_modificar_usuario)
+
+
+def version_actual():
+    return db.session.execute(select(VersionDatos.version).where(VersionDatos.id == 1)).scalar() or 0
+
+
+def asegurar_versiones_mes():
+    """Registra los meses de los contactos existentes si la tabla de versiones está vacía"""
+    if db.session.execute(select(VersionMes.mes).limit(1)).first() is not None:
+        return
+    mes = func.coalesce(func.strftime('%Y-%m', Contacto.created_at), SIN_FECHA)
+    meses = [fila[0] for fila in db.session.execute(select(mes).group_by(mes))]
+    for clave in meses:
+        db.session.add(VersionMes(mes=clave, version=1))
+    db.session.commit()
+    if meses:
+        logging.info(f"Versiones registradas para {len(meses)} mes(es) de contactos")
+
+
+def versiones_mes():
+    """Diccionario mes -> versión de todos los meses con contactos registrados"""
+    return dict(db.session.execute(select(VersionMes.mes, VersionMes.version)).all())
+
+
+def _ruta(clave, version):
+    return os.path.join(CACHE_DIR, f"{clave}_v{version}.xlsx")
+
+
+def _limite_bytes():
+    return current_app.config.get('EXPORTACION_CACHE_MAX_MB', 200) * 1024 * 1024
+
+
+def cache_activa():
+    return _limite_bytes() > 0
+
+
+def libro_en_memoria(generar):
+    """Genera el libro en un buffer que solo pasa a disco si supera EXPORTACION_SPOOL_MAX_MB.
+
+    Devuelve el buffer posicionado al inicio, listo para send_file.
+    """
+    limite = current_app.config.get('EXPORTACION_SPOOL_MAX_MB', 16) * 1024 * 1024
+    buffer = tempfile.SpooledTemporaryFile(max_size=limite)
+    try:
+        generar(buffer)
+    except Exception:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
+
+
+def abrir_libro(clave, generar):
+    """Archivo abierto con el libro `clave`, desde la caché o generado en memoria si está desactivada"""
+    if not cache_activa():
+        return libro_en_memoria(generar)
+    return open(libro_en_cache(clave, generar), 'rb')
+
+
+def libro_en_cache(clave, generar):
+    """Devuelve la ruta del libro `clave` para la versión actual de los datos.
+
+    Si no está en caché lo genera con generar(destino) y lo guarda.
+    """
+    version = version_actual()
+    ruta = _ruta(clave, version)
+    if os.path.exists(ruta):
+        # Marcar como usado recientemente para la política LRU
+        os.utime(ruta)
+        logging.info(f"Exportación {clave} servida desde caché (versión {version})")
+        return ruta
+
+    with _generando:
+        if os.path.exists(ruta):
+            return ruta
+        if not os.path.exists(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        # Generar en un archivo temporal y moverlo al terminar, así nunca se sirve un libro a medias
+        fd, temporal = tempfile.mkstemp(suffix='.tmp', dir=CACHE_DIR)
+        os.close(fd)
+        try:
+            generar(temporal)
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        logging.info(f"Exportación {clave} guardada en caché (versión {version})")
+
+    desalojar(clave, version)
+    return ruta
+
+
+def desalojar(clave=None, version=None):
+    """Elimina versiones viejas de `clave` y, si la caché supera el límite, los archivos menos usados.
+
+    El libro de `clave` en `version` nunca se desaloja, porque se está por servir.
+    """
+    if not os.path.exists(CACHE_DIR):
+        return
+    archivos = []
+    total = 0
+    for nombre in os.listdir(CACHE_DIR):
+        ruta = os.path.join(CACHE_DIR, nombre)
+        coincidencia = _PATRON_ARCHIVO.match(nombre)
+        if not coincidencia:
+            continue
+        misma_clave = clave is not None and coincidencia.group('clave') == clave
+        try:
+            if misma_clave and int(coincidencia.group('version')) < version:
+                # Una versión anterior ya no puede volver a pedirse
+                os.remove(ruta)
+                continue
+            stat = os.stat(ruta)
+        except OSError:
+            continue
+        total += stat.st_size
+        if not (misma_clave and int(coincidencia.group('version')) == version):
+            archivos.append((stat.st_mtime, stat.st_size, ruta))
+
+    limite = _limite_bytes()
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+            logging.info(f"Exportación en caché desalojada: {ruta}")
+        except OSError:
+            pass
+
+
+def limpiar_archivos_temporales():
+    """Eliminar archivos Excel temporales antiguos (más de 1 hora).
+
+    Son los que dejaban las exportaciones anteriores a la caché en el
+    directorio raíz y en temp/; se ejecuta en segundo plano al iniciar la app.
+    """
+    try:
+        limite = time.time() - 3600
+        for directorio in (BASE_DIR, os.path.join(BASE_DIR, 'temp')):
+            if not os.path.exists(directorio):
+                continue
+            for entrada in os.scandir(directorio):
+                if entrada.is_file() and entrada.name.endswith('.xlsx') and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+                    logging.info(f"Archivo temporal eliminado: {entrada.path}")
+    except Exception as e:
+        logging.error(f"Error al limpiar archivos temporales: {str(e)}")
@@ -7,7 +7,8 @@ load_dotenv()
 
 # Configuración de base de datos - Usar SQLite exclusivamente
 basedir = os.path.abspath(os.path.dirname(__file__))
-SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'instance', 'contactos.db')}"
+# DATABASE_URL permite usar otra base SQLite (las pruebas usan una en memoria)
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(basedir, 'instance', 'contactos.db')}"
 
 class Config:
     # Configuración básica
@@ -42,6 +43,15 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    
+    # Hilos dedicados a generar exportaciones en segundo plano
+    EXPORTACION_WORKERS = int(os.environ.get('EXPORTACION_WORKERS') or 1)
+    
+    # Tamaño máximo de la caché de exportaciones antes de desalojar archivos (0 la desactiva)
+    EXPORTACION_CACHE_MAX_MB = int(os.environ.get('EXPORTACION_CACHE_MAX_MB', 200))
+    
+    # Sin caché, los libros se arman en memoria y pasan a disco solo por encima de este tamaño
+    EXPORTACION_SPOOL_MAX_MB = int(os.environ.get('EXPORTACION_SPOOL_MAX_MB') or 16)
 
 # Lista de correos autorizados como administradores
 ADMIN_EMAILS = ["matvaltino@gmail.com", "walter.vega@galeno.com.ar"] 
\ No newline at end of file
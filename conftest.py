@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fixtures compartidas por las pruebas: la aplicación con una base en memoria y
+los contactos de ejemplo
+"""
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from models import db, Usuario, Contacto
+
+
+@pytest.fixture
+def app():
+    """Aplicación con una base SQLite en memoria"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    import cache_exportacion
+    import exportacion
+    monkeypatch.setattr(cache_exportacion, 'CACHE_DIR', str(tmp_path / 'libros'))
+    monkeypatch.setattr(exportacion, 'BLOQUES_DIR', str(tmp_path / 'meses'))
+    return tmp_path / 'libros'
+
+
+def crear_contacto(usuario, estado, created_at, **campos):
+    datos = dict(
+        usuario_id=usuario.id,
+        origen='propio',
+        cobertura_actual='osde',
+        promocion=None,
+        privadoDesregulado='privado',
+        apellido_nombre='Juan Pérez',
+        correo_electronico='juan@test.com',
+        edad_titular=35,
+        telefono='123456789',
+        grupo_familiar=2,
+        plan_ofrecido='310',
+        fecha=created_at.date(),
+        estado=estado,
+        conyuge='sin conyuge',
+        conyuge_edad=None,
+        created_at=created_at,
+    )
+    datos.update(campos)
+    return Contacto(**datos)
+
+
+@pytest.fixture
+def contactos(app):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    otro = Usuario(email='otro@test.com', password='x')
+    db.session.add_all([vendedor, otro])
+    db.session.commit()
+    creados = [
+        crear_contacto(vendedor, 'abierto', datetime(2025, 7, 1)),
+        crear_contacto(vendedor, 'vendido', datetime(2025, 7, 1)),
+        crear_contacto(otro, 'abierto', datetime(2025, 7, 3), origen='wise'),
+        crear_contacto(otro, 'cerrado', datetime(2025, 6, 20)),
+        crear_contacto(vendedor, 'abierto', datetime(2025, 7, 5)),
+    ]
+    db.session.add_all(creados)
+    db.session.commit()
+    # Un contacto sin fecha de carga
+    creados[3].created_at = None
+    db.session.commit()
+    return [c.id for c in creados], vendedor, otro
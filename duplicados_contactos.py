@@ -0,0 +1,155 @@
+"""
+Contactos repetidos: el mismo teléfono o el mismo email cargados más de una vez.
+
+Cada contacto guarda la clave E.164 de su teléfono (telefono_normalizado) y su
+email normalizado (correo_normalizado), las dos indexadas. Al cargar un
+contacto, contactos_existentes busca los que ya tienen alguna de las dos claves
+con búsquedas en los índices, sin recorrer la tabla, y el formulario avisa.
+
+El comando "flask reportar-duplicados" arma los grupos de repetidos de toda la
+tabla: las claves repetidas salen de un GROUP BY que recorre solo los índices,
+y los contactos que comparten teléfono o email se unen en un mismo grupo
+aunque sea de a pares (A y B con el mismo teléfono, B y C con el mismo email).
+"""
+
+import csv
+from itertools import groupby
+import logging
+
+from sqlalchemy import func, or_, select
+
+from models import db, Usuario, Contacto
+from busqueda_contactos import normalizar, normalizar_telefono
+
+# Teléfonos con menos dígitos no identifican a nadie ("0", "123", ...)
+MINIMO_DIGITOS_TELEFONO = 8
+TAMANO_LOTE_REPORTE = 1000
+
+COLUMNAS_REPORTE = ['grupo', 'id', 'vendedor', 'apellido_nombre', 'correo_electronico', 'telefono', 'estado',
+                    'fecha_carga']
+
+
+def claves_duplicados(telefono, correo_electronico):
+    """(clave del teléfono, clave del email) para comparar; None en la que no alcanza para identificar"""
+    clave_telefono = normalizar_telefono(telefono)
+    clave_correo = normalizar(correo_electronico)
+    if len(clave_telefono.lstrip('+')) < MINIMO_DIGITOS_TELEFONO:
+        clave_telefono = None
+    if '@' not in clave_correo:
+        clave_correo = None
+    return clave_telefono, clave_correo
+
+
+def contactos_existentes(telefono, correo_electronico, excluir_id=None):
+    """Contactos con el mismo teléfono o email.
+
+    Filas (id, usuario_id, created_at, mismo_telefono, mismo_correo), de la
+    más vieja a la más nueva.
+    """
+    clave_telefono, clave_correo = claves_duplicados(telefono, correo_electronico)
+    condiciones = []
+    if clave_telefono:
+        condiciones.append(Contacto.telefono_normalizado == clave_telefono)
+    if clave_correo:
+        condiciones.append(Contacto.correo_normalizado == clave_correo)
+    if not condiciones:
+        return []
+    consulta = select(
+        Contacto.id, Contacto.usuario_id, Contacto.created_at,
+        (Contacto.telefono_normalizado == clave_telefono).label('mismo_telefono'),
+        (Contacto.correo_normalizado == clave_correo).label('mismo_correo'),
+    ).where(or_(*condiciones))
+    if excluir_id is not None:
+        consulta = consulta.where(Contacto.id != excluir_id)
+    return db.session.execute(consulta.order_by(Contacto.id)).all()
+
+
+def aviso_duplicados(existentes, usuario_id):
+    """Mensaje para el vendedor que carga un contacto que ya existe; no muestra datos de otros vendedores"""
+    propios = sum(1 for fila in existentes if fila.usuario_id == usuario_id)
+    campos = []
+    if any(fila.mismo_telefono for fila in existentes):
+        campos.append('teléfono')
+    if any(fila.mismo_correo for fila in existentes):
+        campos.append('email')
+    cargados = []
+    if propios:
+        cargados.append(f'{propios} cargado(s) por vos')
+    if len(existentes) - propios:
+        cargados.append(f'{len(existentes) - propios} por otro vendedor')
+    return (f"Atención: ya había {len(existentes)} contacto(s) con el mismo {' y '.join(campos)} "
+            f"({' y '.join(cargados)})")
+
+
+def _claves_repetidas(columna, valida):
+    """Pares (clave, id) de los contactos cuya clave se repite, ordenados por clave"""
+    repetidas = select(columna).where(valida).group_by(columna).having(func.count() > 1)
+    return db.session.execute(
+        select(columna, Contacto.id).where(columna.in_(repetidas)).order_by(columna, Contacto.id)
+    )
+
+
+def agrupar_pares(pares):
+    """Une los pares (a, b) de ids que se tocan en grupos; devuelve los grupos de ids, los más grandes primero"""
+    padres = {}
+
+    def raiz(contacto_id):
+        while padres[contacto_id] != contacto_id:
+            padres[contacto_id] = padres[padres[contacto_id]]
+            contacto_id = padres[contacto_id]
+        return contacto_id
+
+    for a, b in pares:
+        padres.setdefault(a, a)
+        padres.setdefault(b, b)
+        padres[raiz(b)] = raiz(a)
+
+    grupos = {}
+    for contacto_id in padres:
+        grupos.setdefault(raiz(contacto_id), []).append(contacto_id)
+    return sorted((sorted(ids) for ids in grupos.values()), key=lambda ids: (-len(ids), ids[0]))
+
+
+def _pares_repetidos():
+    claves = [
+        (Contacto.telefono_normalizado,
+         func.length(func.ltrim(Contacto.telefono_normalizado, '+')) >= MINIMO_DIGITOS_TELEFONO),
+        (Contacto.correo_normalizado, Contacto.correo_normalizado.contains('@')),
+    ]
+    for columna, valida in claves:
+        for _, filas in groupby(_claves_repetidas(columna, valida), key=lambda fila: fila[0]):
+            ids = [fila[1] for fila in filas]
+            for otro in ids[1:]:
+                yield ids[0], otro
+
+
+def grupos_duplicados():
+    """Grupos de ids de contactos repetidos, los más grandes primero"""
+    return agrupar_pares(_pares_repetidos())
+
+
+def reportar_duplicados(destino):
+    """Escribe en destino (archivo de texto) un CSV con los contactos de cada grupo de repetidos.
+
+    Devuelve (cantidad de grupos, cantidad de contactos).
+    """
+    grupos = grupos_duplicados()
+    grupo_de = {contacto_id: numero for numero, ids in enumerate(grupos, 1) for contacto_id in ids}
+    escritor = csv.writer(destino)
+    escritor.writerow(COLUMNAS_REPORTE)
+    ids = sorted(grupo_de, key=lambda contacto_id: (grupo_de[contacto_id], contacto_id))
+    for inicio in range(0, len(ids), TAMANO_LOTE_REPORTE):
+        lote = ids[inicio:inicio + TAMANO_LOTE_REPORTE]
+        filas = db.session.execute(
+            select(Contacto.id, Usuario.email, Contacto.apellido_nombre, Contacto.correo_electronico,
+                   Contacto.telefono, Contacto.estado, Contacto.created_at)
+            .join(Usuario, Contacto.usuario_id == Usuario.id)
+            .where(Contacto.id.in_(lote))
+        )
+        for fila in sorted(filas, key=lambda fila: (grupo_de[fila.id], fila.id)):
+            escritor.writerow([
+                grupo_de[fila.id], fila.id, fila.email, fila.apellido_nombre, fila.correo_electronico,
+                fila.telefono, fila.estado, fila.created_at.strftime('%d/%m/%Y') if fila.created_at else '',
+            ])
+    logging.info(f"Contactos repetidos: {len(grupos)} grupos, {len(ids)} contactos")
+    return len(grupos), len(ids)
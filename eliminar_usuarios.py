@@ -1,5 +1,5 @@
 from gestor import gestor, db
-from models import Usuario
+from baja_usuarios import eliminar_usuario_por_email
 import logging
 
 def eliminar_usuarios():
@@ -8,17 +8,14 @@ def eliminar_usuarios():
             # Lista de correos a eliminar
             correos = ["matvaltino@gmail.com", "walter.vega@galeno.com.ar"]
             
-            # Buscar y eliminar cada usuario
+            # Eliminar cada usuario; sus contactos los borra la base en cascada
             for correo in correos:
-                usuario = Usuario.query.filter_by(email=correo).first()
-                if usuario:
-                    db.session.delete(usuario)
-                    print(f"Usuario {correo} eliminado correctamente")
+                cantidad = eliminar_usuario_por_email(correo)
+                if cantidad is not None:
+                    print(f"Usuario {correo} eliminado correctamente ({cantidad} contactos)")
                 else:
                     print(f"Usuario {correo} no encontrado en la base de datos")
             
-            # Guardar los cambios
-            db.session.commit()
             print("Operación completada exitosamente")
             
         except Exception as e:
@@ -0,0 +1,209 @@
+"""
+Estadísticas de contactos y contadores del panel del admin.
+
+La tabla EstadisticaContacto guarda cuántos contactos hay por mes de carga,
+usuario, estado, origen, cobertura, promoción y privado/desregulado. Se
+actualiza en cada flush de la sesión, dentro de la misma transacción que el
+cambio del contacto, así los resúmenes leen grupos en lugar de contactos.
+Los cambios que no pasan por el ORM (query.update/delete) no la actualizan:
+para eso está reconstruir_estadisticas (comando "flask reconstruir-estadisticas").
+Al borrar un usuario, la base borra sus contactos en cascada y sus grupos se
+eliminan acá; reasignar_usuario mueve los grupos cuando sus contactos pasan a
+otro usuario (ver baja_usuarios.py).
+
+Los contadores del panel (total, abiertos, cerrados y cargados hoy) quedan en memoria hasta que cambia la versión de los datos
+(cache_exportacion.VersionDatos), que se incrementa en la misma transacción
+de cada escritura de contactos. Así el valor guardado sirve para todos los
+workers sin quedar desactualizado; además, las escrituras hechas en este
+proceso lo descartan en el momento.
+"""
+
+from collections import Counter
+from datetime import datetime
+import logging
+import threading
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, Usuario, Contacto, EstadisticaContacto
+from cache_exportacion import SIN_FECHA, clave_mes, incrementar_version_mes, version_actual
+
+# Atributos de Contacto que forman la clave de la tabla de estadísticas
+CAMPOS_CLAVE = ('created_at', 'usuario_id', 'estado', 'origen_id', 'cobertura_id',
+                'cobertura_actual_otra', 'promocion_id', 'privadoDesregulado')
+
+_cache = {'clave': None, 'datos': None}
+_cache_lock = threading.Lock()
+
+
+def _clave(valores):
+    """Clave de la tabla de estadísticas para los valores de un contacto"""
+    return (
+        clave_mes(valores['created_at']),
+        valores['usuario_id'],
+        valores['estado'] or '',
+        valores['origen_id'] or 0,
+        valores['cobertura_id'] or 0,
+        valores['cobertura_actual_otra'] or '',
+        valores['promocion_id'] or 0,
+        valores['privadoDesregulado'] or '',
+    )
+
+
+def _clave_contacto(contacto):
+    return _clave({campo: getattr(contacto, campo) for campo in CAMPOS_CLAVE})
+
+
+def _cambio_clave(contacto):
+    estado = inspect(contacto)
+    return any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_CLAVE)
+
+
+def _antes_del_flush(session, flush_context, instances):
+    """Resta los contactos modificados o borrados con los valores que tienen guardados"""
+    modificados = [c for c in session.dirty if isinstance(c, Contacto) and _cambio_clave(c)]
+    borrados = [c for c in session.deleted if isinstance(c, Contacto)]
+    ids = [c.id for c in modificados + borrados if c.id is not None]
+    cambios = restar_contactos(session.connection(), ids)
+    session.info['estadisticas_pendientes'] = (cambios, modificados)
+
+
+def restar_contactos(connection, ids):
+    """Cambios en los grupos al quitar los contactos con esos ids, según sus valores guardados"""
+    cambios = Counter()
+    if ids:
+        tabla = Contacto.__table__
+        columnas = [tabla.c[campo] for campo in CAMPOS_CLAVE]
+        for fila in connection.execute(select(*columnas).where(tabla.c.id.in_(ids))):
+            cambios[_clave(fila._mapping)] -= 1
+    return cambios
+
+
+def _despues_del_flush(session, flush_context):
+    """Suma los contactos nuevos y modificados con sus valores actuales y guarda los cambios"""
+    cambios, modificados = session.info.pop('estadisticas_pendientes', (Counter(), []))
+    for contacto in list(session.new) + modificados:
+        if isinstance(contacto, Contacto):
+            cambios[_clave_contacto(contacto)] += 1
+    aplicar_cambios(session.connection(), cambios)
+
+
+def aplicar_cambios(connection, cambios):
+    """Suma a cada grupo su diferencia y elimina los grupos que quedan vacíos"""
+    tabla = EstadisticaContacto.__table__
+    columnas = [c.name for c in tabla.primary_key.columns]
+    for clave, diferencia in cambios.items():
+        if diferencia == 0:
+            continue
+        valores = dict(zip(columnas, clave))
+        sentencia = sqlite_insert(tabla).values(cantidad=diferencia, **valores)
+        connection.execute(sentencia.on_conflict_do_update(
+            index_elements=columnas,
+            set_={'cantidad': tabla.c.cantidad + diferencia}
+        ))
+        if diferencia < 0:
+            condicion = [tabla.c[columna] == valor for columna, valor in valores.items()]
+            connection.execute(delete(tabla).where(*condicion, tabla.c.cantidad <= 0))
+
+
+event.listen(Session, 'before_flush', _antes_del_flush)
+event.listen(Session, 'after_flush', _despues_del_flush)
+
+
+def meses_del_usuario(connection, usuario_id):
+    """Meses de carga en los que el usuario tiene contactos"""
+    tabla = EstadisticaContacto.__table__
+    consulta = select(tabla.c.mes).where(tabla.c.usuario_id == usuario_id).distinct()
+    return [fila[0] for fila in connection.execute(consulta)]
+
+
+def reasignar_usuario(connection, usuario_id, nuevo_usuario_id):
+    """Suma los grupos de un usuario a los de otro, cuando sus contactos pasan al otro"""
+    tabla = EstadisticaContacto.__table__
+    columnas = [c.name for c in tabla.columns]
+    seleccion = select(*[literal(nuevo_usuario_id).label(c.name) if c.name == 'usuario_id' else c
+                         for c in tabla.columns]).where(tabla.c.usuario_id == usuario_id)
+    sentencia = sqlite_insert(tabla).from_select(columnas, seleccion)
+    connection.execute(sentencia.on_conflict_do_update(
+        index_elements=[c.name for c in tabla.primary_key.columns],
+        set_={'cantidad': tabla.c.cantidad + sentencia.excluded.cantidad}
+    ))
+    connection.execute(delete(tabla).where(tabla.c.usuario_id == usuario_id))
+
+
+def _al_borrar_usuario(mapper, connection, target):
+    """Los contactos del usuario los borra la base en cascada, sin eventos por contacto"""
+    incrementar_version_mes(connection, meses_del_usuario(connection, target.id))
+    tabla = EstadisticaContacto.__table__
+    connection.execute(delete(tabla).where(tabla.c.usuario_id == target.id))
+
+
+event.listen(Usuario, 'before_delete', _al_borrar_usuario)
+
+
+def reconstruir_estadisticas():
+    """Vuelve a calcular toda la tabla de estadísticas desde los contactos"""
+    claves = [
+        func.coalesce(func.strftime('%Y-%m', Contacto.created_at), SIN_FECHA),
+        Contacto.usuario_id,
+        Contacto.estado,
+        func.coalesce(Contacto.origen_id, 0),
+        func.coalesce(Contacto.cobertura_id, 0),
+        func.coalesce(Contacto.cobertura_actual_otra, ''),
+        func.coalesce(Contacto.promocion_id, 0),
+        Contacto.privadoDesregulado,
+    ]
+    consulta = select(*claves, func.count(Contacto.id)).group_by(*claves)
+    tabla = EstadisticaContacto.__table__
+    db.session.execute(delete(tabla))
+    db.session.execute(insert(tabla).from_select([c.name for c in tabla.columns], consulta))
+    db.session.commit()
+    grupos = db.session.query(func.count()).select_from(tabla).scalar()
+    logging.info(f"Estadísticas de contactos reconstruidas: {grupos} grupos")
+    return grupos
+
+
+def asegurar_estadisticas():
+    """Carga la tabla de estadísticas si está vacía y hay contactos"""
+    if db.session.query(EstadisticaContacto.mes).first() is None and db.session.query(Contacto.id).first() is not None:
+        reconstruir_estadisticas()
+
+
+def _calcular(hoy):
+    por_estado = dict(db.session.query(EstadisticaContacto.estado, func.sum(EstadisticaContacto.cantidad))
+                      .group_by(EstadisticaContacto.estado).all())
+    return {
+        'total': sum(por_estado.values()),
+        'abiertos': por_estado.get('abierto', 0),
+        'cerrados': por_estado.get('cerrado', 0),
+        'hoy': db.session.query(func.count(Contacto.id)).filter(Contacto.created_at >= hoy).scalar(),
+        'por_estado': por_estado,
+    }
+
+
+def estadisticas_panel():
+    """Contadores del panel; solo se consultan de nuevo si cambiaron los datos o el día"""
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    clave = (version_actual(), hoy)
+    with _cache_lock:
+        if _cache['clave'] == clave:
+            return _cache['datos']
+    datos = _calcular(hoy)
+    with _cache_lock:
+        _cache['clave'], _cache['datos'] = clave, datos
+    return datos
+
+
+def invalidar():
+    with _cache_lock:
+        _cache['clave'] = None
+
+
+def _al_modificar_contacto(mapper, connection, target):
+    invalidar()
+
+
+for _evento in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Contacto, _evento, _al_modificar_contacto)
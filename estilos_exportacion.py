@@ -0,0 +1,112 @@
+"""
+Estilos con nombre compartidos por todas las exportaciones a Excel.
+
+registrar_estilos(wb) agrega los estilos una sola vez por libro y guarda los
+índices de fuente, relleno, borde y alineación ya resueltos de cada uno;
+después aplicar_estilo(cell, 'encabezado') solo copia esos índices en la
+celda, sin crear objetos de estilo ni buscarlos en el libro por cada celda.
+"""
+
+from copy import copy
+import weakref
+
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+
+header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
+header_font = Font(color="FFFFFF", bold=True, size=11)
+header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+month_fill = PatternFill(start_color="E2EFDA", end_color="E2EFDA", fill_type="solid")
+month_font = Font(bold=True, size=11, color="1F4E78")
+title_font = Font(size=16, bold=True, color="1F4E78")
+center_alignment = Alignment(horizontal="center")
+month_alignment = Alignment(horizontal="center", vertical="center")
+formato_fecha = 'DD/MM/YYYY'
+border = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+_COLORES_ESTADO = {
+    'abierto': ("C6EFCE", "006100"),
+    'cerrado': ("FFC7CE", "9C0006"),
+    'vendido': ("BDD7EE", "1F4E78"),
+}
+
+# Dorado, plateado y bronce para el podio del ranking
+_COLORES_PODIO = {
+    1: ("FFD700", "000000"),
+    2: ("C0C0C0", "000000"),
+    3: ("CD7F32", "FFFFFF"),
+}
+
+# Índices de cada estilo registrado, por libro
+_plantillas = weakref.WeakKeyDictionary()
+
+# Nombre del estilo de la celda "Estado" según su valor y de cada puesto del podio
+ESTILO_ESTADO = {estado: f"estado-{estado}" for estado in _COLORES_ESTADO}
+ESTILO_PODIO = {posicion: f"podio-{posicion}" for posicion in _COLORES_PODIO}
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def _estilo(nombre, fill=None, font=None, alignment=None, con_borde=True, number_format=None):
+    estilo = NamedStyle(name=nombre)
+    if number_format is not None:
+        estilo.number_format = number_format
+    if fill is not None:
+        estilo.fill = fill
+    if font is not None:
+        estilo.font = font
+    if alignment is not None:
+        estilo.alignment = alignment
+    if con_borde:
+        estilo.border = border
+    return estilo
+
+
+def _definir_estilos():
+    """Estilos nuevos en cada llamada: un NamedStyle queda ligado al libro donde se registra"""
+    estilos = [
+        _estilo('titulo', font=title_font, alignment=center_alignment, con_borde=False),
+        _estilo('encabezado', fill=header_fill, font=header_font, alignment=header_alignment, con_borde=False),
+        _estilo('encabezado-bordeado', fill=header_fill, font=header_font, alignment=header_alignment),
+        _estilo('banner-mes', fill=month_fill, font=month_font, alignment=month_alignment),
+        _estilo('banner-campo', fill=month_fill, font=month_font, alignment=center_alignment, con_borde=False),
+        _estilo('celda'),
+        _estilo('celda-centrada', alignment=center_alignment),
+        # Fechas como fecha de Excel (se ordenan y filtran como fechas, no como texto)
+        _estilo('celda-fecha', number_format=formato_fecha),
+        _estilo('fecha', number_format=formato_fecha, con_borde=False),
+    ]
+    for estado, (relleno, color) in _COLORES_ESTADO.items():
+        estilos.append(_estilo(ESTILO_ESTADO[estado], fill=_relleno(relleno), font=Font(color=color)))
+    for posicion, (relleno, color) in _COLORES_PODIO.items():
+        estilos.append(_estilo(ESTILO_PODIO[posicion], fill=_relleno(relleno), font=Font(bold=True, color=color),
+                               alignment=center_alignment))
+    return estilos
+
+
+def registrar_estilos(wb):
+    """Registra los estilos en el libro (una sola vez) y lo devuelve"""
+    if wb in _plantillas:
+        return wb
+    existentes = set(wb.named_styles)
+    plantillas = {}
+    for estilo in _definir_estilos():
+        if estilo.name in existentes:
+            # Como cell.style = nombre: se usa el estilo que el libro ya tiene con ese nombre
+            estilo = wb._named_styles[estilo.name]
+        else:
+            wb.add_named_style(estilo)
+        plantillas[estilo.name] = estilo.as_tuple()
+    _plantillas[wb] = plantillas
+    return wb
+
+
+def aplicar_estilo(cell, nombre):
+    """Equivale a cell.style = nombre, con el estilo ya resuelto al registrarlo"""
+    cell._style = copy(_plantillas[cell.parent.parent][nombre])
@@ -0,0 +1,699 @@
+"""
+Motor de exportación a Excel en modo streaming (write-only de openpyxl).
+
+Las filas se emiten con sus estilos a medida que se leen de la base de datos,
+de modo que la memoria usada no crece con la cantidad de contactos.
+
+La hoja "Base de Datos" del admin se arma con bloques mensuales: las filas ya
+convertidas de cada mes y sus agregados se guardan en disco junto con la
+versión del mes (ver cache_exportacion.VersionMes), y solo se recalculan los
+meses que tuvieron cambios desde la última exportación.
+"""
+
+from collections import Counter, OrderedDict
+import csv
+from datetime import date, datetime, timedelta
+from itertools import islice
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from sqlalchemy import and_, case, func
+
+from models import db, Usuario, Contacto, EstadisticaContacto
+from cache_exportacion import CACHE_DIR, SIN_FECHA, versiones_mes
+# Registra los eventos que mantienen la tabla de estadísticas que leen los resúmenes
+import estadisticas  # noqa: F401
+from estilos_exportacion import ESTILO_ESTADO, ESTILO_PODIO, aplicar_estilo, registrar_estilos
+from opciones import COBERTURA_OTRA, catalogo, clave, etiqueta
+from archivo_contactos import fuente_contactos
+
+# Directorio de los bloques mensuales de la hoja "Base de Datos"
+BLOQUES_DIR = os.path.join(CACHE_DIR, 'meses')
+_PATRON_BLOQUE = re.compile(r'^(?P<mes>.+)_v(?P<version>\d+)\.jsonl?$')
+
+# Cantidad de filas que se traen de la base de datos por lote
+TAMANO_LOTE = 1000
+
+ENCABEZADOS_BASE_DATOS = [
+    "Origen", "Cobertura Actual", "¿Por qué no toma la cobertura?", "Privado/Desregulado",
+    "Apellido y nombre", "Correo electrónico", "Edad titular",
+    "Teléfono", "Grupo familiar", "Plan ofrecido",
+    "Estado", "Observaciones", "Cónyuge", "Edad cónyuge", "Fecha de carga", "Usuario cargador"
+]
+
+COLUMNA_ESTADO = 11
+COLUMNA_FECHA = 15
+
+def normalize_text(text):
+    """Convertir a minúsculas y capitalizar la primera letra"""
+    if text:
+        return text.strip().lower().capitalize()
+    return text
+
+
+class AnchoColumnas:
+    """Calcula el ancho de cada columna a medida que se agregan filas"""
+
+    def __init__(self, maximo=30):
+        self.maximo = maximo
+        self.largos = {}
+
+    def observar(self, valores):
+        for col, valor in enumerate(valores, 1):
+            if valor is None:
+                continue
+            largo = len(str(valor))
+            if largo > self.largos.get(col, 0):
+                self.largos[col] = largo
+
+    def combinar(self, largos):
+        for col, largo in largos.items():
+            col = int(col)
+            if largo > self.largos.get(col, 0):
+                self.largos[col] = largo
+
+    def aplicar(self, ws):
+        """Debe llamarse antes de agregar la primera fila (modo write-only)"""
+        for col, largo in self.largos.items():
+            ws.column_dimensions[get_column_letter(col)].width = min((largo + 2) * 1.2, self.maximo)
+
+
+def consultar_contactos_admin(incluir_archivo=False):
+    """Consulta de todos los contactos con el email del usuario cargador, leída por lotes.
+
+    Con incluir_archivo también trae los contactos archivados (UNION ALL).
+    """
+    fuente = fuente_contactos(incluir_archivo)
+    return (db.session.query(
+                fuente.origen_id,
+                fuente.cobertura_id,
+                fuente.cobertura_actual_otra,
+                fuente.promocion_id,
+                fuente.privadoDesregulado,
+                fuente.apellido_nombre,
+                fuente.correo_electronico,
+                fuente.edad_titular,
+                fuente.telefono,
+                fuente.grupo_familiar,
+                fuente.plan_ofrecido,
+                fuente.estado,
+                fuente.observaciones,
+                fuente.conyuge,
+                fuente.conyuge_edad,
+                fuente.created_at,
+                Usuario.email)
+            .join(Usuario, fuente.usuario_id == Usuario.id)
+            .order_by(fuente.created_at, fuente.id)
+            .execution_options(yield_per=TAMANO_LOTE))
+
+
+def fila_contacto(c):
+    """Convierte un registro de la consulta en la fila de la hoja "Base de Datos" """
+    return [
+        etiqueta('origen', c.origen_id),
+        _cobertura(c.cobertura_id, c.cobertura_actual_otra),
+        etiqueta('promocion', c.promocion_id) or "No especificado",
+        c.privadoDesregulado,
+        c.apellido_nombre,
+        c.correo_electronico,
+        c.edad_titular,
+        c.telefono,
+        c.grupo_familiar,
+        c.plan_ofrecido,
+        c.estado,
+        c.observaciones,
+        c.conyuge,
+        c.conyuge_edad,
+        c.created_at.date() if c.created_at else "N/A",
+        c.email
+    ]
+
+
+def _cobertura(cobertura_id, otra):
+    """Cobertura mostrada: el texto cargado si es "otros", si no la etiqueta de la opción"""
+    return normalize_text(otra) if otra else etiqueta('cobertura', cobertura_id)
+
+
+def _campos_estadisticas():
+    """Campos de la hoja "Estadísticas de Campos": columnas a agrupar y opción mostrada por grupo"""
+    return OrderedDict([
+        ('Origen', ((Contacto.origen_id,), lambda g: etiqueta('origen', g.origen_id))),
+        ('Cobertura Actual', ((Contacto.cobertura_id, Contacto.cobertura_actual_otra),
+                              lambda g: _cobertura(g.cobertura_id, g.cobertura_actual_otra))),
+        ('¿Por qué no toma la cobertura?', ((Contacto.promocion_id,),
+                                            lambda g: etiqueta('promocion', g.promocion_id) or "No especificado")),
+        ('Privado/Desregulado', ((Contacto.privadoDesregulado,), lambda g: g.privadoDesregulado)),
+        ('Estado', ((Contacto.estado,), lambda g: g.estado)),
+    ])
+
+
+def etiqueta_mes(mes):
+    """'2025-07' -> 'July 2025'"""
+    return datetime.strptime(mes, '%Y-%m').strftime('%B %Y') if mes != SIN_FECHA else "Sin fecha"
+
+
+def filtro_mes(mes):
+    """Condición sobre Contacto.created_at para los contactos de un mes de carga"""
+    if mes == SIN_FECHA:
+        return Contacto.created_at.is_(None)
+    desde = datetime.strptime(mes, '%Y-%m')
+    hasta = (desde + timedelta(days=32)).replace(day=1)
+    return and_(Contacto.created_at >= desde, Contacto.created_at < hasta)
+
+
+def _celda(ws, valor, estilo='celda'):
+    """Celda con un estilo registrado por registrar_estilos; las vacías van sin formato"""
+    cell = WriteOnlyCell(ws, value=valor)
+    if valor is not None:
+        aplicar_estilo(cell, estilo)
+    return cell
+
+
+def _agregar_titulo(ws, titulo, ultima_columna):
+    """Título combinado en la fila 1, fila vacía y deja lista la fila 3 para encabezados"""
+    ws.merged_cells.add(f'A1:{ultima_columna}1')
+    ws.append([_celda(ws, titulo, 'titulo')])
+    ws.append([])
+
+
+def _agregar_encabezados(ws, encabezados, con_borde=False):
+    estilo = 'encabezado-bordeado' if con_borde else 'encabezado'
+    ws.append([_celda(ws, h, estilo) for h in encabezados])
+
+
+class ResumenExportacion:
+    """Agregados de las hojas de resumen.
+
+    Se leen de la tabla de estadísticas (ver estadisticas.py), que ya tiene
+    los contactos contados por grupo, así que el costo depende de la cantidad
+    de grupos y no de la de contactos.
+    """
+
+    def __init__(self, meses=None, campos=None, usuarios=None):
+        # meses: filas [mes, total, vendidos, abiertos, cerrados]
+        self.meses = meses or []
+        self.campos = campos or OrderedDict((campo, Counter()) for campo in _campos_estadisticas())
+        # usuarios: email -> [total, vendidos]
+        self.usuarios = usuarios or OrderedDict()
+
+    @classmethod
+    def desde_estadisticas(cls):
+        e = EstadisticaContacto
+        cantidad = func.sum(e.cantidad)
+
+        def por_estado(estado):
+            return func.sum(case((e.estado == estado, e.cantidad), else_=0))
+
+        meses = [list(fila) for fila in (db.session.query(e.mes, cantidad, por_estado('vendido'),
+                                                          por_estado('abierto'), por_estado('cerrado'))
+                                         .group_by(e.mes)
+                                         .order_by(e.mes))]
+
+        # Columnas con los nombres de Contacto que esperan las funciones de _campos_estadisticas
+        columnas = {
+            'origen_id': func.nullif(e.origen_id, 0).label('origen_id'),
+            'cobertura_id': func.nullif(e.cobertura_id, 0).label('cobertura_id'),
+            'cobertura_actual_otra': func.nullif(e.cobertura_otra, '').label('cobertura_actual_otra'),
+            'promocion_id': func.nullif(e.promocion_id, 0).label('promocion_id'),
+            'privadoDesregulado': func.nullif(e.privado_desregulado, '').label('privadoDesregulado'),
+            'estado': func.nullif(e.estado, '').label('estado'),
+        }
+        campos = OrderedDict()
+        for campo, (columnas_contacto, opcion_de) in _campos_estadisticas().items():
+            agrupadas = [columnas[columna.key] for columna in columnas_contacto]
+            conteo = Counter()
+            for grupo in db.session.query(*agrupadas, cantidad).group_by(*agrupadas):
+                opcion = opcion_de(grupo)
+                if opcion is not None:
+                    conteo[opcion] += grupo[-1]
+            campos[campo] = conteo
+
+        vendidos = por_estado('vendido')
+        usuarios = OrderedDict(
+            (email, [total, vendidos_usuario])
+            for email, vendidos_usuario, total in (db.session.query(Usuario.email, vendidos, cantidad)
+                                                   .join(Usuario, e.usuario_id == Usuario.id)
+                                                   .group_by(Usuario.id, Usuario.email)
+                                                   .order_by(vendidos.desc()))
+        )
+        return cls(meses, campos, usuarios)
+
+    @property
+    def total(self):
+        return sum(fila[1] for fila in self.meses)
+
+    def filas_mensuales(self):
+        for mes, total, vendidos, abiertos, cerrados in self.meses:
+            tasa = (vendidos / total * 100) if total > 0 else 0
+            yield [etiqueta_mes(mes), total, vendidos, abiertos, cerrados, f"{tasa:.1f}%"]
+
+    def filas_campos(self):
+        """Pares (nombre_campo, filas) con la distribución de cada campo"""
+        total = self.total
+        for campo, conteo in self.campos.items():
+            filas = [[campo, opcion, cantidad, f"{cantidad / total * 100:.1f}%"]
+                     for opcion, cantidad in conteo.most_common()]
+            yield campo, filas
+
+    def filas_ranking(self):
+        for posicion, (usuario, (total, vendidos)) in enumerate(self.usuarios.items(), 1):
+            tasa = round(vendidos / total * 100, 1)
+            yield [posicion, usuario, vendidos, total, f"{tasa:.1f}%"]
+
+
+class BloqueMes:
+    """Filas ya convertidas de un mes de la hoja "Base de Datos", con sus anchos"""
+
+    def __init__(self, mes, version, filas, anchos):
+        self.mes = mes
+        self.version = version
+        self.filas = filas
+        self.anchos = anchos
+
+    @staticmethod
+    def _ruta(mes, version, extension):
+        return os.path.join(BLOQUES_DIR, f"{mes}_v{version}.{extension}")
+
+    @property
+    def ruta_filas(self):
+        return self._ruta(self.mes, self.version, 'jsonl')
+
+    def leer_filas(self):
+        with open(self.ruta_filas, encoding='utf-8') as archivo:
+            for linea in archivo:
+                valores = json.loads(linea)
+                # La fecha de carga se guarda en formato ISO
+                if valores[COLUMNA_FECHA - 1] != "N/A":
+                    valores[COLUMNA_FECHA - 1] = date.fromisoformat(valores[COLUMNA_FECHA - 1])
+                yield valores
+
+    @classmethod
+    def cargar(cls, mes, version):
+        """Bloque guardado para esa versión del mes, o None si no existe"""
+        try:
+            with open(cls._ruta(mes, version, 'json'), encoding='utf-8') as archivo:
+                meta = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        return cls(mes, version, meta['filas'], meta['anchos'])
+
+    @classmethod
+    def construir(cls, mes, version):
+        """Lee de la base de datos los contactos del mes y guarda el bloque"""
+        if not os.path.exists(BLOQUES_DIR):
+            os.makedirs(BLOQUES_DIR)
+
+        anchos = AnchoColumnas()
+        anchos.observar([f"CONTACTOS CARGADOS EN {etiqueta_mes(mes).upper()}"])
+        anchos.observar(ENCABEZADOS_BASE_DATOS)
+        filas = 0
+        fd, temporal = tempfile.mkstemp(suffix='.tmp', dir=BLOQUES_DIR)
+        with os.fdopen(fd, 'w', encoding='utf-8') as archivo:
+            for c in consultar_contactos_admin().filter(filtro_mes(mes)):
+                valores = fila_contacto(c)
+                anchos.observar(valores)
+                archivo.write(json.dumps(valores, ensure_ascii=False, default=date.isoformat) + '\n')
+                filas += 1
+        bloque = cls(mes, version, filas, anchos.largos)
+        os.replace(temporal, bloque.ruta_filas)
+
+        # Los metadatos se escriben al final: si existen, las filas están completas
+        fd, temporal = tempfile.mkstemp(suffix='.tmp', dir=BLOQUES_DIR)
+        with os.fdopen(fd, 'w', encoding='utf-8') as archivo:
+            json.dump({'filas': filas, 'anchos': anchos.largos}, archivo, ensure_ascii=False)
+        os.replace(temporal, cls._ruta(mes, version, 'json'))
+
+        # Las versiones anteriores del mes ya no pueden volver a usarse; las
+        # posteriores las acaba de guardar otro proceso y puede estar leyéndolas
+        for nombre in os.listdir(BLOQUES_DIR):
+            coincidencia = _PATRON_BLOQUE.match(nombre)
+            if coincidencia and coincidencia.group('mes') == mes and int(coincidencia.group('version')) < version:
+                try:
+                    os.remove(os.path.join(BLOQUES_DIR, nombre))
+                except OSError:
+                    pass
+        return bloque
+
+
+def _sin_progreso(hoja, filas):
+    pass
+
+
+def preparar_bloques(progreso=_sin_progreso):
+    """Bloques de todos los meses con contactos; solo se reconstruyen los meses con cambios.
+
+    progreso("Base de Datos", 0) se llama después de cada mes: reconstruir
+    muchos meses lleva tiempo y el trabajo de exportación tiene que seguir
+    dando señales de vida.
+    """
+    bloques = []
+    reconstruidos = 0
+    # Los contactos sin fecha van primero, como en el orden por created_at
+    for mes, version in sorted(versiones_mes().items(), key=lambda item: (item[0] != SIN_FECHA, item[0])):
+        bloque = BloqueMes.cargar(mes, version)
+        if bloque is None:
+            bloque = BloqueMes.construir(mes, version)
+            reconstruidos += 1
+        if bloque.filas:
+            bloques.append(bloque)
+        progreso("Base de Datos", 0)
+    logging.info(f"Bloques mensuales: {len(bloques)} con contactos, {reconstruidos} recalculados")
+    return bloques
+
+
+def _hoja_base_de_datos(wb, bloques, progreso=_sin_progreso):
+    ws = wb.create_sheet(title="Base de Datos")
+
+    # En modo write-only los anchos deben declararse antes de la primera fila;
+    # cada bloque ya trae los anchos de sus columnas
+    anchos = AnchoColumnas()
+    for bloque in bloques:
+        anchos.combinar(bloque.anchos)
+    anchos.aplicar(ws)
+
+    ultima_columna = get_column_letter(len(ENCABEZADOS_BASE_DATOS))
+    current_row = 1
+    filas_escritas = 0
+    for bloque in bloques:
+        if current_row > 1:
+            # Espacio entre grupos
+            ws.append([])
+            current_row += 1
+
+        ws.merged_cells.add(f'A{current_row}:{ultima_columna}{current_row}')
+        banner = f"CONTACTOS CARGADOS EN {etiqueta_mes(bloque.mes).upper()}"
+        ws.append([_celda(ws, banner, 'banner-mes')])
+        _agregar_encabezados(ws, ENCABEZADOS_BASE_DATOS, con_borde=True)
+        current_row += 2
+
+        for valores in bloque.leer_filas():
+            celdas = [_celda(ws, v) for v in valores]
+            estado = valores[COLUMNA_ESTADO - 1]
+            if estado in ESTILO_ESTADO:
+                aplicar_estilo(celdas[COLUMNA_ESTADO - 1], ESTILO_ESTADO[estado])
+            if isinstance(valores[COLUMNA_FECHA - 1], date):
+                aplicar_estilo(celdas[COLUMNA_FECHA - 1], 'celda-fecha')
+            ws.append(celdas)
+            current_row += 1
+            filas_escritas += 1
+            if filas_escritas % TAMANO_LOTE == 0:
+                progreso(ws.title, filas_escritas)
+
+    progreso(ws.title, filas_escritas)
+    return filas_escritas
+
+
+def _hoja_resumen_mensual(wb, resumen):
+    ws = wb.create_sheet(title="Resumen Mensual")
+    titulo = "RESUMEN DE CONTACTOS POR MES"
+    encabezados = ["Mes", "Total Contactos", "Planes Vendidos", "Abiertos", "Cerrados", "Tasa de Efectividad"]
+    filas = list(resumen.filas_mensuales())
+
+    anchos = AnchoColumnas()
+    for valores in [[titulo], encabezados] + filas:
+        anchos.observar(valores)
+    anchos.aplicar(ws)
+
+    _agregar_titulo(ws, titulo, 'F')
+    _agregar_encabezados(ws, encabezados)
+    for valores in filas:
+        ws.append([_celda(ws, v, 'celda-centrada') for v in valores])
+    return ws
+
+
+def _hoja_estadisticas_campos(wb, resumen):
+    ws = wb.create_sheet(title="Estadísticas de Campos")
+    titulo = "DISTRIBUCIÓN DE OPCIONES SELECCIONADAS"
+    encabezados = ["Campo", "Opción", "Cantidad", "Porcentaje"]
+    bloques = [(f"DISTRIBUCIÓN DE {campo.upper()}", filas) for campo, filas in resumen.filas_campos()]
+
+    anchos = AnchoColumnas()
+    anchos.observar([titulo])
+    anchos.observar(encabezados)
+    for banner, filas in bloques:
+        anchos.observar([banner])
+        for valores in filas:
+            anchos.observar(valores)
+    anchos.aplicar(ws)
+
+    _agregar_titulo(ws, titulo, 'D')
+    _agregar_encabezados(ws, encabezados)
+    current_row = 4
+    for banner, filas in bloques:
+        ws.merged_cells.add(f'A{current_row}:D{current_row}')
+        ws.append([_celda(ws, banner, 'banner-campo')])
+        for valores in filas:
+            ws.append([_celda(ws, v, 'celda-centrada') for v in valores])
+        # Espacio entre campos
+        ws.append([])
+        current_row += len(filas) + 2
+    return ws
+
+
+def _hoja_ranking_usuarios(wb, resumen):
+    ws = wb.create_sheet(title="Ranking de Usuarios")
+    titulo = "RANKING DE USUARIOS POR VENTAS"
+    encabezados = ["Posición", "Usuario", "Contactos Vendidos", "Total Contactos", "Tasa de Éxito"]
+    filas = list(resumen.filas_ranking())
+
+    anchos = AnchoColumnas()
+    for valores in [[titulo], encabezados] + filas:
+        anchos.observar(valores)
+    anchos.aplicar(ws)
+
+    _agregar_titulo(ws, titulo, 'E')
+    _agregar_encabezados(ws, encabezados)
+    for valores in filas:
+        estilo = ESTILO_PODIO.get(valores[0], 'celda-centrada')
+        ws.append([_celda(ws, v, estilo) for v in valores])
+    return ws
+
+
+def generar_libro_admin(destino, progreso=_sin_progreso):
+    """Genera el libro de exportación del admin y lo guarda en destino (ruta o archivo).
+
+    progreso(hoja, filas) se llama al comenzar cada hoja, después de preparar
+    cada mes, cada TAMANO_LOTE filas escritas y antes de guardar el archivo.
+    """
+    wb = registrar_estilos(openpyxl.Workbook(write_only=True))
+
+    # Solo se leen de la base de datos las filas de los meses con cambios;
+    # los resúmenes salen de la tabla de estadísticas
+    progreso("Base de Datos", 0)
+    bloques = preparar_bloques(progreso)
+    resumen = ResumenExportacion.desde_estadisticas()
+    total = _hoja_base_de_datos(wb, bloques, progreso)
+    progreso("Resumen Mensual", total)
+    _hoja_resumen_mensual(wb, resumen)
+    progreso("Estadísticas de Campos", total)
+    _hoja_estadisticas_campos(wb, resumen)
+    progreso("Ranking de Usuarios", total)
+    _hoja_ranking_usuarios(wb, resumen)
+
+    # Última señal de vida antes de comprimir y escribir el archivo
+    progreso("Ranking de Usuarios", total)
+    wb.save(destino)
+    logging.info(f"Libro de exportación generado con {total} contactos")
+    return total
+
+
+ENCABEZADOS_MIS_CONTACTOS = ENCABEZADOS_BASE_DATOS[:-1]
+
+
+def consultar_contactos_usuario(usuario_id):
+    """Contactos de un usuario por fecha de carga, leídos por lotes con el índice (usuario_id, created_at)"""
+    return consultar_contactos_admin().filter(Contacto.usuario_id == usuario_id)
+
+
+def generar_libro_usuario(usuario_id, destino, progreso=_sin_progreso):
+    """Genera el libro "Mis Contactos" de un usuario y lo guarda en destino"""
+    wb = registrar_estilos(openpyxl.Workbook(write_only=True))
+    ws = wb.create_sheet(title="Mis Contactos")
+    progreso(ws.title, 0)
+
+    _agregar_encabezados(ws, ENCABEZADOS_MIS_CONTACTOS)
+    filas_escritas = 0
+    for c in consultar_contactos_usuario(usuario_id):
+        valores = fila_contacto(c)[:-1]
+        fila = [v if v is not None else "" for v in valores]
+        if isinstance(fila[COLUMNA_FECHA - 1], date):
+            fila[COLUMNA_FECHA - 1] = _celda(ws, fila[COLUMNA_FECHA - 1], 'fecha')
+        ws.append(fila)
+        filas_escritas += 1
+        if filas_escritas % TAMANO_LOTE == 0:
+            progreso(ws.title, filas_escritas)
+
+    progreso(ws.title, filas_escritas)
+    wb.save(destino)
+    logging.info(f"Libro de exportación del usuario {usuario_id} generado con {filas_escritas} contactos")
+    return filas_escritas
+
+
+ENCABEZADOS_CSV = ENCABEZADOS_MIS_CONTACTOS
+ENCABEZADOS_CSV_ADMIN = ENCABEZADOS_BASE_DATOS
+
+
+def fila_csv(c, con_usuario=False):
+    """Fila de la exportación CSV: valores tal como están cargados, sin normalizar"""
+    cobertura = clave('cobertura', c.cobertura_id)
+    fila = [
+        clave('origen', c.origen_id) or "",
+        c.cobertura_actual_otra if cobertura == COBERTURA_OTRA else (cobertura or ""),
+        clave('promocion', c.promocion_id) or "No especificado",
+        c.privadoDesregulado or "",
+        c.apellido_nombre or "",
+        c.correo_electronico or "",
+        c.edad_titular or "",
+        c.telefono or "",
+        c.grupo_familiar or "",
+        c.plan_ofrecido or "",
+        c.estado or "",
+        c.observaciones or "",
+        c.conyuge or "",
+        c.conyuge_edad or "",
+        c.created_at.strftime("%d/%m/%Y") if c.created_at else "N/A"
+    ]
+    if con_usuario:
+        fila.append(c.email or "")
+    return fila
+
+
+def generar_csv(consulta, con_usuario=False):
+    """Generador de bloques CSV codificados en UTF-8, uno cada TAMANO_LOTE filas.
+
+    La consulta se recorre por lotes, así que la memoria usada y el tiempo
+    hasta el primer byte no dependen de la cantidad de contactos.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def vaciar():
+        bloque = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return bloque
+
+    writer.writerow(ENCABEZADOS_CSV_ADMIN if con_usuario else ENCABEZADOS_CSV)
+    yield vaciar()
+
+    filas = 0
+    for c in consulta:
+        writer.writerow(fila_csv(c, con_usuario))
+        filas += 1
+        if filas % TAMANO_LOTE == 0:
+            yield vaciar()
+    if buffer.tell():
+        yield vaciar()
+    logging.info(f"Exportación CSV completada: {filas} contactos")
+
+
+# Exportación columnar (Parquet / Arrow IPC) para análisis: valores crudos y tipados
+COLUMNAS_COLUMNAR = [
+    'id', 'origen', 'cobertura_actual', 'cobertura_actual_otra', 'promocion', 'privadoDesregulado',
+    'apellido_nombre', 'correo_electronico', 'edad_titular', 'telefono', 'grupo_familiar',
+    'plan_ofrecido', 'fecha', 'estado', 'observaciones', 'conyuge', 'conyuge_edad', 'created_at',
+    'usuario_email'
+]
+COLUMNAS_CATEGORICAS = ('origen', 'estado', 'cobertura_actual', 'promocion', 'privadoDesregulado', 'conyuge')
+# Columnas con el id de una opción (ver opciones.py) que se exportan con su clave
+COLUMNAS_OPCION = {'origen': 'origen', 'cobertura_actual': 'cobertura', 'promocion': 'promocion'}
+COLUMNAS_ENTERAS = ('edad_titular', 'conyuge_edad', 'grupo_familiar')
+
+FORMATOS_COLUMNAR = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'feather': ('feather', 'application/vnd.apache.arrow.file'),
+}
+
+
+def consultar_contactos_columnar(incluir_archivo=False):
+    fuente = fuente_contactos(incluir_archivo)
+    columnas = [getattr(fuente, f"{COLUMNAS_OPCION[columna]}_id").label(columna) if columna in COLUMNAS_OPCION
+                else getattr(fuente, columna) for columna in COLUMNAS_COLUMNAR[:-1]]
+    return (db.session.query(*columnas, Usuario.email.label('usuario_email'))
+            .join(Usuario, fuente.usuario_id == Usuario.id)
+            .order_by(fuente.id)
+            .execution_options(yield_per=TAMANO_LOTE))
+
+
+def _esquema_columnar():
+    import pyarrow as pa
+
+    tipos = {columna: pa.string() for columna in COLUMNAS_COLUMNAR}
+    tipos['id'] = pa.int64()
+    tipos['created_at'] = pa.timestamp('us')
+    tipos['fecha'] = pa.date32()
+    for columna in COLUMNAS_ENTERAS:
+        tipos[columna] = pa.int16()
+    for columna in COLUMNAS_CATEGORICAS:
+        tipos[columna] = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([(columna, tipos[columna]) for columna in COLUMNAS_COLUMNAR])
+
+
+def _categorias():
+    """Categorías fijas de cada columna categórica, así todos los lotes comparten el diccionario.
+
+    Salen de las tablas de opciones o de los valores posibles del tipo de la columna.
+    """
+    categorias = {}
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in COLUMNAS_OPCION:
+            valores = [o.clave for o in catalogo(COLUMNAS_OPCION[columna]).opciones]
+        else:
+            valores = sorted(getattr(Contacto, columna).type.enums)
+        categorias[columna] = pd.CategoricalDtype(valores)
+    return categorias
+
+
+def _lotes_columnares(consulta):
+    """DataFrames tipados de TAMANO_LOTE filas"""
+    categorias = _categorias()
+    claves_opcion = {columna: {o.id: o.clave for o in catalogo(campo).opciones}
+                     for columna, campo in COLUMNAS_OPCION.items()}
+    filas = iter(consulta)
+    while True:
+        lote = list(islice(filas, TAMANO_LOTE))
+        if not lote:
+            return
+        df = pd.DataFrame.from_records([tuple(fila) for fila in lote], columns=COLUMNAS_COLUMNAR)
+        for columna in COLUMNAS_ENTERAS:
+            df[columna] = df[columna].astype('Int16')
+        for columna, claves in claves_opcion.items():
+            df[columna] = df[columna].map(claves)
+        for columna, tipo in categorias.items():
+            df[columna] = df[columna].astype(tipo)
+        yield df
+
+
+def generar_columnar(destino, formato='parquet', incluir_archivo=False):
+    """Escribe todos los contactos en Parquet o Arrow IPC (Feather v2), por lotes.
+
+    Con incluir_archivo también escribe los archivados. Requiere pyarrow.
+    Devuelve la cantidad de filas escritas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if formato not in FORMATOS_COLUMNAR:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    esquema = _esquema_columnar()
+    if formato == 'parquet':
+        writer = pq.ParquetWriter(destino, esquema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(destino, esquema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    filas = 0
+    with writer:
+        for df in _lotes_columnares(consultar_contactos_columnar(incluir_archivo)):
+            writer.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+            filas += len(df)
+    logging.info(f"Exportación {formato} generada con {filas} contactos")
+    return filas
@@ -1,6 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, SelectField, TextAreaField, PasswordField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, Optional
+from wtforms import StringField, SubmitField, SelectField, TextAreaField, PasswordField, IntegerField
+from wtforms.validators import DataRequired, Email, EqualTo, Length, Optional, NumberRange
+
+from opciones import catalogo
 
 class RegisterForm(FlaskForm):
     email = StringField('Correo electrónico', validators=[DataRequired(), Email()])
@@ -11,40 +13,6 @@ class RegisterForm(FlaskForm):
 
 
 class ContactoForm(FlaskForm):
-    OPCIONES_ORIGEN = [
-        ('', 'Seleccione...'),
-        ('propio', 'Propio'),
-        ('elegi mejor', 'Elegi Mejor'),
-        ('wise', 'Wise'),
-        ('guardia', 'Guardia'),
-        ('broker', 'Broker')
-    ]
-
-    OPCIONES_COBERTURA = [
-        ('', 'Seleccione...'),
-        ('smg', 'SMG'),
-        ('osde', 'OSDE'),
-        ('prevencion', 'Prevencion'),
-        ('sancor', 'Sancor'),
-        ('medife', 'Medife'),
-        ('obra social', 'Obra social'),
-        ('otros', 'Otros')
-    ]
-
-    OPCIONES_PROMOCION = [
-        ('', 'Seleccione...'),
-        ('promocion sancor', 'Promocion Sancor'),
-        ('promocion medicus', 'Promocion Medicus'),
-        ('promocion omint', 'Promocion Omint'),
-        ('promocion prevencion', 'Promocion Prevencion'),
-        ('promocion smg', 'Promocion SMG'),
-        ('promocion medife', 'Promocion Medife'),
-        ('osde', 'Osde'),
-        ('servicios insatisfactorios', 'Servicios insatisfactorios'),
-        ('no puede pagarlo', 'No puede pagarlo'),
-        ('otros prepagos', 'Otros prepagos')
-    ]
-
     OPCIONES_CONYUGE = [
         ('', 'Seleccione...'),
         ('sin conyuge', 'Sin cónyuge'),
@@ -54,12 +22,13 @@ class ContactoForm(FlaskForm):
     class Meta:
         csrf = True  # Habilitar protección CSRF explícitamente
     
-    origen = SelectField('Origen', choices=OPCIONES_ORIGEN, validators=[DataRequired(message="Por favor seleccione un origen")])
+    # Las opciones de origen, cobertura y promoción se cargan de sus tablas en __init__
+    origen = SelectField('Origen', validators=[DataRequired(message="Por favor seleccione un origen")])
     
-    cobertura_actual = SelectField('Cobertura Actual', choices=OPCIONES_COBERTURA, validators=[DataRequired(message="Por favor seleccione una cobertura")])
+    cobertura_actual = SelectField('Cobertura Actual', validators=[DataRequired(message="Por favor seleccione una cobertura")])
     cobertura_actual_otra = StringField('Especificar otra cobertura')
     
-    promocion = SelectField('¿Por qué no toma la cobertura?', choices=OPCIONES_PROMOCION, validators=[Optional()])
+    promocion = SelectField('¿Por qué no toma la cobertura?', validators=[Optional()])
 
     privadoDesregulado = SelectField('Privado/Desregulado',
         choices=[('', 'Seleccione...'), ('privado', 'Privado'), ('desregulado', 'Desregulado')],
@@ -67,9 +36,9 @@ class ContactoForm(FlaskForm):
     
     apellido_nombre = StringField('Apellido y nombre', validators=[DataRequired()])
     correo_electronico = StringField('Correo electrónico', validators=[DataRequired(), Email()])
-    edad_titular = StringField('Edad titular', validators=[DataRequired()])
+    edad_titular = IntegerField('Edad titular', validators=[DataRequired(), NumberRange(min=1, max=120)])
     telefono = StringField('Teléfono', validators=[DataRequired()])
-    grupo_familiar = StringField('Grupo familiar', validators=[DataRequired()])
+    grupo_familiar = IntegerField('Grupo familiar', validators=[DataRequired(), NumberRange(min=1, max=30)])
     plan_ofrecido = StringField('Plan ofrecido', validators=[DataRequired()])
     estado = SelectField('Estado',
         choices=[
@@ -83,6 +52,13 @@ class ContactoForm(FlaskForm):
     observaciones = TextAreaField('Observaciones')
     
     conyuge = SelectField('Cónyuge', choices=OPCIONES_CONYUGE, validators=[DataRequired(message="Por favor seleccione una opción")])
-    conyuge_edad = StringField('Edad del cónyuge')
+    conyuge_edad = IntegerField('Edad del cónyuge', validators=[Optional(), NumberRange(min=1, max=120)])
     
-    submit = SubmitField('Agregar contacto')
\ No newline at end of file
+    submit = SubmitField('Agregar contacto')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        vacia = [('', 'Seleccione...')]
+        self.origen.choices = vacia + catalogo('origen').choices()
+        self.cobertura_actual.choices = vacia + catalogo('cobertura').choices()
+        self.promocion.choices = vacia + catalogo('promocion').choices()
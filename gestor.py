@@ -1,25 +1,32 @@
 from dotenv import load_dotenv
 import os
-from flask import Flask, redirect, url_for, render_template, session, send_file, flash, request, jsonify, Response, make_response
+import click
+from flask import Flask, redirect, url_for, render_template, session, send_file, flash, request, jsonify, Response, make_response, stream_with_context
 from auth import auth_bp 
-from models import db, Usuario
+from models import db, Usuario, Contacto, TrabajoExportacion, ESTADOS
 from form import ContactoForm
-import pandas as pd
 from flask_login import LoginManager, login_required, current_user, AnonymousUserMixin
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.chart import PieChart, Reference
-from openpyxl.utils import get_column_letter
 from email_utils import mail, init_serializer
+from exportacion import generar_libro_admin, generar_libro_usuario, generar_csv, consultar_contactos_admin, consultar_contactos_usuario, generar_columnar, FORMATOS_COLUMNAR
+from cache_exportacion import abrir_libro, libro_en_memoria, asegurar_versiones_mes
+from estadisticas import estadisticas_panel, asegurar_estadisticas, reconstruir_estadisticas
+from baja_usuarios import BajaInvalida, eliminar_usuario_por_email
+from archivo_contactos import DIAS_PARA_ARCHIVAR, TAMANO_LOTE_ARCHIVO, archivar_contactos
+from busqueda_contactos import asegurar_indice_busqueda, reconstruir_indice_busqueda
+from duplicados_contactos import aviso_duplicados, contactos_existentes, reportar_duplicados
+from similares_contactos import GRUPOS_POR_PAGINA, UMBRAL_SIMILITUD, agrupar_similares, generar_libro_similares, pagina_similares, resumen_similares
+from listado_contactos import pagina_contactos, pagina_contactos_usuario, contar_contactos, ParametroInvalido, LIMITE_POR_DEFECTO
+from opciones import COBERTURA_OTRA, MODELOS as CAMPOS_OPCIONES, OpcionInvalida, actualizar as actualizar_opciones, agregar_opcion, catalogo
+from trabajos_exportacion import encolar_trabajo, estado_trabajo, reanudar_trabajos, limpiar_en_segundo_plano
 from flask_migrate import Migrate
-from werkzeug.security import generate_password_hash
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
 import logging
+import threading
 from datetime import timedelta, datetime
 import pytz
 from flask_wtf.csrf import CSRFProtect
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Border, Side
-import glob
 
 # Configurar logging primero
 logging.basicConfig(
@@ -104,460 +111,237 @@ def load_user(user_id):
     except (ValueError, TypeError):
         return None
 
-# Crear la base de datos SQLite
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def preparar_base_de_datos():
+    """Crea las tablas solo en una base sin migraciones.
+
+    Una base nueva se crea completa y queda marcada con la última migración.
+    En una base con migraciones el esquema lo cambia solo "flask db upgrade":
+    si las tablas se crearan al importar la aplicación, las migraciones que
+    las agregan fallarían con "table ... already exists".
+    """
+    tablas = inspect(db.engine).get_table_names()
+    if 'alembic_version' in tablas:
+        return
+    db.create_all()
+    if not tablas:
+        with db.engine.begin() as conexion:
+            MigrationContext.configure(conexion).stamp(ScriptDirectory(DIRECTORIO_MIGRACIONES), 'head')
+    logging.info("Base de datos SQLite creada/verificada exitosamente")
+
+# Crear la base de datos SQLite si todavía no existe
 with gestor.app_context():
-    from models import Contacto
     try:
         # Asegurar que el directorio instance existe para SQLite
         instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
         if not os.path.exists(instance_path):
             os.makedirs(instance_path)
             logging.info(f"Directorio instance creado: {instance_path}")
-        
-        db.create_all()
-        logging.info("Base de datos SQLite creada/verificada exitosamente")
-        
+        preparar_base_de_datos()
     except Exception as e:
         logging.error(f"Error al crear la base de datos SQLite: {str(e)}")
         # Continuar sin la base de datos para evitar que la aplicación falle completamente
 
-# Configurar manejo de usuarios anónimos
-login_manager.anonymous_user = Anonymous
+_aplicacion_preparada = False
+_preparacion_lock = threading.Lock()
+
+@gestor.before_request
+def preparar_aplicacion():
+    """Tareas de arranque que necesitan el esquema al día; corren con el primer pedido de cada proceso.
+
+    No corren al importar la aplicación para que "flask db upgrade" y los
+    demás comandos no toquen una base a la que le faltan migraciones.
+    """
+    global _aplicacion_preparada
+    if _aplicacion_preparada:
+        return
+    with _preparacion_lock:
+        if _aplicacion_preparada:
+            return
+        try:
+            asegurar_versiones_mes()
+            asegurar_estadisticas()
+            asegurar_indice_busqueda()
+
+            # Retomar exportaciones que quedaron pendientes antes del reinicio
+            reanudar_trabajos(gestor)
+            limpiar_en_segundo_plano(gestor)
+        except Exception as e:
+            logging.error(f"Error al preparar la aplicación: {str(e)}")
+        _aplicacion_preparada = True
 
-def limpiar_archivos_temporales():
-    """Eliminar archivos Excel temporales antiguos (más de 1 hora)"""
+@gestor.before_request
+def actualizar_catalogo_opciones():
+    """Toma las opciones agregadas con "flask agregar-opcion" desde otro proceso"""
+    if request.path.startswith('/static/'):
+        return
     try:
-        import os
-        import time
-        
-        # Limpiar archivos .xlsx en el directorio raíz
-        for archivo in glob.glob("*.xlsx"):
-            if os.path.exists(archivo):
-                tiempo_modificacion = os.path.getmtime(archivo)
-                tiempo_actual = time.time()
-                # Eliminar archivos más antiguos de 1 hora
-                if tiempo_actual - tiempo_modificacion > 3600:
-                    os.remove(archivo)
-                    logging.info(f"Archivo temporal eliminado: {archivo}")
-        
-        # Limpiar archivos en el directorio temp
-        temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
-        if os.path.exists(temp_dir):
-            for archivo in glob.glob(os.path.join(temp_dir, "*.xlsx")):
-                if os.path.exists(archivo):
-                    tiempo_modificacion = os.path.getmtime(archivo)
-                    tiempo_actual = time.time()
-                    # Eliminar archivos más antiguos de 1 hora
-                    if tiempo_actual - tiempo_modificacion > 3600:
-                        os.remove(archivo)
-                        logging.info(f"Archivo temporal eliminado: {archivo}")
+        actualizar_opciones()
     except Exception as e:
-        logging.error(f"Error al limpiar archivos temporales: {str(e)}")
+        logging.error(f"Error al actualizar las opciones: {str(e)}")
+
+@gestor.cli.command('reconstruir-estadisticas')
+def reconstruir_estadisticas_comando():
+    """Recalcula la tabla de estadísticas de contactos desde cero"""
+    grupos = reconstruir_estadisticas()
+    print(f"Estadísticas reconstruidas: {grupos} grupos")
+
+@gestor.cli.command('reconstruir-busqueda')
+def reconstruir_busqueda_comando():
+    """Vuelve a cargar el índice de texto completo de los contactos"""
+    reconstruir_indice_busqueda()
+    print("Índice de búsqueda reconstruido")
+
+@gestor.cli.command('agregar-opcion')
+@click.argument('campo', type=click.Choice(list(CAMPOS_OPCIONES)))
+@click.argument('clave')
+@click.argument('etiqueta')
+def agregar_opcion_comando(campo, clave, etiqueta):
+    """Agrega una opción de origen, cobertura o promoción (p. ej. una prepaga nueva)"""
+    try:
+        opcion_id = agregar_opcion(campo, clave, etiqueta)
+    except OpcionInvalida as e:
+        raise click.ClickException(str(e))
+    print(f"Opción agregada en {campo} con id {opcion_id}")
+
+@gestor.cli.command('eliminar-usuario')
+@click.argument('email')
+@click.option('--reasignar-a', default=None, help='Email del usuario que recibe los contactos')
+def eliminar_usuario_comando(email, reasignar_a):
+    """Elimina un usuario y borra sus contactos, o los pasa a otro usuario"""
+    try:
+        cantidad = eliminar_usuario_por_email(email, reasignar_a)
+    except BajaInvalida as e:
+        raise click.ClickException(str(e))
+    if cantidad is None:
+        raise click.ClickException(f'No existe el usuario {email}')
+    accion = f"reasignados a {reasignar_a}" if reasignar_a else "eliminados"
+    print(f"Usuario {email} eliminado; {cantidad} contactos {accion}")
+
+@gestor.cli.command('archivar-contactos')
+@click.option('--dias', default=DIAS_PARA_ARCHIVAR, show_default=True,
+              help='Antigüedad mínima de los contactos cerrados o vendidos a archivar')
+@click.option('--lote', default=TAMANO_LOTE_ARCHIVO, show_default=True, help='Contactos movidos por transacción')
+def archivar_contactos_comando(dias, lote):
+    """Mueve los contactos cerrados o vendidos viejos a la tabla de archivados (tarea programada)"""
+    archivados = archivar_contactos(dias, lote)
+    print(f"Contactos archivados: {archivados}")
+
+@gestor.cli.command('reportar-duplicados')
+@click.argument('destino', type=click.File('w', encoding='utf-8'), default='-')
+def reportar_duplicados_comando(destino):
+    """Escribe un CSV con los grupos de contactos que repiten teléfono o email (sin DESTINO, en pantalla)"""
+    grupos, contactos = reportar_duplicados(destino)
+    click.echo(f"Contactos repetidos: {grupos} grupos, {contactos} contactos", err=True)
+
+@gestor.cli.command('agrupar-similares')
+@click.option('--umbral', default=UMBRAL_SIMILITUD, show_default=True, type=click.FloatRange(0, 1),
+              help='Parecido mínimo (de 0 a 1) para agrupar dos contactos')
+def agrupar_similares_comando(umbral):
+    """Agrupa los contactos parecidos para revisarlos en /admin/similares (tarea programada)"""
+    grupos, contactos = agrupar_similares(umbral)
+    print(f"Contactos similares: {grupos} grupos, {contactos} contactos")
+
+# Configurar manejo de usuarios anónimos
+login_manager.anonymous_user = Anonymous
 
 @gestor.route('/admin')
 @login_required
 def admin():
     if not current_user.is_admin:
         return redirect(url_for('auth.login'))
-    contactos = Contacto.query.all()
-    return render_template('admin.html', contactos=contactos, now=datetime.now)
+    # La tabla se carga por páginas desde /contactos/buscar; acá solo van los totales
+    estadisticas = estadisticas_panel()
+    usuarios = db.session.query(Usuario.id, Usuario.email).order_by(Usuario.email).all()
+    return render_template('admin.html', estadisticas=estadisticas, usuarios=usuarios,
+                           opciones_origen=catalogo('origen').choices(),
+                           opciones_cobertura=catalogo('cobertura').choices())
+
+@gestor.route('/admin/similares')
+@login_required
+def admin_similares():
+    """Grupos de contactos parecidos calculados por "flask agrupar-similares", por páginas"""
+    if not current_user.is_admin:
+        return redirect(url_for('auth.login'))
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    total_grupos, calculado_at = resumen_similares()
+    return render_template('similares.html', grupos=pagina_similares(pagina), pagina=pagina,
+                           total_grupos=total_grupos, calculado_at=calculado_at,
+                           hay_siguiente=pagina * GRUPOS_POR_PAGINA < total_grupos)
 
-@gestor.route('/exportar_contactos')
+@gestor.route('/admin/similares/descargar')
 @login_required
-def exportar_contactos():
+def descargar_similares():
     if not current_user.is_admin:
         return redirect(url_for('auth.login'))
-    
-    # Limpiar archivos temporales antes de generar nuevo archivo
-    limpiar_archivos_temporales()
-    
-    # Forzar recarga de datos desde la base de datos
-    db.session.expire_all()
-    contactos = Contacto.query.all()
-    
-    # Log para verificar cuántos contactos se están exportando
-    logging.info(f"Exportando {len(contactos)} contactos para admin {current_user.email}")
-    
-    # Agregar timestamp al nombre del archivo para evitar caché
+    try:
+        archivo = libro_en_memoria(generar_libro_similares)
+    except Exception as e:
+        logging.error(f"Error generando libro de contactos similares: {str(e)}")
+        return jsonify({'error': 'Error al crear el archivo Excel'}), 500
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"contactos_{timestamp}.xlsx"
-    
-    # Función para normalizar texto
-    def normalize_text(text):
-        if text:
-            # Convertir a minúsculas y capitalizar la primera letra
-            return text.strip().lower().capitalize()
-        return text
-    
-    data = [{
-        "Origen": normalize_text(c.origen),
-        "Cobertura Actual": normalize_text(c.cobertura_actual_otra) if c.cobertura_actual == 'otros' else c.cobertura_actual,
-        "¿Por qué no toma la cobertura?": normalize_text(c.promocion) if c.promocion else "No especificado",
-        "Privado/Desregulado": c.privadoDesregulado,
-        "Apellido y nombre": c.apellido_nombre,
-        "Correo electrónico": c.correo_electronico,
-        "Edad titular": c.edad_titular,
-        "Teléfono": c.telefono,
-        "Grupo familiar": c.grupo_familiar,
-        "Plan ofrecido": c.plan_ofrecido,
-        "Estado": c.estado,
-        "Observaciones": c.observaciones,
-        "Cónyuge": c.conyuge,
-        "Edad cónyuge": c.conyuge_edad,
-        "Fecha de carga": c.created_at.strftime("%d/%m/%Y"),
-        "Usuario cargador": c.usuario.email
-    } for c in contactos]
-    
-    df = pd.DataFrame(data)
-    
-    # Crear un nuevo libro de Excel
-    wb = openpyxl.Workbook()
-    
-    # Configurar estilos generales
-    header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=11)
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    month_fill = PatternFill(start_color="E2EFDA", end_color="E2EFDA", fill_type="solid")
-    month_font = Font(bold=True, size=11, color="1F4E78")
-    
-    # Crear la hoja de datos
-    ws_data = wb.active
-    ws_data.title = "Base de Datos"
-
-    # Ordenar los datos por fecha de carga
-    df['Mes de carga'] = pd.to_datetime(df['Fecha de carga'], format='%d/%m/%Y').dt.strftime('%B %Y')
-    df = df.sort_values('Fecha de carga')
-
-    # Agrupar por mes
-    grupos_mes = df.groupby('Mes de carga')
-
-    # Fila actual para ir agregando datos
-    current_row = 1
-
-    for mes, grupo in grupos_mes:
-        # Agregar encabezado del mes
-        ws_data.merge_cells(f'A{current_row}:P{current_row}')
-        mes_cell = ws_data[f'A{current_row}']
-        mes_cell.value = f"CONTACTOS CARGADOS EN {mes.upper()}"
-        mes_cell.fill = month_fill
-        mes_cell.font = month_font
-        mes_cell.alignment = Alignment(horizontal="center", vertical="center")
-        current_row += 1
-
-        # Agregar encabezados de columnas
-        headers = [
-            "Origen", "Cobertura Actual", "¿Por qué no toma la cobertura?", "Privado/Desregulado",
-            "Apellido y nombre", "Correo electrónico", "Edad titular",
-            "Teléfono", "Grupo familiar", "Plan ofrecido",
-            "Estado", "Observaciones", "Cónyuge", "Edad cónyuge", "Fecha de carga", "Usuario cargador"
-        ]
-
-        for col, header in enumerate(headers, 1):
-            cell = ws_data.cell(row=current_row, column=col)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        current_row += 1
-
-        # Agregar datos del grupo
-        for _, row in grupo.iterrows():
-            ws_data.cell(row=current_row, column=1).value = row['Origen']
-            ws_data.cell(row=current_row, column=2).value = row['Cobertura Actual']
-            ws_data.cell(row=current_row, column=3).value = row['¿Por qué no toma la cobertura?']
-            ws_data.cell(row=current_row, column=4).value = row['Privado/Desregulado']
-            ws_data.cell(row=current_row, column=5).value = row['Apellido y nombre']
-            ws_data.cell(row=current_row, column=6).value = row['Correo electrónico']
-            ws_data.cell(row=current_row, column=7).value = row['Edad titular']
-            ws_data.cell(row=current_row, column=8).value = row['Teléfono']
-            ws_data.cell(row=current_row, column=9).value = row['Grupo familiar']
-            ws_data.cell(row=current_row, column=10).value = row['Plan ofrecido']
-            ws_data.cell(row=current_row, column=11).value = row['Estado']
-            ws_data.cell(row=current_row, column=12).value = row['Observaciones']
-            ws_data.cell(row=current_row, column=13).value = row['Cónyuge']
-            ws_data.cell(row=current_row, column=14).value = row['Edad cónyuge']
-            ws_data.cell(row=current_row, column=15).value = row['Fecha de carga']
-            ws_data.cell(row=current_row, column=16).value = row['Usuario cargador']
-
-            # Aplicar estilo según el estado
-            estado_cell = ws_data.cell(row=current_row, column=11)
-            if row['Estado'] == 'abierto':
-                estado_cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-                estado_cell.font = Font(color="006100")
-            elif row['Estado'] == 'cerrado':
-                estado_cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-                estado_cell.font = Font(color="9C0006")
-            elif row['Estado'] == 'vendido':
-                estado_cell.fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-                estado_cell.font = Font(color="1F4E78")
-            elif row['Estado'] == 'vendido':
-                estado_cell.fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-                estado_cell.font = Font(color="1F4E78")
-
-            current_row += 1
-
-        # Agregar espacio entre grupos
-        current_row += 1
-
-    # Ajustar ancho de columnas
-    for column in ws_data.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws_data.column_dimensions[column_letter].width = min(adjusted_width, 30)
-
-    # Agregar bordes a todas las celdas con datos
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    return send_file(
+        archivo,
+        as_attachment=True,
+        download_name=f"contactos_similares_{timestamp}.xlsx",
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
 
-    for row in ws_data.iter_rows(min_row=1, max_row=ws_data.max_row):
-        for cell in row:
-            if cell.value is not None:
-                cell.border = border
-                if not cell.alignment:
-                    cell.alignment = Alignment(horizontal="left", vertical="center")
+@gestor.route('/contactos/buscar')
+@login_required
+def contactos_buscar():
+    """Tabla del admin y búsqueda de contactos, paginada por clave.
+
+    Filtros: nombre, email, telefono, estado, desde, hasta y, para el admin,
+    origen, cobertura, usuario_id y archivo. Un vendedor solo ve sus
+    contactos. La primera página (sin cursor) trae además el total.
+    """
+    incluir_archivo = _incluir_archivo(request.args)
+    try:
+        contactos, siguiente = pagina_contactos(
+            filtros=request.args,
+            orden=request.args.get('orden', 'created_at'),
+            direccion=request.args.get('direccion', 'desc'),
+            cursor=request.args.get('cursor'),
+            limite=request.args.get('limite', LIMITE_POR_DEFECTO, type=int),
+            usuario=current_user,
+            incluir_archivo=incluir_archivo
+        )
+        respuesta = {'success': True, 'contactos': contactos, 'siguiente': siguiente}
+        if not request.args.get('cursor'):
+            respuesta['total'] = contar_contactos(request.args, current_user, incluir_archivo)
+    except ParametroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error al buscar contactos: {str(e)}")
+        return jsonify({'success': False, 'message': 'Error al cargar los contactos'}), 500
+    return jsonify(respuesta)
 
-    # Agregar una nueva hoja de resumen por mes
-    ws_monthly = wb.create_sheet(title="Resumen Mensual")
-    
-    # Título
-    ws_monthly.merge_cells('A1:F1')
-    ws_monthly['A1'] = "RESUMEN DE CONTACTOS POR MES"
-    ws_monthly['A1'].font = Font(size=16, bold=True, color="1F4E78")
-    ws_monthly['A1'].alignment = Alignment(horizontal="center")
-    
-    # Encabezados
-    headers = ["Mes", "Total Contactos", "Planes Vendidos", "Abiertos", "Cerrados", "Tasa de Efectividad"]
-    for col, header in enumerate(headers, 1):
-        cell = ws_monthly.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Datos por mes
-    current_row = 4
-    for mes, grupo in grupos_mes:
-        total = len(grupo)
-        vendidos = len(grupo[grupo['Estado'] == 'vendido'])
-        abiertos = len(grupo[grupo['Estado'] == 'abierto'])
-        cerrados = len(grupo[grupo['Estado'] == 'cerrado'])
-        tasa = (vendidos / total * 100) if total > 0 else 0
-        
-        ws_monthly[f'A{current_row}'] = mes
-        ws_monthly[f'B{current_row}'] = total
-        ws_monthly[f'C{current_row}'] = vendidos
-        ws_monthly[f'D{current_row}'] = abiertos
-        ws_monthly[f'E{current_row}'] = cerrados
-        ws_monthly[f'F{current_row}'] = f"{tasa:.1f}%"
-        
-        # Formato
-        for col in range(1, 7):
-            cell = ws_monthly.cell(row=current_row, column=col)
-            cell.border = border
-            cell.alignment = Alignment(horizontal="center")
-        
-        current_row += 1
-    
-    # Ajustar ancho de columnas
-    for column in ws_monthly.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws_monthly.column_dimensions[column_letter].width = min(adjusted_width, 30)
-
-    # Agregar hoja de estadísticas de campos
-    ws_stats = wb.create_sheet(title="Estadísticas de Campos")
-    
-    # Título
-    ws_stats.merge_cells('A1:D1')
-    ws_stats['A1'] = "DISTRIBUCIÓN DE OPCIONES SELECCIONADAS"
-    ws_stats['A1'].font = Font(size=16, bold=True, color="1F4E78")
-    ws_stats['A1'].alignment = Alignment(horizontal="center")
-    
-    # Encabezados
-    headers = ["Campo", "Opción", "Cantidad", "Porcentaje"]
-    for col, header in enumerate(headers, 1):
-        cell = ws_stats.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Campos a analizar
-    campos = {
-        'Origen': 'Origen',
-        'Cobertura Actual': 'Cobertura Actual',
-        '¿Por qué no toma la cobertura?': '¿Por qué no toma la cobertura?',
-        'Privado/Desregulado': 'Privado/Desregulado',
-        'Estado': 'Estado'
-    }
-    
-    current_row = 4
-    
-    # Analizar cada campo
-    for campo_df, nombre_campo in campos.items():
-        # Agregar título del campo
-        ws_stats.merge_cells(f'A{current_row}:D{current_row}')
-        campo_cell = ws_stats[f'A{current_row}']
-        campo_cell.value = f"DISTRIBUCIÓN DE {nombre_campo.upper()}"
-        campo_cell.fill = month_fill
-        campo_cell.font = month_font
-        campo_cell.alignment = Alignment(horizontal="center")
-        current_row += 1
-        
-        # Calcular distribución
-        total = len(df)
-        distribucion = df[campo_df].value_counts()
-        
-        # Agregar datos
-        for opcion, cantidad in distribucion.items():
-            porcentaje = (cantidad / total * 100)
-            
-            ws_stats[f'A{current_row}'] = nombre_campo
-            ws_stats[f'B{current_row}'] = opcion
-            ws_stats[f'C{current_row}'] = cantidad
-            ws_stats[f'D{current_row}'] = f"{porcentaje:.1f}%"
-            
-            # Formato
-            for col in range(1, 5):
-                cell = ws_stats.cell(row=current_row, column=col)
-                cell.border = border
-                cell.alignment = Alignment(horizontal="center")
-            
-            current_row += 1
-        
-        # Espacio entre campos
-        current_row += 1
-    
-    # Ajustar ancho de columnas
-    for column in ws_stats.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws_stats.column_dimensions[column_letter].width = min(adjusted_width, 30)
-
-    # Agregar hoja de ranking de usuarios
-    ws_ranking = wb.create_sheet(title="Ranking de Usuarios")
-    
-    # Título
-    ws_ranking.merge_cells('A1:E1')
-    ws_ranking['A1'] = "RANKING DE USUARIOS POR VENTAS"
-    ws_ranking['A1'].font = Font(size=16, bold=True, color="1F4E78")
-    ws_ranking['A1'].alignment = Alignment(horizontal="center")
-    
-    # Encabezados
-    headers = ["Posición", "Usuario", "Contactos Vendidos", "Total Contactos", "Tasa de Éxito"]
-    for col, header in enumerate(headers, 1):
-        cell = ws_ranking.cell(row=3, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Calcular ranking de usuarios
-    ranking_usuarios = df.groupby('Usuario cargador').agg({
-        'Apellido y nombre': 'count',  # Total de contactos
-        'Estado': lambda x: (x == 'vendido').sum()  # Contactos vendidos
-    }).rename(columns={
-        'Apellido y nombre': 'Total Contactos',
-        'Estado': 'Contactos Vendidos'
-    })
-    
-    # Calcular tasa de éxito
-    ranking_usuarios['Tasa de Éxito'] = (ranking_usuarios['Contactos Vendidos'] / ranking_usuarios['Total Contactos'] * 100).round(1)
-    
-    # Ordenar por contactos vendidos (de mayor a menor) - Los mejores vendedores primero
-    ranking_usuarios = ranking_usuarios.sort_values('Contactos Vendidos', ascending=False)
+@gestor.route('/exportar_contactos')
+@login_required
+def exportar_contactos():
+    if not current_user.is_admin:
+        return redirect(url_for('auth.login'))
     
-    # Agregar datos al Excel
-    current_row = 4
-    for posicion, (usuario, datos) in enumerate(ranking_usuarios.iterrows(), 1):
-        ws_ranking[f'A{current_row}'] = posicion
-        ws_ranking[f'B{current_row}'] = usuario
-        ws_ranking[f'C{current_row}'] = datos['Contactos Vendidos']
-        ws_ranking[f'D{current_row}'] = datos['Total Contactos']
-        ws_ranking[f'E{current_row}'] = f"{datos['Tasa de Éxito']:.1f}%"
-        
-        # Formato especial para el top 3
-        if posicion <= 3:
-            # Fondo dorado para el 1er lugar
-            if posicion == 1:
-                fill_color = "FFD700"  # Dorado
-                font_color = "000000"
-            # Fondo plateado para el 2do lugar
-            elif posicion == 2:
-                fill_color = "C0C0C0"  # Plateado
-                font_color = "000000"
-            # Fondo bronce para el 3er lugar
-            else:
-                fill_color = "CD7F32"  # Bronce
-                font_color = "FFFFFF"
-            
-            for col in range(1, 6):
-                cell = ws_ranking.cell(row=current_row, column=col)
-                cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-                cell.font = Font(bold=True, color=font_color)
-                cell.border = border
-                cell.alignment = Alignment(horizontal="center")
-        else:
-            # Formato normal para el resto
-            for col in range(1, 6):
-                cell = ws_ranking.cell(row=current_row, column=col)
-                cell.border = border
-                cell.alignment = Alignment(horizontal="center")
-        
-        current_row += 1
+    logging.info(f"Exportando contactos para admin {current_user.email}")
     
+    # Agregar timestamp al nombre del archivo para evitar caché del navegador
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"contactos_{timestamp}.xlsx"
     
-    # Ajustar ancho de columnas
-    for column in ws_ranking.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws_ranking.column_dimensions[column_letter].width = min(adjusted_width, 30)
-
-    # Guardar el archivo en un directorio temporal
-    import os
-    temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    file_path = os.path.join(temp_dir, filename)
-    wb.save(file_path)
-
-    logging.info(f"Archivo guardado como: {file_path}")
+    # El libro solo se regenera si cambiaron contactos o usuarios desde la última exportación;
+    # sin caché se arma en memoria y se envía sin pasar por un archivo
+    try:
+        archivo = abrir_libro('contactos', generar_libro_admin)
+    except Exception as e:
+        logging.error(f"Error generando libro Excel: {str(e)}")
+        flash("Error al crear el archivo Excel. Por favor intenta nuevamente.", "danger")
+        return redirect(url_for('admin'))
 
     try:
         response = send_file(
-            file_path,
+            archivo,
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -568,6 +352,91 @@ def exportar_contactos():
         logging.error(f"Error enviando archivo: {str(e)}")
         return jsonify({'error': 'Error al enviar el archivo'}), 500
 
+@gestor.route('/exportar_contactos_columnar')
+@login_required
+def exportar_contactos_columnar():
+    """Todos los contactos con tipos de datos en Parquet (por defecto) o Arrow IPC/Feather, para análisis"""
+    if not current_user.is_admin:
+        return redirect(url_for('auth.login'))
+
+    formato = request.args.get('formato', 'parquet')
+    if formato not in FORMATOS_COLUMNAR:
+        return jsonify({'error': 'Formato no soportado'}), 400
+    extension, mimetype = FORMATOS_COLUMNAR[formato]
+
+    incluir_archivo = _incluir_archivo(request.args)
+    try:
+        archivo = libro_en_memoria(lambda destino: generar_columnar(destino, formato, incluir_archivo))
+    except ImportError:
+        logging.error("Exportación columnar no disponible: falta instalar pyarrow")
+        return jsonify({'error': 'Exportación no disponible en este servidor'}), 501
+    except Exception as e:
+        logging.error(f"Error en exportación {formato}: {str(e)}")
+        return jsonify({'error': 'Error al generar la exportación'}), 500
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return send_file(
+        archivo,
+        as_attachment=True,
+        download_name=f"contactos_{timestamp}.{extension}",
+        mimetype=mimetype
+    )
+
+@gestor.route('/trabajos_exportacion', methods=['POST'])
+@login_required
+def crear_trabajo_exportacion():
+    """Encola una exportación en segundo plano ('admin' o 'usuario')"""
+    tipo = request.form.get('tipo', 'usuario')
+    if tipo not in ('admin', 'usuario'):
+        return jsonify({'success': False, 'message': 'Tipo de exportación no válido'}), 400
+    if tipo == 'admin' and not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+
+    try:
+        trabajo = encolar_trabajo(gestor, current_user, tipo)
+        return jsonify({
+            'success': True,
+            'trabajo': estado_trabajo(trabajo),
+            'estado_url': url_for('estado_trabajo_exportacion', trabajo_id=trabajo.id),
+            'descarga_url': url_for('descargar_trabajo_exportacion', trabajo_id=trabajo.id)
+        }), 202
+    except Exception as e:
+        logging.error(f"Error al encolar exportación: {str(e)}")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Error al iniciar la exportación'}), 500
+
+def _trabajo_del_usuario(trabajo_id):
+    trabajo = db.session.get(TrabajoExportacion, trabajo_id)
+    if not trabajo or trabajo.usuario_id != current_user.id:
+        return None
+    return trabajo
+
+@gestor.route('/trabajos_exportacion/<int:trabajo_id>')
+@login_required
+def estado_trabajo_exportacion(trabajo_id):
+    trabajo = _trabajo_del_usuario(trabajo_id)
+    if not trabajo:
+        return jsonify({'success': False, 'message': 'Exportación no encontrada'}), 404
+    return jsonify({'success': True, 'trabajo': estado_trabajo(trabajo)})
+
+@gestor.route('/trabajos_exportacion/<int:trabajo_id>/descargar')
+@login_required
+def descargar_trabajo_exportacion(trabajo_id):
+    trabajo = _trabajo_del_usuario(trabajo_id)
+    if not trabajo:
+        return jsonify({'success': False, 'message': 'Exportación no encontrada'}), 404
+    if trabajo.estado != 'completado':
+        return jsonify({'success': False, 'message': 'La exportación todavía no está lista'}), 409
+    if not trabajo.archivo or not os.path.exists(trabajo.archivo):
+        return jsonify({'success': False, 'message': 'El archivo de la exportación ya no está disponible'}), 410
+
+    return send_file(
+        trabajo.archivo,
+        as_attachment=True,
+        download_name=trabajo.nombre_archivo,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
 @gestor.route('/usuario', methods=["GET", "POST"])
 @login_required
 def usuario():
@@ -612,22 +481,23 @@ def usuario():
         
         if campos_vacios:
             flash(f"Por favor complete los siguientes campos obligatorios: {', '.join(campos_vacios)}", "danger")
-            return render_template('usuario.html', form=form, contactos_usuario=contactos_usuario)
+            return render_template('usuario.html', form=form)
         
         if form.validate_on_submit():
             logging.info("Formulario validado correctamente")
             try:
-                # Procesar campos con opción "otros"
-                cobertura_final = form.cobertura_actual_otra.data if form.cobertura_actual.data == 'otros' else form.cobertura_actual.data
-                
                 # Procesar campo de cónyuge
-                conyuge_edad_final = form.conyuge_edad.data if form.conyuge.data == 'con conyuge' else 'Sin cónyuge'
+                conyuge_edad_final = form.conyuge_edad.data if form.conyuge.data == 'con conyuge' else None
+                
+                # Contactos ya cargados con el mismo teléfono o email (búsqueda por índice); se avisa y se carga igual
+                existentes = contactos_existentes(form.telefono.data, form.correo_electronico.data)
                 
                 nuevo_contacto = Contacto(
                     usuario_id=current_user.id,
                     origen=form.origen.data,
-                    cobertura_actual=cobertura_final,
-                    cobertura_actual_otra=form.cobertura_actual_otra.data if form.cobertura_actual.data == 'otros' else None,
+                    cobertura_actual=form.cobertura_actual.data,
+                    # El texto libre solo se guarda con la opción "otros"
+                    cobertura_actual_otra=form.cobertura_actual_otra.data if form.cobertura_actual.data == COBERTURA_OTRA else None,
                     promocion=form.promocion.data,
                     privadoDesregulado=form.privadoDesregulado.data,
                     apellido_nombre=form.apellido_nombre.data,
@@ -636,7 +506,7 @@ def usuario():
                     telefono=form.telefono.data,
                     grupo_familiar=form.grupo_familiar.data,
                     plan_ofrecido=form.plan_ofrecido.data,
-                    fecha=datetime.now(pytz.timezone('America/Argentina/Mendoza')).strftime("%d/%m/%Y"),
+                    fecha=datetime.now(pytz.timezone('America/Argentina/Mendoza')).date(),
                     estado=form.estado.data,
                     observaciones=form.observaciones.data,
                     conyuge=form.conyuge.data,
@@ -646,6 +516,8 @@ def usuario():
                 db.session.commit()
                 
                 flash("Contacto agregado correctamente", "success")
+                if existentes:
+                    flash(aviso_duplicados(existentes, current_user.id), "warning")
                 logging.info("Contacto agregado exitosamente")
                 return redirect(url_for('usuario'))
                 
@@ -659,14 +531,25 @@ def usuario():
                 for error in errors:
                     flash(f"Error en {getattr(form, field).label.text}: {error}", "danger")
 
+    # La tabla de contactos se carga por páginas desde /usuario/contactos
+    return render_template('usuario.html', form=form)
+
+@gestor.route('/usuario/contactos')
+@login_required
+def usuario_contactos():
+    """Página de la tabla "Mis contactos", más nuevos primero, paginada por clave"""
     try:
-        contactos_usuario = Contacto.query.filter_by(usuario_id=current_user.id).all()
+        contactos, siguiente = pagina_contactos_usuario(
+            current_user.id,
+            cursor=request.args.get('cursor'),
+            limite=request.args.get('limite', LIMITE_POR_DEFECTO, type=int)
+        )
+    except ParametroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         logging.error(f"Error al obtener contactos: {str(e)}")
-        contactos_usuario = []
-        flash("Error al cargar los contactos", "warning")
-
-    return render_template('usuario.html', form=form, contactos_usuario=contactos_usuario)
+        return jsonify({'success': False, 'message': 'Error al cargar los contactos'}), 500
+    return jsonify({'success': True, 'contactos': contactos, 'siguiente': siguiente})
 
 @gestor.route('/actualizar_promocion', methods=['POST'])
 @login_required
@@ -694,14 +577,8 @@ def actualizar_promocion():
             logging.warning(f"Contacto no está en estado cerrado - Estado actual: {contacto.estado}")
             return jsonify({'success': False, 'message': 'Solo se puede actualizar la promoción en contactos cerrados'})
         
-        # Validar opciones de promoción
-        opciones_validas = [
-            'promocion sancor', 'promocion medicus', 'promocion omint', 'promocion prevencion',
-            'promocion smg', 'promocion medife', 'osde', 'servicios insatisfactorios',
-            'no puede pagarlo', 'otros prepagos', ''
-        ]
-        
-        if nueva_promocion not in opciones_validas:
+        # Validar opciones de promoción (vacía quita la promoción)
+        if nueva_promocion and nueva_promocion not in catalogo('promocion').por_clave:
             logging.warning(f"Promoción no válida: {nueva_promocion}")
             return jsonify({'success': False, 'message': 'Opción de promoción no válida'})
         
@@ -746,8 +623,7 @@ def cambiar_estado_contacto():
         logging.info(f"Contacto encontrado - Estado actual: {contacto.estado}")
         
         # Validar que el estado sea válido
-        estados_validos = ['abierto', 'cerrado', 'no responde', 'vendido']
-        if nuevo_estado not in estados_validos:
+        if nuevo_estado not in ESTADOS:
             logging.warning(f"Estado no válido: {nuevo_estado}")
             return jsonify({'success': False, 'message': 'Estado no válido'})
         
@@ -768,190 +644,65 @@ def cambiar_estado_contacto():
         db.session.rollback()
         return jsonify({'success': False, 'message': 'Error al actualizar el estado'})
 
+def _incluir_archivo(parametros):
+    """Si la solicitud pide incluir los contactos archivados (?archivo=1)"""
+    return parametros.get('archivo') in ('1', 'true', 'on')
+
+def _respuesta_csv(prefijo, filas):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{prefijo}_{timestamp}.csv"
+    return Response(
+        stream_with_context(filas),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @gestor.route('/exportar_mis_contactos_simple')
 @login_required
 def exportar_mis_contactos_simple():
-    """Versión simplificada de exportación para PythonAnywhere"""
+    """Versión simplificada de exportación para PythonAnywhere (CSV enviado a medida que se lee)"""
     try:
         logging.info(f"Exportación simple para usuario {current_user.email}")
-        
-        # Obtener contactos
-        contactos = Contacto.query.filter_by(usuario_id=current_user.id).all()
-        
-        # Crear archivo CSV simple como fallback
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Encabezados
-        headers = [
-            "Origen", "Cobertura Actual", "¿Por qué no toma la cobertura?", 
-            "Privado/Desregulado", "Apellido y nombre", "Correo electrónico",
-            "Edad titular", "Teléfono", "Grupo familiar", "Plan ofrecido",
-            "Estado", "Observaciones", "Cónyuge", "Edad cónyuge", "Fecha de carga"
-        ]
-        writer.writerow(headers)
-        
-        # Datos
-        for c in contactos:
-            row = [
-                c.origen or "",
-                c.cobertura_actual_otra if c.cobertura_actual == 'otros' else (c.cobertura_actual or ""),
-                c.promocion or "No especificado",
-                c.privadoDesregulado or "",
-                c.apellido_nombre or "",
-                c.correo_electronico or "",
-                c.edad_titular or "",
-                c.telefono or "",
-                c.grupo_familiar or "",
-                c.plan_ofrecido or "",
-                c.estado or "",
-                c.observaciones or "",
-                c.conyuge or "",
-                c.conyuge_edad or "",
-                c.created_at.strftime("%d/%m/%Y") if c.created_at else "N/A"
-            ]
-            writer.writerow(row)
-        
-        output.seek(0)
-        
-        # Crear respuesta
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"mis_contactos_{timestamp}.csv"
-        
-        response = Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={'Content-Disposition': f'attachment; filename={filename}'}
-        )
-        
-        logging.info("Exportación CSV completada exitosamente")
-        return response
-        
+        return _respuesta_csv("mis_contactos", generar_csv(consultar_contactos_usuario(current_user.id)))
     except Exception as e:
         logging.error(f"Error en exportación simple: {str(e)}")
         return jsonify({'error': 'Error en exportación simple'}), 500
 
+@gestor.route('/exportar_contactos_csv')
+@login_required
+def exportar_contactos_csv():
+    """Todos los contactos en CSV, con el usuario cargador"""
+    if not current_user.is_admin:
+        return redirect(url_for('auth.login'))
+    try:
+        logging.info(f"Exportación CSV de todos los contactos para admin {current_user.email}")
+        consulta = consultar_contactos_admin(incluir_archivo=_incluir_archivo(request.args))
+        return _respuesta_csv("contactos", generar_csv(consulta, con_usuario=True))
+    except Exception as e:
+        logging.error(f"Error en exportación CSV: {str(e)}")
+        return jsonify({'error': 'Error en exportación CSV'}), 500
+
 @gestor.route('/exportar_mis_contactos')
 @login_required
 def exportar_mis_contactos():
     try:
         logging.info(f"Iniciando exportación para usuario {current_user.email}")
         
-        # Forzar recarga de datos desde la base de datos
-        db.session.expire_all()
-        contactos = Contacto.query.filter_by(usuario_id=current_user.id).all()
-        
-        # Log para verificar cuántos contactos se están exportando
-        logging.info(f"Exportando {len(contactos)} contactos para usuario {current_user.email}")
-        
-        # Agregar timestamp al nombre del archivo para evitar caché
+        # Agregar timestamp al nombre del archivo para evitar caché del navegador
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"mis_contactos_{timestamp}.xlsx"
         
-        # Función para normalizar texto
-        def normalize_text(text):
-            if text:
-                return text.strip().lower().capitalize()
-            return text
-        
-        # Crear datos de forma más simple
-        data = []
-        for c in contactos:
-            try:
-                data.append({
-                    "Origen": normalize_text(c.origen),
-                    "Cobertura Actual": normalize_text(c.cobertura_actual_otra) if c.cobertura_actual == 'otros' else c.cobertura_actual,
-                    "¿Por qué no toma la cobertura?": normalize_text(c.promocion) if c.promocion else "No especificado",
-                    "Privado/Desregulado": c.privadoDesregulado,
-                    "Apellido y nombre": c.apellido_nombre,
-                    "Correo electrónico": c.correo_electronico,
-                    "Edad titular": c.edad_titular,
-                    "Teléfono": c.telefono,
-                    "Grupo familiar": c.grupo_familiar,
-                    "Plan ofrecido": c.plan_ofrecido,
-                    "Estado": c.estado,
-                    "Observaciones": c.observaciones,
-                    "Cónyuge": c.conyuge,
-                    "Edad cónyuge": c.conyuge_edad,
-                    "Fecha de carga": c.created_at.strftime("%d/%m/%Y") if c.created_at else "N/A"
-                })
-            except Exception as e:
-                logging.error(f"Error procesando contacto {c.id}: {str(e)}")
-                continue
-        
-        logging.info(f"Datos procesados: {len(data)} registros")
-        
-        # Crear DataFrame de forma más segura
-        try:
-            df = pd.DataFrame(data)
-            logging.info("DataFrame creado exitosamente")
-        except Exception as e:
-            logging.error(f"Error creando DataFrame: {str(e)}")
-            return jsonify({'error': 'Error al procesar los datos'}), 500
-        
-        # Crear un nuevo libro de Excel
+        usuario_id = current_user.id
         try:
-            wb = openpyxl.Workbook()
-            logging.info("Libro Excel creado")
+            archivo = abrir_libro(f'mis_contactos_{usuario_id}',
+                                  lambda destino: generar_libro_usuario(usuario_id, destino))
         except Exception as e:
-            logging.error(f"Error creando libro Excel: {str(e)}")
+            logging.error(f"Error generando libro Excel: {str(e)}")
             return jsonify({'error': 'Error al crear el archivo Excel'}), 500
-        
-        # Configurar estilos básicos
-        try:
-            header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True, size=11)
-            header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            logging.info("Estilos configurados")
-        except Exception as e:
-            logging.error(f"Error configurando estilos: {str(e)}")
-            # Continuar sin estilos si hay error
-        
-        # Crear la hoja de datos
-        try:
-            ws_data = wb.active
-            ws_data.title = "Mis Contactos"
-            
-            # Agregar encabezados
-            headers = list(df.columns)
-            for col, header in enumerate(headers, 1):
-                cell = ws_data.cell(row=1, column=col)
-                cell.value = header
-                try:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = header_alignment
-                except:
-                    pass  # Continuar sin estilos si hay error
-            
-            # Agregar datos
-            for row_idx, row_data in enumerate(df.values, 2):
-                for col_idx, value in enumerate(row_data, 1):
-                    cell = ws_data.cell(row=row_idx, column=col_idx)
-                    cell.value = str(value) if value is not None else ""
-            
-            logging.info("Datos agregados a Excel")
-            
-        except Exception as e:
-            logging.error(f"Error agregando datos a Excel: {str(e)}")
-            return jsonify({'error': 'Error al agregar datos al Excel'}), 500
-        
-        # Guardar el archivo en un directorio temporal
-        import os
-        temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        file_path = os.path.join(temp_dir, filename)
-        wb.save(file_path)
-
-        logging.info(f"Archivo guardado como: {file_path}")
 
         try:
             response = send_file(
-                file_path,
+                archivo,
                 as_attachment=True,
                 download_name=filename,
                 mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -1061,111 +812,6 @@ def add_download_headers(response):
             response.headers['Content-Disposition'] = response.headers['Content-Disposition'].replace('attachment; ', 'attachment; filename*=UTF-8\'\'')
     return response
 
-@gestor.route('/buscar_contactos_por_email', methods=['POST'])
-@login_required
-def buscar_contactos_por_email():
-    try:
-        email = request.form.get('email', '').strip()
-        
-        if not email:
-            return jsonify({'success': False, 'message': 'Por favor ingrese un email para buscar'})
-        
-        # Buscar contactos que contengan el email (búsqueda parcial)
-        if current_user.is_admin:
-            # Para admin, buscar en todos los contactos
-            contactos = Contacto.query.filter(
-                Contacto.correo_electronico.ilike(f'%{email}%')
-            ).all()
-        else:
-            # Para usuarios normales, buscar solo en sus contactos
-            contactos = Contacto.query.filter(
-                Contacto.correo_electronico.ilike(f'%{email}%'),
-                Contacto.usuario_id == current_user.id
-            ).all()
-        
-        # Preparar datos para la respuesta
-        datos_contactos = []
-        for c in contactos:
-            datos_contactos.append({
-                'id': c.id,
-                'origen': c.origen,
-                'privadoDesregulado': c.privadoDesregulado,
-                'apellido_nombre': c.apellido_nombre,
-                'correo_electronico': c.correo_electronico,
-                'edad_titular': c.edad_titular,
-                'telefono': c.telefono,
-                'grupo_familiar': c.grupo_familiar,
-                'cobertura_actual': c.cobertura_actual,
-                'promocion': c.promocion or 'No especificado',
-                'plan_ofrecido': c.plan_ofrecido,
-                'estado': c.estado,
-                'conyuge': c.conyuge,
-                'conyuge_edad': c.conyuge_edad,
-                'fecha_carga': c.created_at.strftime('%d/%m/%Y') if c.created_at else 'N/A',
-                'observaciones': c.observaciones,
-                'usuario_email': c.usuario.email if current_user.is_admin else None
-            })
-        
-        return jsonify({
-            'success': True,
-            'contactos': datos_contactos,
-            'total': len(datos_contactos),
-            'message': f'Se encontraron {len(datos_contactos)} contacto(s) con el email "{email}"'
-        })
-        
-    except Exception as e:
-        logging.error(f"Error al buscar contactos por email: {str(e)}")
-        return jsonify({'success': False, 'message': 'Error al realizar la búsqueda'})
-
-@gestor.route('/buscar_contactos_por_nombre', methods=['POST'])
-@login_required
-def buscar_contactos_por_nombre():
-    try:
-        nombre = request.form.get('nombre', '').strip()
-        if not nombre:
-            return jsonify({'success': False, 'message': 'Por favor ingrese un nombre o apellido para buscar'})
-        
-        if current_user.is_admin:
-            contactos = Contacto.query.filter(
-                Contacto.apellido_nombre.ilike(f'%{nombre}%')
-            ).all()
-        else:
-            contactos = Contacto.query.filter(
-                Contacto.apellido_nombre.ilike(f'%{nombre}%'),
-                Contacto.usuario_id == current_user.id
-            ).all()
-        
-        datos_contactos = []
-        for c in contactos:
-            datos_contactos.append({
-                'id': c.id,
-                'origen': c.origen,
-                'privadoDesregulado': c.privadoDesregulado,
-                'apellido_nombre': c.apellido_nombre,
-                'correo_electronico': c.correo_electronico,
-                'edad_titular': c.edad_titular,
-                'telefono': c.telefono,
-                'grupo_familiar': c.grupo_familiar,
-                'cobertura_actual': c.cobertura_actual,
-                'promocion': c.promocion or 'No especificado',
-                'plan_ofrecido': c.plan_ofrecido,
-                'estado': c.estado,
-                'conyuge': c.conyuge,
-                'conyuge_edad': c.conyuge_edad,
-                'fecha_carga': c.created_at.strftime('%d/%m/%Y') if c.created_at else 'N/A',
-                'observaciones': c.observaciones,
-                'usuario_email': c.usuario.email if current_user.is_admin else None
-            })
-        return jsonify({
-            'success': True,
-            'contactos': datos_contactos,
-            'total': len(datos_contactos),
-            'message': f'Se encontraron {len(datos_contactos)} contacto(s) con el nombre "{nombre}"'
-        })
-    except Exception as e:
-        logging.error(f"Error al buscar contactos por nombre: {str(e)}")
-        return jsonify({'success': False, 'message': 'Error al realizar la búsqueda'})
-
 if __name__ == '__main__':
     # Solo ejecutar en desarrollo local, no en PythonAnywhere
     import socket
@@ -1,26 +1,19 @@
-from gestor import gestor, db
-from models import Usuario, Contacto
+from models import db, Usuario, Contacto, ESTADOS, OPCIONES_CONYUGE
+from opciones import COBERTURA_OTRA, catalogo
+from busqueda_contactos import claves_busqueda
 from datetime import datetime, timedelta
 import random
 from werkzeug.security import generate_password_hash
 
-# Datos de ejemplo actualizados según el formulario
-origenes = ['propio', 'elegi mejor', 'wise', 'guardia', 'broker']
-
-coberturas = ['smg', 'osde', 'prevencion', 'sancor', 'medife', 'obra social', 'otros']
+# Datos de ejemplo actualizados según el formulario; origen, cobertura y
+# promoción se eligen entre las opciones cargadas en sus tablas (opciones.py)
 coberturas_otras = ['Medifé', 'OMINT', 'Medicus', 'Swiss Medical', 'Galeno']
 
-promociones = [
-    'promocion sancor', 'promocion medicus', 'promocion omint', 
-    'promocion prevencion', 'promocion smg', 'promocion medife',
-    'osde', 'servicios insatisfactorios', 'no puede pagarlo', 'otros prepagos'
-]
-
-estados = ['abierto', 'cerrado', 'no responde', 'vendido']
+estados = list(ESTADOS)
 
 planes = ['210', '310', '410', '450', '510', '610', '710']
 
-conyuges = ['sin conyuge', 'con conyuge']
+conyuges = list(OPCIONES_CONYUGE)
 
 nombres = [
     "Juan Pérez", "María García", "Carlos López", "Ana Martínez",
@@ -60,9 +53,47 @@ def generar_fecha_aleatoria():
     # Generar fecha entre hace 6 meses y hoy
     dias_atras = random.randint(0, 180)
     fecha = datetime.now() - timedelta(days=dias_atras)
-    return fecha.strftime("%d/%m/%Y")
+    return fecha.date()
+
+def generar_contacto(usuario_id, dias=180):
+    """Valores de un contacto de ejemplo cargado en los últimos `dias` días"""
+    nombre = random.choice(nombres)
+    cobertura = random.choice(catalogo('cobertura').opciones)
+    conyuge = random.choice(conyuges)
+    created_at = datetime.now() - timedelta(days=random.randint(0, dias), seconds=random.randint(0, 86399))
+    email = generar_email(nombre)
+    telefono = generar_telefono()
+    # Las claves normalizadas van explícitas: benchmark_exportacion.py inserta sin pasar por el ORM
+    return dict(
+        usuario_id=usuario_id,
+        origen_id=random.choice(catalogo('origen').opciones).id,
+        cobertura_id=cobertura.id,
+        cobertura_actual_otra=random.choice(coberturas_otras) if cobertura.clave == COBERTURA_OTRA else None,
+        promocion_id=random.choice(catalogo('promocion').opciones).id,
+        privadoDesregulado=random.choice(['privado', 'desregulado']),
+        apellido_nombre=nombre,
+        correo_electronico=email,
+        edad_titular=random.randint(25, 65),
+        telefono=telefono,
+        grupo_familiar=random.randint(1, 5),
+        plan_ofrecido=random.choice(planes),
+        fecha=created_at.date(),
+        estado=random.choice(estados),
+        observaciones=random.choice(observaciones),
+        conyuge=conyuge,
+        conyuge_edad=random.randint(25, 65) if conyuge == 'con conyuge' else None,
+        created_at=created_at,
+        **claves_busqueda(nombre, email, telefono)
+    )
+
+def generar_contactos(usuarios_ids, cantidad, dias=180):
+    """Generador de `cantidad` contactos de ejemplo repartidos entre los usuarios"""
+    for _ in range(cantidad):
+        yield generar_contacto(random.choice(usuarios_ids), dias)
 
 def insertar_datos_ejemplo():
+    from gestor import gestor
+
     with gestor.app_context():
         # Crear algunos usuarios de ejemplo si no existen
         usuarios_ejemplo = [
@@ -87,39 +118,10 @@ def insertar_datos_ejemplo():
             usuarios_ids.append(usuario.id)
 
         # Insertar 50 contactos de ejemplo
-        for i in range(50):
-            nombre = random.choice(nombres)
-            origen = random.choice(origenes)
-            
-            cobertura = random.choice(coberturas)
-            cobertura_otra = random.choice(coberturas_otras) if cobertura == 'otros' else None
-            
-            promocion = random.choice(promociones)
-            
-            conyuge = random.choice(conyuges)
-            conyuge_edad = str(random.randint(25, 65)) if conyuge == 'con conyuge' else 'Sin cónyuge'
-
-            contacto = Contacto(
-                usuario_id=random.choice(usuarios_ids),
-                origen=origen,
-                cobertura_actual=cobertura,
-                cobertura_actual_otra=cobertura_otra,
-                promocion=promocion,
-                privadoDesregulado=random.choice(['privado', 'desregulado']),
-                apellido_nombre=nombre,
-                correo_electronico=generar_email(nombre),
-                edad_titular=str(random.randint(25, 65)),
-                telefono=generar_telefono(),
-                grupo_familiar=str(random.randint(1, 5)),
-                plan_ofrecido=random.choice(planes),
-                fecha=generar_fecha_aleatoria(),
-                estado=random.choice(estados),
-                observaciones=random.choice(observaciones),
-                conyuge=conyuge,
-                conyuge_edad=conyuge_edad,
-                created_at=datetime.now() - timedelta(days=random.randint(0, 180))
-            )
-            db.session.add(contacto)
+        for i, datos in enumerate(generar_contactos(usuarios_ids, 50)):
+            # La fecha de carga del formulario es independiente de created_at
+            datos['fecha'] = generar_fecha_aleatoria()
+            db.session.add(Contacto(**datos))
             
             # Mostrar progreso cada 10 contactos
             if (i + 1) % 10 == 0:
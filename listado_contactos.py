@@ -0,0 +1,296 @@
+"""
+Listado paginado de contactos para las tablas del admin y del vendedor, y búsquedas.
+
+Todas las consultas traen el email del vendedor con un join y leen solo las
+columnas que se devuelven, como filas y no como objetos Contacto, así la
+cantidad de sentencias SQL por solicitud no depende de cuántos contactos o
+vendedores haya en el resultado.
+
+Las búsquedas por nombre, email o teléfono son filtros más de la misma página
+(pagina_contactos): nunca devuelven más de LIMITE_MAXIMO contactos por
+solicitud, y el total de resultados sale de un COUNT aparte que se guarda en
+memoria por versión de los datos (contar_contactos).
+
+Usa paginación por clave (keyset): en lugar de OFFSET, cada página pide las
+filas posteriores a la última (valor de la columna de orden, id) de la página
+anterior, así el costo de cada página no depende de cuántas se recorrieron.
+"""
+
+import base64
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import json
+import threading
+
+from flask import current_app
+from sqlalchemy import and_, false, func, or_, select
+
+from models import db, Usuario, Contacto, ContactoArchivo, ESTADOS
+from archivo_contactos import fuente_contactos
+from busqueda_contactos import COLUMNAS_NORMALIZADAS, empieza_con, ids_coincidentes, normalizar, palabras
+from cache_exportacion import version_actual
+from opciones import COBERTURA_OTRA, OpcionInvalida, clave, id_de
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+MAXIMO_TOTALES_EN_CACHE = 256
+
+# Columnas por las que se puede ordenar la tabla; las opciones se ordenan por id (orden de alta).
+# None es el email del vendedor
+COLUMNAS_ORDEN = {
+    'created_at': 'created_at',
+    'apellido_nombre': 'apellido_nombre',
+    'estado': 'estado',
+    'origen': 'origen_id',
+    'cobertura_actual': 'cobertura_id',
+    'plan_ofrecido': 'plan_ofrecido',
+    'usuario': None,
+}
+
+
+# Columnas que usa contacto_a_dict; las consultas de la tabla leen solo estas, sin armar objetos Contacto
+COLUMNAS_TABLA = (
+    'id', 'origen_id', 'privadoDesregulado', 'apellido_nombre', 'correo_electronico', 'edad_titular', 'telefono',
+    'grupo_familiar', 'cobertura_id', 'cobertura_actual_otra', 'promocion_id', 'plan_ofrecido', 'estado',
+    'conyuge', 'conyuge_edad', 'created_at', 'observaciones',
+)
+
+# Filtros de texto que se buscan en el índice FTS y columnas donde se buscan
+FILTROS_TEXTO = {'nombre': ('apellido_nombre',), 'telefono': ('telefono',)}
+
+# Todos los filtros que entiende aplicar_filtros (forman la clave de la caché de totales)
+FILTROS = ('estado', 'origen', 'cobertura', 'usuario_id', 'desde', 'hasta', 'nombre', 'email', 'telefono')
+
+_totales_lock = threading.Lock()
+
+
+class ParametroInvalido(ValueError):
+    """Filtro, orden o cursor con un valor que no se puede usar"""
+
+
+def contacto_a_dict(c, usuario_email=None):
+    """Datos de un contacto para las respuestas JSON de la tabla.
+
+    c puede ser un Contacto o una fila con las columnas de COLUMNAS_TABLA.
+    """
+    cobertura = clave('cobertura', c.cobertura_id)
+    return {
+        'id': c.id,
+        'origen': clave('origen', c.origen_id),
+        'privadoDesregulado': c.privadoDesregulado,
+        'apellido_nombre': c.apellido_nombre,
+        'correo_electronico': c.correo_electronico,
+        'edad_titular': c.edad_titular,
+        'telefono': c.telefono,
+        'grupo_familiar': c.grupo_familiar,
+        'cobertura_actual': c.cobertura_actual_otra if cobertura == COBERTURA_OTRA else cobertura,
+        'promocion': clave('promocion', c.promocion_id) or 'No especificado',
+        'plan_ofrecido': c.plan_ofrecido,
+        'estado': c.estado,
+        'conyuge': c.conyuge,
+        'conyuge_edad': c.conyuge_edad,
+        'fecha_carga': c.created_at.strftime('%d/%m/%Y') if c.created_at else 'N/A',
+        'observaciones': c.observaciones,
+        'usuario_email': usuario_email
+    }
+
+
+def codificar_cursor(valor, contacto_id):
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([valor, contacto_id]).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor, orden):
+    try:
+        valor, contacto_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if valor is not None and orden == 'created_at':
+            valor = datetime.fromisoformat(valor)
+        return valor, int(contacto_id)
+    except (ValueError, TypeError):
+        raise ParametroInvalido('Cursor de paginación no válido')
+
+
+def _fecha(texto, campo):
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d')
+    except ValueError:
+        raise ParametroInvalido(f'Fecha no válida en "{campo}" (se espera AAAA-MM-DD)')
+
+
+def _solo_propios(usuario):
+    """Un vendedor solo ve sus contactos; usuario None es el listado del admin"""
+    return usuario is not None and not usuario.is_admin
+
+
+def _condiciones_archivo(texto, columnas):
+    """El archivo no tiene índice de texto: cada palabra se busca en nombre y email normalizados"""
+    def contiene(columna, palabra):
+        if columna in COLUMNAS_NORMALIZADAS:
+            return getattr(ContactoArchivo, COLUMNAS_NORMALIZADAS[columna]).contains(palabra, autoescape=True)
+        return getattr(ContactoArchivo, columna).ilike(f'%{palabra}%')
+
+    return [or_(*[contiene(columna, palabra) for columna in columnas]) for palabra in palabras(normalizar(texto))]
+
+
+def _coincide(fuente, texto, columnas, incluir_archivo):
+    """Contactos con palabras que empiezan con las del texto, según el índice de texto completo"""
+    ids = ids_coincidentes(normalizar(texto), columnas)
+    if ids is None:
+        return false()
+    condicion = fuente.id.in_(ids)
+    if incluir_archivo:
+        # Los ids no se repiten entre las dos tablas
+        archivados = select(ContactoArchivo.id).where(*_condiciones_archivo(texto, columnas))
+        condicion = or_(condicion, fuente.id.in_(archivados))
+    return condicion
+
+
+def aplicar_filtros(consulta, filtros, fuente=Contacto, usuario=None, incluir_archivo=False):
+    """Filtros de la tabla y de la búsqueda sobre la fuente (Contacto o la unión con el archivo).
+
+    estado, origen, cobertura, usuario_id, rango de fechas de carga (desde,
+    hasta), palabras del nombre o del teléfono (nombre, telefono) y comienzo
+    del email (email). Con un usuario que no es admin, solo sus contactos.
+    """
+    if filtros.get('estado'):
+        if filtros['estado'] not in ESTADOS:
+            raise ParametroInvalido('Estado no válido')
+        consulta = consulta.filter(fuente.estado == filtros['estado'])
+    try:
+        if filtros.get('origen'):
+            consulta = consulta.filter(fuente.origen_id == id_de('origen', filtros['origen']))
+        if filtros.get('cobertura'):
+            consulta = consulta.filter(fuente.cobertura_id == id_de('cobertura', filtros['cobertura']))
+    except OpcionInvalida as e:
+        raise ParametroInvalido(str(e))
+    if _solo_propios(usuario):
+        consulta = consulta.filter(fuente.usuario_id == usuario.id)
+    elif filtros.get('usuario_id'):
+        try:
+            consulta = consulta.filter(fuente.usuario_id == int(filtros['usuario_id']))
+        except ValueError:
+            raise ParametroInvalido('Usuario no válido')
+    if filtros.get('desde'):
+        consulta = consulta.filter(fuente.created_at >= _fecha(filtros['desde'], 'desde'))
+    if filtros.get('hasta'):
+        # La fecha "hasta" se incluye completa
+        consulta = consulta.filter(fuente.created_at < _fecha(filtros['hasta'], 'hasta') + timedelta(days=1))
+    for filtro, columnas in FILTROS_TEXTO.items():
+        if filtros.get(filtro):
+            consulta = consulta.filter(_coincide(fuente, filtros[filtro], columnas, incluir_archivo))
+    email = normalizar(filtros.get('email'))
+    if email:
+        # Rango del índice de correo_normalizado
+        consulta = consulta.filter(empieza_con(fuente.correo_normalizado, email))
+    return consulta
+
+
+def _posteriores(columna, id_columna, valor, contacto_id, descendente):
+    """Condición de las filas que siguen a (valor, id) en el orden elegido.
+
+    SQLite ordena los NULL antes que cualquier valor, así que van al principio
+    en orden ascendente y al final en descendente.
+    """
+    if descendente:
+        if valor is None:
+            return and_(columna.is_(None), id_columna < contacto_id)
+        return or_(columna < valor, and_(columna == valor, id_columna < contacto_id), columna.is_(None))
+    if valor is None:
+        return or_(and_(columna.is_(None), id_columna > contacto_id), columna.isnot(None))
+    return or_(columna > valor, and_(columna == valor, id_columna > contacto_id))
+
+
+def pagina_contactos(filtros=None, orden='created_at', direccion='desc', cursor=None, limite=LIMITE_POR_DEFECTO,
+                     usuario=None, incluir_archivo=False):
+    """Una página de contactos filtrados (ver aplicar_filtros), con el email del vendedor.
+
+    Es la tabla del admin y la búsqueda de /contactos/buscar. Un usuario que
+    no es admin solo ve sus contactos, sin email del vendedor ni archivados.
+    Devuelve (contactos, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    if orden not in COLUMNAS_ORDEN:
+        raise ParametroInvalido('Columna de orden no válida')
+    if direccion not in ('asc', 'desc'):
+        raise ParametroInvalido('Dirección de orden no válida')
+    incluir_archivo = incluir_archivo and not _solo_propios(usuario)
+    fuente = fuente_contactos(incluir_archivo)
+    columna = Usuario.email if COLUMNAS_ORDEN[orden] is None else getattr(fuente, COLUMNAS_ORDEN[orden])
+    descendente = direccion == 'desc'
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+
+    consulta = (db.session.query(*[getattr(fuente, nombre) for nombre in COLUMNAS_TABLA], Usuario.email,
+                                 columna.label('clave_orden'))
+                .join(Usuario, fuente.usuario_id == Usuario.id))
+    consulta = aplicar_filtros(consulta, filtros or {}, fuente, usuario, incluir_archivo)
+    if cursor:
+        valor, contacto_id = decodificar_cursor(cursor, orden)
+        consulta = consulta.filter(_posteriores(columna, fuente.id, valor, contacto_id, descendente))
+    if descendente:
+        consulta = consulta.order_by(columna.desc(), fuente.id.desc())
+    else:
+        consulta = consulta.order_by(columna.asc(), fuente.id.asc())
+
+    # Se pide una fila de más para saber si hay otra página
+    filas = consulta.limit(limite + 1).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1].clave_orden, filas[-1].id)
+    con_email = not _solo_propios(usuario)
+    return [contacto_a_dict(fila, fila.email if con_email else None) for fila in filas], siguiente
+
+
+def _cache_totales():
+    """Totales de búsquedas de la aplicación por (versión de los datos, alcance, filtros)"""
+    return current_app.extensions.setdefault('totales_contactos', OrderedDict())
+
+
+def contar_contactos(filtros=None, usuario=None, incluir_archivo=False):
+    """Cantidad de contactos que cumplen los filtros de pagina_contactos.
+
+    Es una consulta COUNT aparte, que solo pide la primera página. El
+    resultado se guarda en memoria con la versión de los datos
+    (VersionDatos) en la clave, así vale hasta la próxima escritura de
+    contactos sin tener que invalidarlo.
+    """
+    filtros = filtros or {}
+    incluir_archivo = bool(incluir_archivo) and not _solo_propios(usuario)
+    clave_total = (version_actual(), usuario.id if _solo_propios(usuario) else None, incluir_archivo,
+                   tuple((nombre, filtros.get(nombre) or '') for nombre in FILTROS))
+    totales = _cache_totales()
+    with _totales_lock:
+        if clave_total in totales:
+            totales.move_to_end(clave_total)
+            return totales[clave_total]
+
+    fuente = fuente_contactos(incluir_archivo)
+    total = aplicar_filtros(db.session.query(func.count(fuente.id)), filtros, fuente, usuario,
+                            incluir_archivo).scalar()
+    with _totales_lock:
+        totales[clave_total] = total
+        while len(totales) > MAXIMO_TOTALES_EN_CACHE:
+            totales.popitem(last=False)
+    return total
+
+
+def pagina_contactos_usuario(usuario_id, cursor=None, limite=LIMITE_POR_DEFECTO):
+    """Una página de "Mis contactos": los del vendedor, más nuevos primero.
+
+    Filtra por usuario y ordena por (created_at, id) sin join, así SQLite recorre
+    el índice ix_contacto_usuario_created_at desde la posición del cursor en
+    lugar de ordenar todos los contactos del vendedor.
+    Devuelve (contactos, siguiente_cursor) como pagina_contactos.
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    consulta = (db.session.query(*[getattr(Contacto, nombre) for nombre in COLUMNAS_TABLA])
+                .filter(Contacto.usuario_id == usuario_id))
+    if cursor:
+        valor, contacto_id = decodificar_cursor(cursor, 'created_at')
+        consulta = consulta.filter(_posteriores(Contacto.created_at, Contacto.id, valor, contacto_id, True))
+    filas = consulta.order_by(Contacto.created_at.desc(), Contacto.id.desc()).limit(limite + 1).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1].created_at, filas[-1].id)
+    return [contacto_a_dict(fila) for fila in filas], siguiente
@@ -0,0 +1,42 @@
+"""agregar tabla de trabajos de exportacion
+
+Revision ID: 3a7c1e9d5b20
+Revises: f2c9f7059180
+Create Date: 2025-07-10 19:02:41.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c1e9d5b20'
+down_revision = 'f2c9f7059180'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban la tabla con db.create_all() al iniciar
+    if sa.inspect(op.get_bind()).has_table('trabajo_exportacion'):
+        return
+    op.create_table('trabajo_exportacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=16), nullable=False),
+        sa.Column('estado', sa.String(length=16), nullable=False),
+        sa.Column('hoja_actual', sa.String(length=64), nullable=True),
+        sa.Column('filas_escritas', sa.Integer(), nullable=False),
+        sa.Column('archivo', sa.String(length=255), nullable=True),
+        sa.Column('nombre_archivo', sa.String(length=128), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('trabajo_exportacion')
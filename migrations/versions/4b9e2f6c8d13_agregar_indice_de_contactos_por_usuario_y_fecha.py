@@ -0,0 +1,26 @@
+"""agregar indice de contactos por usuario y fecha
+
+Revision ID: 4b9e2f6c8d13
+Revises: e7b3d9a14c02
+Create Date: 2025-07-17 09:42:37.105264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9e2f6c8d13'
+down_revision = 'e7b3d9a14c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.create_index('ix_contacto_usuario_created_at', ['usuario_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.drop_index('ix_contacto_usuario_created_at')
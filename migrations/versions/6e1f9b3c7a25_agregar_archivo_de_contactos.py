@@ -0,0 +1,94 @@
+"""agregar archivo de contactos
+
+Revision ID: 6e1f9b3c7a25
+Revises: d5a2e8c4f716
+Create Date: 2025-07-22 16:08:51.774093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1f9b3c7a25'
+down_revision = 'd5a2e8c4f716'
+branch_labels = None
+depends_on = None
+
+
+def _opciones(nombre, *valores):
+    return sa.Enum(*valores, name=nombre, native_enum=False, create_constraint=True)
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban las tablas con db.create_all() al iniciar
+    if not sa.inspect(op.get_bind()).has_table('contacto_archivo'):
+        op.create_table('contacto_archivo',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.Column('origen_id', sa.Integer(), nullable=True),
+            sa.Column('cobertura_id', sa.Integer(), nullable=True),
+            sa.Column('cobertura_actual_otra', sa.String(length=128), nullable=True),
+            sa.Column('promocion_id', sa.Integer(), nullable=True),
+            sa.Column('privadoDesregulado', _opciones('ck_contacto_privado_desregulado', 'privado', 'desregulado'),
+                      nullable=False),
+            sa.Column('apellido_nombre', sa.String(length=128), nullable=False),
+            sa.Column('correo_electronico', sa.String(length=128), nullable=False),
+            sa.Column('edad_titular', sa.SmallInteger(), nullable=True),
+            sa.Column('telefono', sa.String(length=32), nullable=False),
+            sa.Column('grupo_familiar', sa.SmallInteger(), nullable=True),
+            sa.Column('plan_ofrecido', sa.String(length=128), nullable=False),
+            sa.Column('fecha', sa.Date(), nullable=False),
+            sa.Column('estado', _opciones('ck_contacto_estado', 'abierto', 'cerrado', 'no responde', 'vendido'),
+                      nullable=False),
+            sa.Column('observaciones', sa.Text(), nullable=True),
+            sa.Column('conyuge', _opciones('ck_contacto_conyuge', 'sin conyuge', 'con conyuge'), nullable=False),
+            sa.Column('conyuge_edad', sa.SmallInteger(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('archivado_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['origen_id'], ['origen.id']),
+            sa.ForeignKeyConstraint(['cobertura_id'], ['cobertura.id']),
+            sa.ForeignKeyConstraint(['promocion_id'], ['promocion.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('contacto_archivo', schema=None) as batch_op:
+            batch_op.create_index('ix_contacto_archivo_usuario_created_at', ['usuario_id', 'created_at'], unique=False)
+            batch_op.create_index('ix_contacto_archivo_created_at', ['created_at'], unique=False)
+
+    # AUTOINCREMENT: el id de un contacto archivado no se vuelve a asignar a uno nuevo
+    with op.batch_alter_table('contacto', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade():
+    # Los archivados vuelven a la tabla de contactos
+    columnas = ', '.join([
+        'id', 'usuario_id', 'origen_id', 'cobertura_id', 'cobertura_actual_otra', 'promocion_id',
+        '"privadoDesregulado"', 'apellido_nombre', 'correo_electronico', 'edad_titular', 'telefono',
+        'grupo_familiar', 'plan_ofrecido', 'fecha', 'estado', 'observaciones', 'conyuge', 'conyuge_edad',
+        'created_at',
+    ])
+    op.execute(f"INSERT INTO contacto ({columnas}) SELECT {columnas} FROM contacto_archivo")
+    with op.batch_alter_table('contacto', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
+    with op.batch_alter_table('contacto_archivo', schema=None) as batch_op:
+        batch_op.drop_index('ix_contacto_archivo_created_at')
+        batch_op.drop_index('ix_contacto_archivo_usuario_created_at')
+    op.drop_table('contacto_archivo')
+
+    # Los contactos que vuelven cuentan en las estadísticas y en los bloques mensuales
+    op.execute("DELETE FROM estadistica_contacto")
+    op.execute(
+        "INSERT INTO estadistica_contacto "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), usuario_id, estado, "
+        "COALESCE(origen_id, 0), COALESCE(cobertura_id, 0), COALESCE(cobertura_actual_otra, ''), "
+        "COALESCE(promocion_id, 0), privadoDesregulado, COUNT(*) "
+        "FROM contacto GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+    op.execute("UPDATE version_mes SET version = version + 1")
+    op.execute("INSERT OR IGNORE INTO version_mes (mes, version) "
+               "SELECT DISTINCT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), 1 FROM contacto")
+    op.execute("UPDATE version_datos SET version = version + 1")
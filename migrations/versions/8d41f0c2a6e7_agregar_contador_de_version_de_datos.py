@@ -0,0 +1,32 @@
+"""agregar contador de version de datos
+
+Revision ID: 8d41f0c2a6e7
+Revises: 3a7c1e9d5b20
+Create Date: 2025-07-12 11:37:05.402918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f0c2a6e7'
+down_revision = '3a7c1e9d5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban la tabla con db.create_all() al iniciar
+    if sa.inspect(op.get_bind()).has_table('version_datos'):
+        return
+    op.create_table('version_datos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO version_datos (id, version) VALUES (1, 0)")
+
+
+def downgrade():
+    op.drop_table('version_datos')
@@ -0,0 +1,30 @@
+"""agregar indices de contactos por estado y fecha
+
+Revision ID: 9c4d1a7e3f58
+Revises: 4b9e2f6c8d13
+Create Date: 2025-07-17 15:20:48.662310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d1a7e3f58'
+down_revision = '4b9e2f6c8d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.create_index('ix_contacto_estado_created_at', ['estado', 'created_at'], unique=False)
+        batch_op.create_index('ix_contacto_created_at', ['created_at'], unique=False)
+    # Estadísticas para que el planificador elija entre los índices
+    op.execute('ANALYZE contacto')
+
+
+def downgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.drop_index('ix_contacto_created_at')
+        batch_op.drop_index('ix_contacto_estado_created_at')
@@ -0,0 +1,118 @@
+"""tipar edades, fecha y opciones de contactos
+
+Revision ID: a3f8c6e1b947
+Revises: 9c4d1a7e3f58
+Create Date: 2025-07-18 10:12:03.517942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f8c6e1b947'
+down_revision = '9c4d1a7e3f58'
+branch_labels = None
+depends_on = None
+
+ESTADOS = ('abierto', 'cerrado', 'no responde', 'vendido')
+TIPOS_AFILIACION = ('privado', 'desregulado')
+OPCIONES_CONYUGE = ('sin conyuge', 'con conyuge')
+
+# Columna de texto -> (columna entera nueva, mínimo, máximo)
+ENTEROS = {
+    'edad_titular': ('edad_titular_num', 1, 120),
+    'grupo_familiar': ('grupo_familiar_num', 1, 30),
+    'conyuge_edad': ('conyuge_edad_num', 1, 120),
+}
+
+# Columna de opciones -> (nombre del CHECK, valores, tipo anterior)
+OPCIONES = {
+    'estado': ('ck_contacto_estado', ESTADOS, sa.String(length=32)),
+    'privadoDesregulado': ('ck_contacto_privado_desregulado', TIPOS_AFILIACION, sa.String(length=32)),
+    'conyuge': ('ck_contacto_conyuge', OPCIONES_CONYUGE, sa.String(length=32)),
+}
+
+
+def _entero(columna, minimo, maximo):
+    """Número entero en el rango, o NULL si el texto cargado no lo es (p. ej. "Sin cónyuge")"""
+    valor = f"trim({columna})"
+    return (f"CASE WHEN {valor} <> '' AND {valor} NOT GLOB '*[^0-9]*' "
+            f"AND CAST({valor} AS INTEGER) BETWEEN {minimo} AND {maximo} "
+            f"THEN CAST({valor} AS INTEGER) END")
+
+
+def _opciones(nombre, valores):
+    return sa.Enum(*valores, name=nombre, native_enum=False, create_constraint=True)
+
+
+def upgrade():
+    # SQLite convierte con CAST al cambiar el tipo de una columna ('2025-07-04' AS DATE da 2025),
+    # así que los valores tipados se calculan en columnas nuevas que después reemplazan a las viejas
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for nueva, _, _ in ENTEROS.values():
+            batch_op.add_column(sa.Column(nueva, sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('fecha_dia', sa.Date(), nullable=True))
+
+    asignaciones = [f"{nueva} = {_entero(columna, minimo, maximo)}"
+                    for columna, (nueva, minimo, maximo) in ENTEROS.items()]
+    # 'dd/mm/aaaa' pasa a 'aaaa-mm-dd'; si no es una fecha válida se usa el día de created_at
+    asignaciones.append(
+        "fecha_dia = COALESCE(date(substr(fecha, 7, 4) || '-' || substr(fecha, 4, 2) || '-' || substr(fecha, 1, 2)), "
+        "date(created_at), date('now'))"
+    )
+    asignaciones.extend(f"{columna} = lower(trim({columna}))" for columna in OPCIONES)
+    op.execute(f"UPDATE contacto SET {', '.join(asignaciones)}")
+
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for columna, (nueva, _, _) in ENTEROS.items():
+            batch_op.drop_column(columna)
+            batch_op.alter_column(nueva, new_column_name=columna)
+        batch_op.drop_column('fecha')
+        batch_op.alter_column('fecha_dia', new_column_name='fecha', existing_type=sa.Date(), nullable=False)
+        for columna, (nombre, valores, anterior) in OPCIONES.items():
+            batch_op.alter_column(columna, existing_type=anterior, type_=_opciones(nombre, valores),
+                                  existing_nullable=False)
+
+    # Las filas de la exportación y las estadísticas guardadas tienen el formato anterior
+    op.execute("UPDATE version_mes SET version = version + 1")
+    op.execute("UPDATE version_datos SET version = version + 1")
+    op.execute("DELETE FROM estadistica_contacto")
+    op.execute(
+        "INSERT INTO estadistica_contacto "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), usuario_id, COALESCE(estado, ''), "
+        "COALESCE(origen, ''), COALESCE(cobertura_actual, ''), "
+        "CASE WHEN cobertura_actual = 'otros' THEN COALESCE(cobertura_actual_otra, '') ELSE '' END, "
+        "COALESCE(promocion, ''), COALESCE(privadoDesregulado, ''), COUNT(*) "
+        "FROM contacto GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('edad_titular_txt', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('grupo_familiar_txt', sa.String(length=128), nullable=True))
+        batch_op.add_column(sa.Column('conyuge_edad_txt', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('fecha_txt', sa.String(length=32), nullable=True))
+
+    op.execute(
+        "UPDATE contacto SET "
+        "edad_titular_txt = COALESCE(CAST(edad_titular AS TEXT), ''), "
+        "grupo_familiar_txt = COALESCE(CAST(grupo_familiar AS TEXT), ''), "
+        "conyuge_edad_txt = CASE WHEN conyuge = 'con conyuge' THEN CAST(conyuge_edad AS TEXT) ELSE 'Sin cónyuge' END, "
+        "fecha_txt = strftime('%d/%m/%Y', fecha)"
+    )
+
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for columna, (nombre, valores, anterior) in OPCIONES.items():
+            batch_op.alter_column(columna, existing_type=_opciones(nombre, valores), type_=anterior,
+                                  existing_nullable=False)
+        for columna in ('edad_titular', 'grupo_familiar', 'conyuge_edad', 'fecha'):
+            batch_op.drop_column(columna)
+        batch_op.alter_column('edad_titular_txt', new_column_name='edad_titular', nullable=False)
+        batch_op.alter_column('grupo_familiar_txt', new_column_name='grupo_familiar', nullable=False)
+        batch_op.alter_column('conyuge_edad_txt', new_column_name='conyuge_edad')
+        batch_op.alter_column('fecha_txt', new_column_name='fecha', nullable=False)
+
+    op.execute("UPDATE version_mes SET version = version + 1")
+    op.execute("UPDATE version_datos SET version = version + 1")
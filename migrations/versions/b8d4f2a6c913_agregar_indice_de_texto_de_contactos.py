@@ -0,0 +1,43 @@
+"""agregar indice de texto de contactos
+
+Revision ID: b8d4f2a6c913
+Revises: 6e1f9b3c7a25
+Create Date: 2025-07-25 10:41:17.302518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a6c913'
+down_revision = '6e1f9b3c7a25'
+branch_labels = None
+depends_on = None
+
+COLUMNAS = 'apellido_nombre, correo_electronico, telefono, observaciones'
+NUEVAS = 'new.apellido_nombre, new.correo_electronico, new.telefono, new.observaciones'
+VIEJAS = 'old.apellido_nombre, old.correo_electronico, old.telefono, old.observaciones'
+
+TRIGGERS = ('contacto_fts_insertar', 'contacto_fts_borrar', 'contacto_fts_actualizar')
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban la tabla y los triggers al iniciar
+    op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS contacto_fts USING fts5({COLUMNAS}, "
+               "content='contacto', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS contacto_fts_insertar AFTER INSERT ON contacto BEGIN "
+               f"INSERT INTO contacto_fts(rowid, {COLUMNAS}) VALUES (new.id, {NUEVAS}); END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS contacto_fts_borrar AFTER DELETE ON contacto BEGIN "
+               f"INSERT INTO contacto_fts(contacto_fts, rowid, {COLUMNAS}) VALUES ('delete', old.id, {VIEJAS}); END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS contacto_fts_actualizar AFTER UPDATE OF {COLUMNAS} ON contacto BEGIN "
+               f"INSERT INTO contacto_fts(contacto_fts, rowid, {COLUMNAS}) VALUES ('delete', old.id, {VIEJAS}); "
+               f"INSERT INTO contacto_fts(rowid, {COLUMNAS}) VALUES (new.id, {NUEVAS}); END")
+    # Indexar los contactos existentes
+    op.execute("INSERT INTO contacto_fts(contacto_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS contacto_fts")
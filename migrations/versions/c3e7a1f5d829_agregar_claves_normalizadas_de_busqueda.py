@@ -0,0 +1,66 @@
+"""agregar claves normalizadas de busqueda
+
+Revision ID: c3e7a1f5d829
+Revises: b8d4f2a6c913
+Create Date: 2025-07-28 09:12:44.615380
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1f5d829'
+down_revision = 'b8d4f2a6c913'
+branch_labels = None
+depends_on = None
+
+TABLAS = {'contacto': 'ix_contacto', 'contacto_archivo': 'ix_contacto_archivo'}
+LOTE = 1000
+
+
+def _normalizar(texto):
+    # Igual que busqueda_contactos.normalizar
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def _completar(bind, tabla):
+    filas = bind.execute(sa.text(f"SELECT id, apellido_nombre, correo_electronico FROM {tabla}")).fetchall()
+    sentencia = sa.text(f"UPDATE {tabla} SET apellido_nombre_normalizado = :nombre, "
+                        f"correo_normalizado = :correo WHERE id = :id")
+    for inicio in range(0, len(filas), LOTE):
+        bind.execute(sentencia, [
+            {'id': id_, 'nombre': _normalizar(nombre), 'correo': _normalizar(correo)}
+            for id_, nombre, correo in filas[inicio:inicio + LOTE]
+        ])
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for tabla, prefijo in TABLAS.items():
+        # Versiones anteriores de gestor.py creaban las tablas con db.create_all() al iniciar
+        if 'correo_normalizado' in {c['name'] for c in inspector.get_columns(tabla)}:
+            continue
+        # SQLite solo agrega columnas NOT NULL con un valor por defecto
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('apellido_nombre_normalizado', sa.String(length=128), nullable=False,
+                                          server_default=''))
+            batch_op.add_column(sa.Column('correo_normalizado', sa.String(length=128), nullable=False,
+                                          server_default=''))
+        _completar(bind, tabla)
+        # El nombre no lleva índice: se busca con el índice de texto completo
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.create_index(f'{prefijo}_correo_normalizado', ['correo_normalizado'], unique=False)
+
+
+def downgrade():
+    for tabla, prefijo in TABLAS.items():
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.drop_index(f'{prefijo}_correo_normalizado')
+            batch_op.drop_column('correo_normalizado')
+            batch_op.drop_column('apellido_nombre_normalizado')
@@ -0,0 +1,36 @@
+"""agregar version por mes de contactos
+
+Revision ID: c5e2b7a91f34
+Revises: 8d41f0c2a6e7
+Create Date: 2025-07-14 16:21:50.775310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2b7a91f34'
+down_revision = '8d41f0c2a6e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban la tabla con db.create_all() al iniciar
+    if sa.inspect(op.get_bind()).has_table('version_mes'):
+        return
+    op.create_table('version_mes',
+        sa.Column('mes', sa.String(length=10), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('mes')
+    )
+    # Registrar los meses que ya tienen contactos
+    op.execute(
+        "INSERT INTO version_mes (mes, version) "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), 1 FROM contacto GROUP BY 1"
+    )
+
+
+def downgrade():
+    op.drop_table('version_mes')
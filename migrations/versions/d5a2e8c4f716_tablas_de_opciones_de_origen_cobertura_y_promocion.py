@@ -0,0 +1,173 @@
+"""tablas de opciones de origen, cobertura y promocion
+
+Revision ID: d5a2e8c4f716
+Revises: a3f8c6e1b947
+Create Date: 2025-07-21 09:41:27.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a2e8c4f716'
+down_revision = 'a3f8c6e1b947'
+branch_labels = None
+depends_on = None
+
+# Opciones con las que se crean las tablas (las de opciones.OPCIONES_INICIALES al crear la migración)
+OPCIONES_INICIALES = {
+    'origen': [
+        ('propio', 'Propio'),
+        ('elegi mejor', 'Elegi Mejor'),
+        ('wise', 'Wise'),
+        ('guardia', 'Guardia'),
+        ('broker', 'Broker'),
+    ],
+    'cobertura': [
+        ('smg', 'SMG'),
+        ('osde', 'OSDE'),
+        ('prevencion', 'Prevencion'),
+        ('sancor', 'Sancor'),
+        ('medife', 'Medife'),
+        ('obra social', 'Obra social'),
+        ('otros', 'Otros'),
+    ],
+    'promocion': [
+        ('promocion sancor', 'Promocion Sancor'),
+        ('promocion medicus', 'Promocion Medicus'),
+        ('promocion omint', 'Promocion Omint'),
+        ('promocion prevencion', 'Promocion Prevencion'),
+        ('promocion smg', 'Promocion SMG'),
+        ('promocion medife', 'Promocion Medife'),
+        ('osde', 'Osde'),
+        ('servicios insatisfactorios', 'Servicios insatisfactorios'),
+        ('no puede pagarlo', 'No puede pagarlo'),
+        ('otros prepagos', 'Otros prepagos'),
+    ],
+}
+
+# Tabla de opciones -> (columna de texto anterior, columna con el id)
+COLUMNAS = {
+    'origen': ('origen', 'origen_id'),
+    'cobertura': ('cobertura_actual', 'cobertura_id'),
+    'promocion': ('promocion', 'promocion_id'),
+}
+
+
+def _estadisticas(origen, cobertura, promocion, tipo):
+    op.create_table('estadistica_contacto',
+        sa.Column('mes', sa.String(length=10), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('estado', sa.String(length=32), nullable=False),
+        sa.Column(origen, tipo, nullable=False),
+        sa.Column(cobertura, tipo, nullable=False),
+        sa.Column('cobertura_otra', sa.String(length=128), nullable=False),
+        sa.Column(promocion, tipo, nullable=False),
+        sa.Column('privado_desregulado', sa.String(length=32), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('mes', 'usuario_id', 'estado', origen, cobertura,
+                                'cobertura_otra', promocion, 'privado_desregulado')
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    for tabla, opciones in OPCIONES_INICIALES.items():
+        # Versiones anteriores de gestor.py creaban (y cargaban) las tablas con db.create_all() al iniciar
+        if not sa.inspect(bind).has_table(tabla):
+            op.create_table(tabla,
+                sa.Column('id', sa.Integer(), nullable=False),
+                sa.Column('clave', sa.String(length=64), nullable=False),
+                sa.Column('etiqueta', sa.String(length=64), nullable=False),
+                sa.Column('orden', sa.Integer(), nullable=False),
+                sa.PrimaryKeyConstraint('id'),
+                sa.UniqueConstraint('clave')
+            )
+        for orden, (clave, etiqueta) in enumerate(opciones, 1):
+            bind.execute(sa.text(f"INSERT OR IGNORE INTO {tabla} (clave, etiqueta, orden) "
+                                 "VALUES (:clave, :etiqueta, :orden)"),
+                         dict(clave=clave, etiqueta=etiqueta, orden=orden))
+
+    # Los orígenes y promociones cargados que no están en la lista pasan a ser opciones;
+    # las coberturas desconocidas (texto libre de versiones anteriores) quedan como "otros"
+    for tabla in ('origen', 'promocion'):
+        columna = COLUMNAS[tabla][0]
+        op.execute(
+            f"INSERT OR IGNORE INTO {tabla} (clave, etiqueta, orden) "
+            f"SELECT lower(trim({columna})), min(trim({columna})), (SELECT COALESCE(max(orden), 0) + 1 FROM {tabla}) "
+            f"FROM contacto WHERE trim(COALESCE({columna}, '')) <> '' GROUP BY lower(trim({columna}))"
+        )
+
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for _, columna_id in COLUMNAS.values():
+            batch_op.add_column(sa.Column(columna_id, sa.Integer(), nullable=True))
+
+    cobertura = "(SELECT id FROM cobertura WHERE clave = lower(trim(contacto.cobertura_actual)))"
+    desconocida = f"trim(COALESCE(cobertura_actual, '')) <> '' AND {cobertura} IS NULL"
+    op.execute(
+        "UPDATE contacto SET "
+        "origen_id = (SELECT id FROM origen WHERE clave = lower(trim(contacto.origen))), "
+        "promocion_id = (SELECT id FROM promocion WHERE clave = lower(trim(contacto.promocion))), "
+        f"cobertura_id = CASE WHEN {desconocida} THEN (SELECT id FROM cobertura WHERE clave = 'otros') "
+        f"ELSE {cobertura} END, "
+        f"cobertura_actual_otra = CASE WHEN {desconocida} "
+        "THEN COALESCE(NULLIF(trim(cobertura_actual_otra), ''), trim(cobertura_actual)) "
+        "WHEN lower(trim(cobertura_actual)) = 'otros' THEN NULLIF(trim(cobertura_actual_otra), '') END"
+    )
+
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for tabla, (columna, columna_id) in COLUMNAS.items():
+            batch_op.drop_column(columna)
+            batch_op.create_foreign_key(f'fk_contacto_{columna_id}', tabla, [columna_id], ['id'])
+
+    # Las estadísticas se agrupan por los ids de las opciones (0 = sin opción)
+    op.drop_table('estadistica_contacto')
+    _estadisticas('origen_id', 'cobertura_id', 'promocion_id', sa.Integer())
+    op.execute(
+        "INSERT INTO estadistica_contacto "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), usuario_id, estado, "
+        "COALESCE(origen_id, 0), COALESCE(cobertura_id, 0), COALESCE(cobertura_actual_otra, ''), "
+        "COALESCE(promocion_id, 0), privadoDesregulado, COUNT(*) "
+        "FROM contacto GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+
+    # Las filas de la exportación guardadas tienen las claves y no las etiquetas
+    op.execute("UPDATE version_mes SET version = version + 1")
+    op.execute("UPDATE version_datos SET version = version + 1")
+
+
+def downgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('origen', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('cobertura_actual', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('promocion', sa.String(length=64), nullable=True))
+
+    op.execute(
+        "UPDATE contacto SET " + ", ".join(
+            f"{columna} = (SELECT clave FROM {tabla} WHERE id = contacto.{columna_id})"
+            for tabla, (columna, columna_id) in COLUMNAS.items()
+        )
+    )
+
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        for _, columna_id in COLUMNAS.values():
+            batch_op.drop_constraint(f'fk_contacto_{columna_id}', type_='foreignkey')
+            batch_op.drop_column(columna_id)
+
+    op.drop_table('estadistica_contacto')
+    _estadisticas('origen', 'cobertura', 'promocion', sa.String(length=64))
+    op.execute(
+        "INSERT INTO estadistica_contacto "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), usuario_id, estado, "
+        "COALESCE(origen, ''), COALESCE(cobertura_actual, ''), "
+        "CASE WHEN cobertura_actual = 'otros' THEN COALESCE(cobertura_actual_otra, '') ELSE '' END, "
+        "COALESCE(promocion, ''), privadoDesregulado, COUNT(*) "
+        "FROM contacto GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+
+    for tabla in OPCIONES_INICIALES:
+        op.drop_table(tabla)
+
+    op.execute("UPDATE version_mes SET version = version + 1")
+    op.execute("UPDATE version_datos SET version = version + 1")
@@ -0,0 +1,80 @@
+"""agregar clave de telefono de contactos
+
+Revision ID: e4b8c2d6f931
+Revises: c3e7a1f5d829
+Create Date: 2025-07-30 11:27:05.184622
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8c2d6f931'
+down_revision = 'c3e7a1f5d829'
+branch_labels = None
+depends_on = None
+
+TABLAS = ('contacto', 'contacto_archivo')
+PREFIJO_PAIS = '54'
+LOTE = 1000
+
+
+def _normalizar_telefono(telefono):
+    # Igual que busqueda_contactos.normalizar_telefono
+    texto = (telefono or '').strip()
+    digitos = re.sub(r'\D', '', texto)
+    internacional = texto.startswith('+') or digitos.startswith('00')
+    digitos = digitos[2:] if digitos.startswith('00') else digitos
+    if internacional and not digitos.startswith(PREFIJO_PAIS):
+        return '+' + digitos if digitos else ''
+    if internacional or (digitos.startswith(PREFIJO_PAIS) and len(digitos) in (12, 13)):
+        digitos = digitos[len(PREFIJO_PAIS):]
+        if digitos.startswith('9') and len(digitos) == 11:
+            digitos = digitos[1:]
+    if digitos.startswith('0'):
+        digitos = digitos[1:]
+    if len(digitos) == 12:
+        for largo in (2, 3, 4):
+            if digitos[largo:largo + 2] == '15':
+                digitos = digitos[:largo] + digitos[largo + 2:]
+                break
+    if len(digitos) == 10:
+        return '+' + PREFIJO_PAIS + digitos
+    return digitos
+
+
+def _completar(bind, tabla):
+    filas = bind.execute(sa.text(f"SELECT id, telefono FROM {tabla}")).fetchall()
+    sentencia = sa.text(f"UPDATE {tabla} SET telefono_normalizado = :clave WHERE id = :id")
+    for inicio in range(0, len(filas), LOTE):
+        bind.execute(sentencia, [
+            {'id': id_, 'clave': _normalizar_telefono(telefono)} for id_, telefono in filas[inicio:inicio + LOTE]
+        ])
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for tabla in TABLAS:
+        # Versiones anteriores de gestor.py creaban las tablas con db.create_all() al iniciar
+        if 'telefono_normalizado' in {c['name'] for c in inspector.get_columns(tabla)}:
+            continue
+        # SQLite solo agrega columnas NOT NULL con un valor por defecto
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('telefono_normalizado', sa.String(length=32), nullable=False,
+                                          server_default=''))
+        _completar(bind, tabla)
+    if 'ix_contacto_telefono_normalizado' not in {i['name'] for i in inspector.get_indexes('contacto')}:
+        with op.batch_alter_table('contacto', schema=None) as batch_op:
+            batch_op.create_index('ix_contacto_telefono_normalizado', ['telefono_normalizado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('contacto', schema=None) as batch_op:
+        batch_op.drop_index('ix_contacto_telefono_normalizado')
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.drop_column('telefono_normalizado')
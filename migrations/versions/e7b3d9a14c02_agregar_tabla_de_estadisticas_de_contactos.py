@@ -0,0 +1,48 @@
+"""agregar tabla de estadisticas de contactos
+
+Revision ID: e7b3d9a14c02
+Revises: c5e2b7a91f34
+Create Date: 2025-07-16 11:05:12.418227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d9a14c02'
+down_revision = 'c5e2b7a91f34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban la tabla con db.create_all() al iniciar
+    if sa.inspect(op.get_bind()).has_table('estadistica_contacto'):
+        return
+    op.create_table('estadistica_contacto',
+        sa.Column('mes', sa.String(length=10), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('estado', sa.String(length=32), nullable=False),
+        sa.Column('origen', sa.String(length=64), nullable=False),
+        sa.Column('cobertura', sa.String(length=64), nullable=False),
+        sa.Column('cobertura_otra', sa.String(length=128), nullable=False),
+        sa.Column('promocion', sa.String(length=64), nullable=False),
+        sa.Column('privado_desregulado', sa.String(length=32), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('mes', 'usuario_id', 'estado', 'origen', 'cobertura',
+                                'cobertura_otra', 'promocion', 'privado_desregulado')
+    )
+    # Cargar los contadores de los contactos existentes
+    op.execute(
+        "INSERT INTO estadistica_contacto "
+        "SELECT COALESCE(strftime('%Y-%m', created_at), 'sin-fecha'), usuario_id, COALESCE(estado, ''), "
+        "COALESCE(origen, ''), COALESCE(cobertura_actual, ''), "
+        "CASE WHEN cobertura_actual = 'otros' THEN COALESCE(cobertura_actual_otra, '') ELSE '' END, "
+        "COALESCE(promocion, ''), COALESCE(privadoDesregulado, ''), COUNT(*) "
+        "FROM contacto GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+
+
+def downgrade():
+    op.drop_table('estadistica_contacto')
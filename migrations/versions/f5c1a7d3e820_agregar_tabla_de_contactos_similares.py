@@ -0,0 +1,37 @@
+"""agregar tabla de contactos similares
+
+Revision ID: f5c1a7d3e820
+Revises: e4b8c2d6f931
+Create Date: 2025-08-04 10:12:46.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c1a7d3e820'
+down_revision = 'e4b8c2d6f931'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores de gestor.py creaban las tablas con db.create_all() al iniciar
+    if sa.inspect(op.get_bind()).has_table('contacto_similar'):
+        return
+    # Queda vacía hasta que corra "flask agrupar-similares"
+    op.create_table('contacto_similar',
+        sa.Column('contacto_id', sa.Integer(), nullable=False),
+        sa.Column('grupo', sa.Integer(), nullable=False),
+        sa.Column('puntaje', sa.Float(), nullable=False),
+        sa.Column('calculado_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['contacto_id'], ['contacto.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('contacto_id')
+    )
+    with op.batch_alter_table('contacto_similar', schema=None) as batch_op:
+        batch_op.create_index('ix_contacto_similar_grupo', ['grupo'], unique=False)
+
+
+def downgrade():
+    op.drop_table('contacto_similar')
@@ -1,11 +1,34 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import relationship
 import pytz
 
 db = SQLAlchemy()
 
+
+def _activar_claves_foraneas(dbapi_connection, connection_record):
+    """SQLite solo aplica las claves foráneas (y ON DELETE CASCADE) si se activan en cada conexión"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+event.listen(Engine, 'connect', _activar_claves_foraneas)
+
+# Valores posibles de los campos de opción fija de Contacto
+ESTADOS = ('abierto', 'cerrado', 'no responde', 'vendido')
+TIPOS_AFILIACION = ('privado', 'desregulado')
+OPCIONES_CONYUGE = ('sin conyuge', 'con conyuge')
+
+
+def _opciones(nombre, valores):
+    """Columna de texto restringida a los valores dados (CHECK en SQLite)"""
+    return db.Enum(*valores, name=nombre, native_enum=False, create_constraint=True, validate_strings=True)
+
 def get_argentina_time():
     """Obtiene la fecha y hora actual en la zona horaria de Chile + 1 hora (para coincidir con Buenos Aires)"""
     chile_tz = pytz.timezone('America/Santiago')
@@ -26,7 +49,9 @@ class Usuario(db.Model, UserMixin):
     reset_token = db.Column(db.String(100), unique=True)
     reset_token_expires = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=get_argentina_time)
-    contactos = relationship('Contacto', backref='usuario', lazy=True, cascade='all, delete-orphan')
+    # Al borrar un usuario sus contactos los borra la base (ON DELETE CASCADE), sin cargarlos; ver baja_usuarios.py
+    contactos = relationship('Contacto', backref='usuario', lazy=True, cascade='all, delete-orphan',
+                             passive_deletes=True)
 
     def get_id(self):
         return str(self.id)
@@ -43,23 +68,195 @@ class Usuario(db.Model, UserMixin):
     def is_anonymous(self):
         return False
 
-class Contacto(db.Model):
+class _Opcion:
+    """Opción de una lista del formulario; ver opciones.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    clave = db.Column(db.String(64), nullable=False, unique=True)
+    etiqueta = db.Column(db.String(64), nullable=False)
+    orden = db.Column(db.Integer, nullable=False, default=0)
+
+class Origen(_Opcion, db.Model):
+    __tablename__ = 'origen'
+
+class Cobertura(_Opcion, db.Model):
+    __tablename__ = 'cobertura'
+
+class Promocion(_Opcion, db.Model):
+    __tablename__ = 'promocion'
+
+def _cargar_opciones_iniciales(tabla, connection, **kw):
+    from opciones import cargar_iniciales
+    cargar_iniciales(tabla, connection)
+
+for _modelo in (Origen, Cobertura, Promocion):
+    event.listen(_modelo.__table__, 'after_create', _cargar_opciones_iniciales)
+
+def _opcion_por_clave(campo, columna):
+    """Propiedad que lee y asigna la opción por su clave y guarda su id en la columna"""
+    def leer(self):
+        from opciones import clave
+        return clave(campo, getattr(self, columna))
+
+    def asignar(self, valor):
+        from opciones import id_de
+        setattr(self, columna, id_de(campo, valor))
+
+    return property(leer, asignar)
+
+class _DatosContacto:
+    """Columnas de un contacto, compartidas por la tabla de contactos y la de archivados"""
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'), nullable=False)
-    origen = db.Column(db.String(64), nullable=True)
-    cobertura_actual = db.Column(db.String(64), nullable=True)
+    origen_id = db.Column(db.Integer, db.ForeignKey('origen.id'), nullable=True)
+    cobertura_id = db.Column(db.Integer, db.ForeignKey('cobertura.id'), nullable=True)
+    # Texto de la cobertura cuando se elige "otros"
     cobertura_actual_otra = db.Column(db.String(128), nullable=True)
-    promocion = db.Column(db.String(64), nullable=True)
-    privadoDesregulado = db.Column(db.String(32), nullable=False)
+    promocion_id = db.Column(db.Integer, db.ForeignKey('promocion.id'), nullable=True)
+    privadoDesregulado = db.Column(_opciones('ck_contacto_privado_desregulado', TIPOS_AFILIACION), nullable=False)
     apellido_nombre = db.Column(db.String(128), nullable=False)
     correo_electronico = db.Column(db.String(128), nullable=False)
-    edad_titular = db.Column(db.String(32), nullable=False)
+    # Edades y grupo familiar en años/personas; nulos si el valor cargado no era un número válido
+    edad_titular = db.Column(db.SmallInteger, nullable=True)
     telefono = db.Column(db.String(32), nullable=False)
-    grupo_familiar = db.Column(db.String(128), nullable=False)
+    grupo_familiar = db.Column(db.SmallInteger, nullable=True)
     plan_ofrecido = db.Column(db.String(128), nullable=False)
-    fecha = db.Column(db.String(32), nullable=False)
-    estado = db.Column(db.String(32), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    estado = db.Column(_opciones('ck_contacto_estado', ESTADOS), nullable=False)
     observaciones = db.Column(db.Text)
-    conyuge = db.Column(db.String(32), nullable=False)
-    conyuge_edad = db.Column(db.String(32), nullable=True)
-    created_at = db.Column(db.DateTime, default=get_argentina_time)
\ No newline at end of file
+    conyuge = db.Column(_opciones('ck_contacto_conyuge', OPCIONES_CONYUGE), nullable=False)
+    conyuge_edad = db.Column(db.SmallInteger, nullable=True)
+    created_at = db.Column(db.DateTime, default=get_argentina_time)
+    # apellido_nombre y correo_electronico normalizados para buscar y clave E.164 del teléfono
+    # para encontrar repetidos; se calculan al guardar
+    apellido_nombre_normalizado = db.Column(db.String(128), nullable=False)
+    correo_normalizado = db.Column(db.String(128), nullable=False)
+    telefono_normalizado = db.Column(db.String(32), nullable=False)
+
+    # Clave de la opción elegida ('propio', 'osde', ...); en consultas SQL usar las columnas *_id
+    origen = _opcion_por_clave('origen', 'origen_id')
+    cobertura_actual = _opcion_por_clave('cobertura', 'cobertura_id')
+    promocion = _opcion_por_clave('promocion', 'promocion_id')
+
+class Contacto(_DatosContacto, db.Model):
+    __table_args__ = (
+        # Tabla "Mis contactos", exportación y búsquedas de un vendedor
+        db.Index('ix_contacto_usuario_created_at', 'usuario_id', 'created_at'),
+        # Tabla del admin filtrada por estado, más nuevos primero
+        db.Index('ix_contacto_estado_created_at', 'estado', 'created_at'),
+        # Bloques mensuales de la exportación, orden del listado y contactos cargados hoy
+        db.Index('ix_contacto_created_at', 'created_at'),
+        # Búsquedas por el comienzo del email (las de nombre usan el índice de texto completo)
+        db.Index('ix_contacto_correo_normalizado', 'correo_normalizado'),
+        # Contactos repetidos (duplicados_contactos.py)
+        db.Index('ix_contacto_telefono_normalizado', 'telefono_normalizado'),
+        # Los ids de los contactos archivados no se reutilizan
+        {'sqlite_autoincrement': True},
+    )
+
+def _crear_indice_busqueda(tabla, connection, **kw):
+    from busqueda_contactos import crear_indice_busqueda
+    crear_indice_busqueda(connection)
+
+def _borrar_indice_busqueda(tabla, connection, **kw):
+    from busqueda_contactos import borrar_indice_busqueda
+    borrar_indice_busqueda(connection)
+
+# Índice de texto completo de las búsquedas; ver busqueda_contactos.py
+event.listen(Contacto.__table__, 'after_create', _crear_indice_busqueda)
+event.listen(Contacto.__table__, 'before_drop', _borrar_indice_busqueda)
+
+class ContactoArchivo(_DatosContacto, db.Model):
+    """Contacto cerrado o vendido hace más de un año, movido fuera de la tabla de contactos.
+
+    Conserva el id que tenía en contacto; lo cargan y consultan archivo_contactos.py.
+    """
+    __tablename__ = 'contacto_archivo'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    archivado_at = db.Column(db.DateTime, nullable=False, default=get_argentina_time)
+
+    __table_args__ = (
+        db.Index('ix_contacto_archivo_usuario_created_at', 'usuario_id', 'created_at'),
+        db.Index('ix_contacto_archivo_created_at', 'created_at'),
+        db.Index('ix_contacto_archivo_correo_normalizado', 'correo_normalizado'),
+    )
+
+def _normalizar_claves_busqueda(mapper, connection, contacto):
+    from busqueda_contactos import claves_busqueda
+    claves = claves_busqueda(contacto.apellido_nombre, contacto.correo_electronico, contacto.telefono)
+    for columna, valor in claves.items():
+        setattr(contacto, columna, valor)
+
+for _modelo in (Contacto, ContactoArchivo):
+    event.listen(_modelo, 'before_insert', _normalizar_claves_busqueda)
+    event.listen(_modelo, 'before_update', _normalizar_claves_busqueda)
+
+class ContactoSimilar(db.Model):
+    """Contacto de un grupo de contactos parecidos, calculado por similares_contactos.py.
+
+    Cada contacto está en un solo grupo; puntaje es su mayor parecido con otro
+    contacto del grupo. Al borrar o archivar el contacto se borra su fila.
+    """
+    __tablename__ = 'contacto_similar'
+    contacto_id = db.Column(db.Integer, db.ForeignKey('contacto.id', ondelete='CASCADE'), primary_key=True)
+    grupo = db.Column(db.Integer, nullable=False)
+    puntaje = db.Column(db.Float, nullable=False)
+    calculado_at = db.Column(db.DateTime, nullable=False, default=get_argentina_time)
+
+    __table_args__ = (
+        # Página de grupos del admin y descarga, en orden de grupo
+        db.Index('ix_contacto_similar_grupo', 'grupo'),
+    )
+
+class TrabajoExportacion(db.Model):
+    """Exportación a Excel ejecutada en segundo plano"""
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'), nullable=False)
+    tipo = db.Column(db.String(16), nullable=False)  # 'admin' o 'usuario'
+    estado = db.Column(db.String(16), nullable=False, default='pendiente')  # pendiente, en_proceso, completado, error
+    hoja_actual = db.Column(db.String(64))
+    filas_escritas = db.Column(db.Integer, nullable=False, default=0)
+    archivo = db.Column(db.String(255))
+    nombre_archivo = db.Column(db.String(128))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=get_argentina_time)
+    # Último latido del trabajo mientras corre (ver trabajos_exportacion.py)
+    updated_at = db.Column(db.DateTime, default=get_argentina_time)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'hoja_actual': self.hoja_actual,
+            'filas_escritas': self.filas_escritas,
+            'nombre_archivo': self.nombre_archivo,
+            'error': self.error,
+        }
+
+class VersionDatos(db.Model):
+    """Contador de cambios en contactos y usuarios; identifica las exportaciones en caché"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class VersionMes(db.Model):
+    """Contador de cambios de los contactos de cada mes de carga ('YYYY-MM' o 'sin-fecha')"""
+    mes = db.Column(db.String(10), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class EstadisticaContacto(db.Model):
+    """Cantidad de contactos por mes de carga, usuario y opciones elegidas.
+
+    La mantiene estadisticas.py en cada flush; los valores nulos se guardan
+    como '' en los textos y como 0 en los ids de opciones.
+    """
+    __tablename__ = 'estadistica_contacto'
+    mes = db.Column(db.String(10), primary_key=True)
+    usuario_id = db.Column(db.Integer, primary_key=True)
+    estado = db.Column(db.String(32), primary_key=True)
+    origen_id = db.Column(db.Integer, primary_key=True)
+    cobertura_id = db.Column(db.Integer, primary_key=True)
+    cobertura_otra = db.Column(db.String(128), primary_key=True)
+    promocion_id = db.Column(db.Integer, primary_key=True)
+    privado_desregulado = db.Column(db.String(32), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,189 @@
+"""
+Opciones de origen, cobertura y promoción ("¿Por qué no toma la cobertura?").
+
+Cada lista es una tabla (origen, cobertura, promocion) y los contactos guardan
+el id de la opción elegida. Las tablas se leen una vez por proceso y quedan en
+un catálogo inmutable que usan el formulario, las validaciones, los listados y
+las exportaciones sin volver a consultar la base.
+
+Agregar una opción es insertar una fila (comando "flask agregar-opcion"), sin
+cambiar código. El proceso que la agrega recarga su catálogo; los demás
+comparan al principio de cada pedido el último id de cada tabla con el del
+catálogo que tienen (actualizar) y lo recargan si cambió, así la opción
+aparece en sus formularios y validaciones sin reiniciarlos.
+"""
+
+from collections import namedtuple
+import logging
+import threading
+from types import MappingProxyType
+
+from sqlalchemy import func, insert, select
+
+from models import db, Origen, Cobertura, Promocion
+
+# Campo de Contacto -> tabla de opciones
+MODELOS = {
+    'origen': Origen,
+    'cobertura': Cobertura,
+    'promocion': Promocion,
+}
+
+# Opciones con las que se crean las tablas: (clave, etiqueta) en el orden del formulario
+OPCIONES_INICIALES = {
+    'origen': [
+        ('propio', 'Propio'),
+        ('elegi mejor', 'Elegi Mejor'),
+        ('wise', 'Wise'),
+        ('guardia', 'Guardia'),
+        ('broker', 'Broker'),
+    ],
+    'cobertura': [
+        ('smg', 'SMG'),
+        ('osde', 'OSDE'),
+        ('prevencion', 'Prevencion'),
+        ('sancor', 'Sancor'),
+        ('medife', 'Medife'),
+        ('obra social', 'Obra social'),
+        ('otros', 'Otros'),
+    ],
+    'promocion': [
+        ('promocion sancor', 'Promocion Sancor'),
+        ('promocion medicus', 'Promocion Medicus'),
+        ('promocion omint', 'Promocion Omint'),
+        ('promocion prevencion', 'Promocion Prevencion'),
+        ('promocion smg', 'Promocion SMG'),
+        ('promocion medife', 'Promocion Medife'),
+        ('osde', 'Osde'),
+        ('servicios insatisfactorios', 'Servicios insatisfactorios'),
+        ('no puede pagarlo', 'No puede pagarlo'),
+        ('otros prepagos', 'Otros prepagos'),
+    ],
+}
+
+# Cobertura que se completa con texto libre (Contacto.cobertura_actual_otra)
+COBERTURA_OTRA = 'otros'
+
+Opcion = namedtuple('Opcion', 'id clave etiqueta')
+
+
+class OpcionInvalida(ValueError):
+    """Clave que no corresponde a ninguna opción del campo"""
+
+
+class Catalogo:
+    """Opciones de un campo, en orden, indexadas por id y por clave (solo lectura)"""
+
+    def __init__(self, opciones):
+        self.opciones = tuple(opciones)
+        self.por_id = MappingProxyType({o.id: o for o in self.opciones})
+        self.por_clave = MappingProxyType({o.clave: o for o in self.opciones})
+
+    def choices(self):
+        """Pares (clave, etiqueta) para un SelectField o un <select>"""
+        return [(o.clave, o.etiqueta) for o in self.opciones]
+
+
+_catalogos = None
+_firma = None
+_lock = threading.Lock()
+
+
+def firma():
+    """Último id de cada tabla de opciones; cambia cuando se agrega una opción"""
+    consulta = select(*(select(func.max(modelo.id)).scalar_subquery() for modelo in MODELOS.values()))
+    return tuple(db.session.execute(consulta).one())
+
+
+def _leer():
+    catalogos = {}
+    for campo, modelo in MODELOS.items():
+        filas = db.session.query(modelo.id, modelo.clave, modelo.etiqueta).order_by(modelo.orden, modelo.id)
+        catalogos[campo] = Catalogo(Opcion(*fila) for fila in filas)
+    return MappingProxyType(catalogos)
+
+
+def recargar():
+    """Vuelve a leer las tablas de opciones"""
+    global _catalogos, _firma
+    firma_leida = firma()
+    catalogos = _leer()
+    with _lock:
+        _catalogos, _firma = catalogos, firma_leida
+    return catalogos
+
+
+def actualizar():
+    """Recarga el catálogo si otro proceso agregó opciones desde la última lectura (una consulta)"""
+    if _catalogos is None or firma() != _firma:
+        recargar()
+
+
+def invalidar():
+    global _catalogos, _firma
+    with _lock:
+        _catalogos, _firma = None, None
+
+
+def catalogo(campo):
+    catalogos = _catalogos
+    if catalogos is None:
+        catalogos = recargar()
+    return catalogos[campo]
+
+
+def opcion(campo, opcion_id):
+    """Opción con ese id, o None si opcion_id es None; recarga el catálogo si el id es nuevo"""
+    if opcion_id is None:
+        return None
+    encontrada = catalogo(campo).por_id.get(opcion_id)
+    if encontrada is None:
+        encontrada = recargar()[campo].por_id.get(opcion_id)
+    return encontrada
+
+
+def clave(campo, opcion_id):
+    encontrada = opcion(campo, opcion_id)
+    return encontrada.clave if encontrada else None
+
+
+def etiqueta(campo, opcion_id):
+    encontrada = opcion(campo, opcion_id)
+    return encontrada.etiqueta if encontrada else None
+
+
+def id_de(campo, clave_opcion):
+    """Id de la opción con esa clave; None para un valor vacío"""
+    if not clave_opcion:
+        return None
+    encontrada = catalogo(campo).por_clave.get(clave_opcion)
+    if encontrada is None:
+        encontrada = recargar()[campo].por_clave.get(clave_opcion)
+    if encontrada is None:
+        raise OpcionInvalida(f'Opción de {campo} no válida: {clave_opcion}')
+    return encontrada.id
+
+
+def agregar_opcion(campo, clave_opcion, etiqueta_opcion):
+    """Agrega una opción al final de la lista del campo y recarga el catálogo"""
+    modelo = MODELOS[campo]
+    clave_opcion = clave_opcion.strip().lower()
+    if db.session.query(modelo.id).filter_by(clave=clave_opcion).first() is not None:
+        raise OpcionInvalida(f'La opción "{clave_opcion}" ya existe en {campo}')
+    orden = (db.session.query(func.max(modelo.orden)).scalar() or 0) + 1
+    nueva = modelo(clave=clave_opcion, etiqueta=etiqueta_opcion.strip(), orden=orden)
+    db.session.add(nueva)
+    db.session.commit()
+    recargar()
+    logging.info(f"Opción agregada en {campo}: {clave_opcion}")
+    return nueva.id
+
+
+def cargar_iniciales(tabla, connection):
+    """Inserta las opciones iniciales en una tabla de opciones recién creada"""
+    campo = next(campo for campo, modelo in MODELOS.items() if modelo.__table__ is tabla)
+    connection.execute(insert(tabla), [
+        dict(clave=clave_opcion, etiqueta=etiqueta_opcion, orden=orden)
+        for orden, (clave_opcion, etiqueta_opcion) in enumerate(OPCIONES_INICIALES[campo], 1)
+    ])
+    invalidar()
@@ -0,0 +1,311 @@
+"""
+Contactos parecidos: el mismo cliente cargado con diferencias ("Juan Perez" y
+"Pérez Juan", un error de tipeo en el email) que duplicados_contactos.py no
+encuentra porque compara claves exactas.
+
+El comando "flask agrupar-similares" (tarea programada) recorre la tabla de
+contactos en tres pasos:
+
+1. Bloques: cada contacto cae en un bloque por cada clave que tiene (últimos
+   dígitos del teléfono, dominio y comienzo del email, palabras del nombre
+   ordenadas) y solo se compara con los de sus bloques. Dentro de un bloque
+   ordenado cada contacto se compara con sus VENTANA_BLOQUE vecinos, así que
+   los pares crecen con la cantidad de contactos y no con su cuadrado, aunque
+   haya cientos de "juan perez".
+2. Puntaje: los trigramas del nombre y del email de cada contacto se guardan
+   como una firma de bits y el parecido de todos los pares se calcula por
+   lotes con numpy (trigramas en común / trigramas en total), sin comparar
+   textos de a uno en Python.
+3. Grupos: los pares con puntaje de al menos UMBRAL_SIMILITUD se unen como en
+   el reporte de repetidos y el resultado reemplaza al anterior en la tabla
+   contacto_similar, que el admin revisa en /admin/similares o descarga en Excel.
+"""
+
+import logging
+import time
+import zlib
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import delete, func, insert, select
+
+from models import db, Usuario, Contacto, ContactoSimilar, get_argentina_time
+from duplicados_contactos import MINIMO_DIGITOS_TELEFONO, agrupar_pares
+from estilos_exportacion import aplicar_estilo, registrar_estilos
+
+# Parecido mínimo (de 0 a 1) para poner dos contactos en el mismo grupo
+UMBRAL_SIMILITUD = 0.75
+# Peso de cada dato en el puntaje; solo cuentan los datos que tienen los dos contactos
+PESOS = {'nombre': 0.4, 'correo': 0.3, 'telefono': 0.3}
+# Un nombre parecido solo no alcanza: hacen falta al menos dos datos para comparar
+MINIMO_DATOS_COMPARADOS = 2
+# Parecido de dos teléfonos distintos que terminan igual (p. ej. uno sin característica)
+SIMILITUD_SUFIJO_TELEFONO = 0.9
+DIGITOS_SUFIJO_TELEFONO = 7
+# Letras del comienzo del email que, junto con el dominio, forman la clave de bloque
+LETRAS_PREFIJO_CORREO = 3
+# Vecinos con los que se compara cada contacto dentro de su bloque; en los bloques de hasta
+# VENTANA_BLOQUE + 1 contactos se comparan todos contra todos
+VENTANA_BLOQUE = 20
+BITS_FIRMA = 256
+TAMANO_LOTE_PARES = 500_000
+TAMANO_LOTE_GUARDADO = 1000
+GRUPOS_POR_PAGINA = 50
+
+ENCABEZADOS_SIMILARES = ['Grupo', 'Puntaje', 'ID', 'Vendedor', 'Apellido y Nombre', 'Email', 'Teléfono', 'Estado',
+                         'Fecha de carga']
+
+
+def cargar_contactos():
+    """DataFrame (id, nombre, correo, telefono) con las claves normalizadas de todos los contactos"""
+    filas = db.session.execute(
+        select(Contacto.id, Contacto.apellido_nombre_normalizado, Contacto.correo_normalizado,
+               Contacto.telefono_normalizado).order_by(Contacto.id)
+    ).all()
+    return pd.DataFrame(filas, columns=['id', 'nombre', 'correo', 'telefono'])
+
+
+def nombres_ordenados(nombres):
+    """Palabras de cada nombre en orden alfabético: "perez juan" y "juan perez" quedan iguales"""
+    return pd.Series([' '.join(sorted(nombre.split())) for nombre in nombres], index=nombres.index, dtype=object)
+
+
+def claves_bloque(contactos):
+    """Clave de bloque de cada contacto por teléfono, email y nombre; NaN si no tiene el dato"""
+    digitos = contactos['telefono'].str.lstrip('+')
+    telefono = digitos.str[-DIGITOS_SUFIJO_TELEFONO:].where(digitos.str.len() >= MINIMO_DIGITOS_TELEFONO)
+    local, arroba, dominio = (contactos['correo'].str.partition('@')[i] for i in range(3))
+    prefijo = local.str.replace('.', '', regex=False).str[:LETRAS_PREFIJO_CORREO]
+    correo = (dominio + '@' + prefijo).where((arroba == '@') & (local != '') & (dominio != ''))
+    nombre = contactos['nombre_ordenado']
+    return {'telefono': telefono, 'correo': correo, 'nombre': nombre.where(nombre != '')}
+
+
+def _codigos(serie):
+    """Entero por valor distinto de la serie (en orden alfabético); -1 en los vacíos"""
+    return pd.factorize(serie, sort=True)[0]
+
+
+def pares_del_bloque(codigos, orden):
+    """Pares (a, b) de posiciones con el mismo código de bloque.
+
+    Ordena cada bloque por `orden` y compara cada posición con las
+    VENTANA_BLOQUE siguientes, todo con operaciones sobre arreglos.
+    """
+    posiciones = np.flatnonzero(codigos >= 0)
+    posiciones = posiciones[np.lexsort((orden[posiciones], codigos[posiciones]))]
+    bloques = codigos[posiciones]
+    primeros, segundos = [], []
+    for distancia in range(1, VENTANA_BLOQUE + 1):
+        iguales = bloques[:-distancia] == bloques[distancia:]
+        # Si nadie tiene a esta distancia un vecino del mismo bloque, tampoco más lejos
+        if not iguales.any():
+            break
+        primeros.append(posiciones[:-distancia][iguales])
+        segundos.append(posiciones[distancia:][iguales])
+    if not primeros:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(primeros), np.concatenate(segundos)
+
+
+def pares_candidatos(contactos):
+    """Pares (a, b) de posiciones a comparar, a < b y sin repetir, de los bloques de las tres claves"""
+    claves = claves_bloque(contactos)
+    por_nombre = _codigos(contactos['nombre_ordenado'])
+    por_correo = _codigos(contactos['correo'])
+    # Dentro de un bloque de nombre, los emails parecidos quedan juntos; en los demás, los nombres
+    orden = {'telefono': por_nombre, 'correo': por_nombre, 'nombre': por_correo}
+    codigos = []
+    for campo, serie in claves.items():
+        a, b = pares_del_bloque(_codigos(serie), orden[campo])
+        codigos.append(np.minimum(a, b).astype(np.int64) * len(contactos) + np.maximum(a, b))
+    codigos = np.unique(np.concatenate(codigos))
+    return codigos // len(contactos), codigos % len(contactos)
+
+
+def firmas(textos):
+    """Firma de cada texto: matriz de len(textos) x BITS_FIRMA bits con un bit por trigrama"""
+    bits = {}
+    datos = bytearray()
+    for texto in textos:
+        firma = 0
+        relleno = f' {texto} ' if texto else ''
+        for inicio in range(len(relleno) - 2):
+            trigrama = relleno[inicio:inicio + 3]
+            bit = bits.get(trigrama)
+            if bit is None:
+                bit = bits[trigrama] = 1 << (zlib.crc32(trigrama.encode()) % BITS_FIRMA)
+            firma |= bit
+        datos += firma.to_bytes(BITS_FIRMA // 8, 'little')
+    return np.frombuffer(bytes(datos), dtype='<u8').reshape(len(textos), BITS_FIRMA // 64)
+
+
+def _jaccard(firma, a, b):
+    """Trigramas en común / trigramas en total de cada par; 0 si los dos están vacíos"""
+    x, y = firma[a], firma[b]
+    comunes = np.bitwise_count(x & y).sum(axis=1)
+    total = np.bitwise_count(x | y).sum(axis=1)
+    return np.divide(comunes, total, out=np.zeros(len(a)), where=total > 0)
+
+
+def datos_comparables(contactos):
+    """Firmas y códigos de igualdad de cada contacto, para puntajes()"""
+    claves = claves_bloque(contactos)
+    telefono = contactos['telefono'].where(claves['telefono'].notna())
+    correo = contactos['correo'].where(claves['correo'].notna())
+    return {
+        'tiene_nombre': claves['nombre'].notna().to_numpy(),
+        'firma_nombre': firmas(contactos['nombre_ordenado']),
+        'correo': _codigos(correo),
+        'firma_correo': firmas(correo.fillna('')),
+        'telefono': _codigos(telefono),
+        'sufijo_telefono': _codigos(claves['telefono']),
+    }
+
+
+def puntajes(datos, a, b):
+    """Parecido de 0 a 1 de cada par (a[k], b[k]): promedio pesado de los datos que tienen los dos"""
+    suma = np.zeros(len(a))
+    pesos = np.zeros(len(a))
+    comparados = np.zeros(len(a), dtype=np.int8)
+
+    def sumar(campo, presente, similitud):
+        suma[presente] += PESOS[campo] * similitud[presente]
+        pesos[presente] += PESOS[campo]
+        comparados[presente] += 1
+
+    sumar('nombre', datos['tiene_nombre'][a] & datos['tiene_nombre'][b], _jaccard(datos['firma_nombre'], a, b))
+    correo_a, correo_b = datos['correo'][a], datos['correo'][b]
+    sumar('correo', (correo_a >= 0) & (correo_b >= 0),
+          np.where(correo_a == correo_b, 1.0, _jaccard(datos['firma_correo'], a, b)))
+    telefono_a, telefono_b = datos['telefono'][a], datos['telefono'][b]
+    mismo_sufijo = datos['sufijo_telefono'][a] == datos['sufijo_telefono'][b]
+    sumar('telefono', (telefono_a >= 0) & (telefono_b >= 0),
+          np.where(telefono_a == telefono_b, 1.0, np.where(mismo_sufijo, SIMILITUD_SUFIJO_TELEFONO, 0.0)))
+
+    resultado = np.divide(suma, pesos, out=np.zeros(len(a)), where=pesos > 0)
+    resultado[comparados < MINIMO_DATOS_COMPARADOS] = 0.0
+    return resultado
+
+
+def grupos_similares(contactos, umbral=UMBRAL_SIMILITUD):
+    """Grupos de contactos parecidos del DataFrame de cargar_contactos().
+
+    Devuelve listas [(id, puntaje), ...] ordenadas por id, los grupos más
+    grandes primero; el puntaje de cada contacto es su mayor parecido con
+    otro del grupo.
+    """
+    if len(contactos) < 2:
+        return []
+    contactos = contactos.assign(nombre_ordenado=nombres_ordenados(contactos['nombre']))
+    a, b = pares_candidatos(contactos)
+    datos = datos_comparables(contactos)
+    elegidos_a, elegidos_b, elegidos_puntaje = [], [], []
+    for inicio in range(0, len(a), TAMANO_LOTE_PARES):
+        lote_a, lote_b = a[inicio:inicio + TAMANO_LOTE_PARES], b[inicio:inicio + TAMANO_LOTE_PARES]
+        puntaje = puntajes(datos, lote_a, lote_b)
+        elegidos = puntaje >= umbral
+        elegidos_a.append(lote_a[elegidos])
+        elegidos_b.append(lote_b[elegidos])
+        elegidos_puntaje.append(puntaje[elegidos])
+    if not elegidos_a:
+        return []
+    comparados = len(a)
+    a, b, puntaje = np.concatenate(elegidos_a), np.concatenate(elegidos_b), np.concatenate(elegidos_puntaje)
+    logging.info(f"Contactos similares: {len(contactos)} contactos, {comparados} pares comparados, "
+                 f"{len(a)} parecidos")
+
+    mejor = np.zeros(len(contactos))
+    np.maximum.at(mejor, a, puntaje)
+    np.maximum.at(mejor, b, puntaje)
+    ids = contactos['id'].to_numpy()
+    posicion = {contacto_id: i for i, contacto_id in enumerate(ids)}
+    grupos = agrupar_pares(zip(ids[a].tolist(), ids[b].tolist()))
+    return [[(contacto_id, round(float(mejor[posicion[contacto_id]]), 3)) for contacto_id in grupo]
+            for grupo in grupos]
+
+
+def guardar_grupos(grupos):
+    """Reemplaza los grupos de la tabla contacto_similar; el número de grupo es su orden (1 = el más grande)"""
+    calculado_at = get_argentina_time()
+    filas = [
+        {'contacto_id': contacto_id, 'grupo': numero, 'puntaje': puntaje, 'calculado_at': calculado_at}
+        for numero, grupo in enumerate(grupos, 1) for contacto_id, puntaje in grupo
+    ]
+    db.session.execute(delete(ContactoSimilar))
+    for inicio in range(0, len(filas), TAMANO_LOTE_GUARDADO):
+        db.session.execute(insert(ContactoSimilar), filas[inicio:inicio + TAMANO_LOTE_GUARDADO])
+    db.session.commit()
+    return len(filas)
+
+
+def agrupar_similares(umbral=UMBRAL_SIMILITUD):
+    """Calcula los grupos de contactos parecidos de toda la tabla y los guarda.
+
+    Devuelve (cantidad de grupos, cantidad de contactos agrupados).
+    """
+    inicio = time.perf_counter()
+    grupos = grupos_similares(cargar_contactos(), umbral)
+    contactos = guardar_grupos(grupos)
+    logging.info(f"Contactos similares: {len(grupos)} grupos, {contactos} contactos "
+                 f"en {time.perf_counter() - inicio:.1f} s")
+    return len(grupos), contactos
+
+
+def _consultar_similares():
+    return (
+        select(ContactoSimilar.grupo, ContactoSimilar.puntaje, Contacto.id, Usuario.email, Contacto.apellido_nombre,
+               Contacto.correo_electronico, Contacto.telefono, Contacto.estado, Contacto.created_at)
+        .join(Contacto, ContactoSimilar.contacto_id == Contacto.id)
+        .join(Usuario, Contacto.usuario_id == Usuario.id)
+        .order_by(ContactoSimilar.grupo, Contacto.id)
+    )
+
+
+def resumen_similares():
+    """(cantidad de grupos, fecha del cálculo) del último "flask agrupar-similares"; (0, None) si no corrió"""
+    fila = db.session.execute(select(func.max(ContactoSimilar.grupo), func.max(ContactoSimilar.calculado_at))).one()
+    return fila[0] or 0, fila[1]
+
+
+def pagina_similares(pagina):
+    """Grupos de la página (desde 1) para revisar: listas de filas de _consultar_similares().
+
+    Se saltean los grupos a los que, por contactos borrados o archivados
+    después del cálculo, les quedó un solo contacto.
+    """
+    desde = (pagina - 1) * GRUPOS_POR_PAGINA + 1
+    filas = db.session.execute(
+        _consultar_similares().where(ContactoSimilar.grupo.between(desde, desde + GRUPOS_POR_PAGINA - 1))
+    )
+    grupos = {}
+    for fila in filas:
+        grupos.setdefault(fila.grupo, []).append(fila)
+    return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+
+def generar_libro_similares(destino):
+    """Guarda en destino un libro con los contactos de cada grupo de parecidos, uno por fila"""
+    wb = registrar_estilos(openpyxl.Workbook(write_only=True))
+    ws = wb.create_sheet(title="Contactos similares")
+    encabezados = []
+    for encabezado in ENCABEZADOS_SIMILARES:
+        cell = WriteOnlyCell(ws, value=encabezado)
+        aplicar_estilo(cell, 'encabezado')
+        encabezados.append(cell)
+    ws.append(encabezados)
+
+    filas_escritas = 0
+    for fila in db.session.execute(_consultar_similares().execution_options(yield_per=TAMANO_LOTE_GUARDADO)):
+        fecha = None
+        if fila.created_at:
+            fecha = WriteOnlyCell(ws, value=fila.created_at.date())
+            aplicar_estilo(fecha, 'fecha')
+        ws.append([fila.grupo, fila.puntaje, fila.id, fila.email, fila.apellido_nombre, fila.correo_electronico,
+                   fila.telefono, fila.estado, fecha])
+        filas_escritas += 1
+    wb.save(destino)
+    logging.info(f"Libro de contactos similares generado con {filas_escritas} contactos")
+    return filas_escritas
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del archivo de contactos: los cerrados y vendidos viejos salen de la
+tabla de contactos y solo se leen cuando se pide incluir el archivo
+"""
+
+from datetime import datetime, timedelta
+
+from models import db, Usuario, Contacto, ContactoArchivo, EstadisticaContacto, get_argentina_time
+from archivo_contactos import archivar_contactos
+from cache_exportacion import version_actual, versiones_mes
+from exportacion import consultar_contactos_admin, generar_csv
+from listado_contactos import contar_contactos, pagina_contactos
+from conftest import crear_contacto
+
+
+def grupos():
+    return sorted(tuple(fila) for fila in db.session.query(*EstadisticaContacto.__table__.columns))
+
+
+def test_archivar_mueve_los_contactos_viejos_por_lotes(contactos):
+    from estadisticas import reconstruir_estadisticas
+
+    ids, vendedor, otro = contactos
+    # El último contacto cargado también se archiva: su id no debe reutilizarse
+    db.session.get(Contacto, ids[4]).estado = 'vendido'
+    db.session.commit()
+    version, meses = version_actual(), versiones_mes()
+
+    # Se archivan los dos vendidos; el cerrado no tiene fecha de carga y el resto está abierto
+    assert archivar_contactos(lote=1, ahora=datetime(2026, 7, 10)) == 2
+
+    assert sorted(c.id for c in ContactoArchivo.query) == [ids[1], ids[4]]
+    assert sorted(c.id for c in Contacto.query) == [ids[0], ids[2], ids[3]]
+    assert db.session.get(ContactoArchivo, ids[1]).apellido_nombre == 'Juan Pérez'
+    assert version_actual() > version
+    assert versiones_mes()['2025-07'] > meses['2025-07']
+    assert [c['id'] for c in pagina_contactos()[0]] == [ids[2], ids[0], ids[3]]
+
+    actuales = grupos()
+    reconstruir_estadisticas()
+    assert grupos() == actuales
+
+    nuevo = crear_contacto(vendedor, 'abierto', datetime(2026, 7, 10))
+    db.session.add(nuevo)
+    db.session.commit()
+    assert nuevo.id > ids[4]
+
+    # Sin contactos archivables no se hace nada
+    assert archivar_contactos(ahora=datetime(2026, 7, 10)) == 0
+
+
+def test_el_corte_usa_la_hora_de_argentina(app):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    # created_at queda en hora de Argentina, como lo guarda get_argentina_time
+    hace_un_anio = get_argentina_time().replace(tzinfo=None) - timedelta(days=365)
+    viejo = crear_contacto(vendedor, 'vendido', hace_un_anio - timedelta(hours=1))
+    reciente = crear_contacto(vendedor, 'vendido', hace_un_anio + timedelta(hours=1))
+    db.session.add_all([viejo, reciente])
+    db.session.commit()
+
+    assert archivar_contactos() == 1
+    assert [c.id for c in Contacto.query] == [reciente.id]
+
+
+def test_busqueda_y_csv_incluyen_el_archivo_si_se_pide(contactos):
+    ids, vendedor, _ = contactos
+    admin = Usuario(email='admin@test.com', password='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    archivar_contactos(ahora=datetime(2026, 7, 4))
+
+    def buscar(usuario, **parametros):
+        contactos, _ = pagina_contactos(filtros={'nombre': 'PEREZ j'}, usuario=usuario, **parametros)
+        assert contar_contactos({'nombre': 'PEREZ j'}, usuario, **parametros) == len(contactos)
+        return [c['id'] for c in contactos]
+
+    assert buscar(admin) == [ids[4], ids[2], ids[0], ids[3]]
+    # Los archivados se ordenan junto con el resto
+    assert buscar(admin, incluir_archivo=True) == [ids[4], ids[2], ids[1], ids[0], ids[3]]
+    # Los vendedores no ven el archivo
+    assert buscar(vendedor, incluir_archivo=True) == [ids[4], ids[0]]
+
+    def lineas_csv(**parametros):
+        return b''.join(generar_csv(consultar_contactos_admin(**parametros), con_usuario=True)).decode().splitlines()
+
+    assert len(lineas_csv()) == 5
+    todas = lineas_csv(incluir_archivo=True)
+    assert len(todas) == 6
+    assert sum(',vendido,' in linea for linea in todas) == 1
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la baja de usuarios: los contactos se borran o reasignan con una
+sentencia y las estadísticas y versiones quedan como si se hubieran recalculado
+"""
+
+import pytest
+from sqlalchemy import event, func
+
+from models import db, Usuario, Contacto, EstadisticaContacto, TrabajoExportacion
+from baja_usuarios import BajaInvalida, eliminar_usuario
+from cache_exportacion import version_actual, versiones_mes
+
+
+def grupos():
+    return sorted(tuple(fila) for fila in db.session.query(EstadisticaContacto).with_entities(
+        *EstadisticaContacto.__table__.columns))
+
+
+def grupos_reconstruidos():
+    from estadisticas import reconstruir_estadisticas
+    reconstruir_estadisticas()
+    return grupos()
+
+
+def sentencias_durante(funcion):
+    ejecutadas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        ejecutadas.append(' '.join(statement.split()))
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return resultado, ejecutadas
+
+
+def test_eliminar_usuario_borra_sus_contactos_en_cascada(contactos):
+    ids, vendedor, otro = contactos
+    db.session.add(TrabajoExportacion(usuario_id=vendedor.id, tipo='usuario'))
+    db.session.commit()
+    # Un contacto ya cargado en la sesión no cambia el resultado
+    db.session.get(Contacto, ids[0])
+    version, meses = version_actual(), versiones_mes()
+
+    cantidad, ejecutadas = sentencias_durante(lambda: eliminar_usuario(vendedor))
+
+    assert cantidad == 3
+    # Ni se cargan los contactos del usuario ni se borran de a uno
+    assert not [s for s in ejecutadas if 'contacto.apellido_nombre' in s or s.startswith('DELETE FROM contacto')]
+    assert Contacto.query.count() == 2
+    assert db.session.get(Usuario, otro.id) is not None
+    assert TrabajoExportacion.query.count() == 0
+    assert version_actual() > version
+    assert versiones_mes()['2025-07'] > meses['2025-07']
+    assert versiones_mes()['sin-fecha'] == meses['sin-fecha']
+    assert {fila[1] for fila in grupos()} == {otro.id}
+    assert grupos() == grupos_reconstruidos()
+
+
+def test_eliminar_usuario_reasigna_sus_contactos(contactos):
+    ids, vendedor, otro = contactos
+    total = db.session.query(func.sum(EstadisticaContacto.cantidad)).scalar()
+    version = version_actual()
+
+    assert eliminar_usuario(vendedor, reasignar_a=otro) == 3
+
+    db.session.expire_all()
+    assert db.session.get(Usuario, vendedor.id) is None
+    assert {c.usuario_id for c in Contacto.query} == {otro.id}
+    assert len(db.session.get(Usuario, otro.id).contactos) == 5
+    assert version_actual() > version
+    assert db.session.query(func.sum(EstadisticaContacto.cantidad)).scalar() == total
+    assert grupos() == grupos_reconstruidos()
+
+
+def test_no_se_reasigna_al_mismo_usuario(contactos):
+    _, vendedor, _ = contactos
+    with pytest.raises(BajaInvalida):
+        eliminar_usuario(vendedor, reasignar_a=vendedor)
+    db.session.rollback()
+    assert Contacto.query.filter_by(usuario_id=vendedor.id).count() == 3
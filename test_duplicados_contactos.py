@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de los contactos repetidos: claves de teléfono y email, aviso al
+cargar y grupos del reporte
+"""
+
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from models import db, Usuario, Contacto
+from busqueda_contactos import normalizar_telefono
+from duplicados_contactos import aviso_duplicados, contactos_existentes, grupos_duplicados, reportar_duplicados
+from conftest import crear_contacto
+
+
+@pytest.mark.parametrize('telefono, clave', [
+    ('+54 9 11 1234-5678', '+541112345678'),
+    ('011 15 1234-5678', '+541112345678'),
+    ('1112345678', '+541112345678'),
+    ('549 11 1234 5678', '+541112345678'),
+    ('0351 15 412-3456', '+543514123456'),
+    ('+1 (555) 123-4567', '+15551234567'),
+    ('4123456', '4123456'),
+    ('no tiene', ''),
+])
+def test_clave_del_telefono(telefono, clave):
+    assert normalizar_telefono(telefono) == clave
+
+
+@pytest.fixture
+def vendedores(app):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    otro = Usuario(email='otro@test.com', password='x')
+    db.session.add_all([vendedor, otro])
+    db.session.commit()
+    return vendedor, otro
+
+
+def cargar(usuario, telefono, correo, nombre='Juan Pérez'):
+    contacto = crear_contacto(usuario, 'abierto', datetime(2025, 7, 1), telefono=telefono,
+                              correo_electronico=correo, apellido_nombre=nombre)
+    db.session.add(contacto)
+    db.session.commit()
+    return contacto.id
+
+
+def test_aviso_al_cargar_un_contacto_existente(vendedores):
+    vendedor, otro = vendedores
+    primero = cargar(vendedor, '+54 9 11 1234-5678', 'juan@test.com')
+    segundo = cargar(otro, '351 412 3456', 'Juan@Test.com ')
+
+    existentes = contactos_existentes('011 15 1234-5678', 'otro@test.com')
+    assert [(fila.id, bool(fila.mismo_telefono), bool(fila.mismo_correo)) for fila in existentes] == \
+        [(primero, True, False)]
+    existentes = contactos_existentes('1112345678', 'JUAN@test.com')
+    assert [fila.id for fila in existentes] == [primero, segundo]
+    assert aviso_duplicados(existentes, vendedor.id) == \
+        'Atención: ya había 2 contacto(s) con el mismo teléfono y email (1 cargado(s) por vos y 1 por otro vendedor)'
+    assert [fila.id for fila in contactos_existentes('1112345678', '', excluir_id=primero)] == []
+
+    # Datos que no identifican a nadie no se comparan
+    cargar(vendedor, '0', 'no tiene')
+    assert contactos_existentes('0', 'no tiene') == []
+
+    # La clave se actualiza al modificar el teléfono
+    db.session.get(Contacto, segundo).telefono = '+54 11 1234 5678'
+    db.session.commit()
+    assert [fila.id for fila in contactos_existentes('11 1234-5678', '')] == [primero, segundo]
+
+
+def test_grupos_de_repetidos_por_telefono_o_email(vendedores):
+    vendedor, otro = vendedores
+    a = cargar(vendedor, '+54 9 11 1234-5678', 'a@test.com', 'Ana')
+    b = cargar(otro, '011 15 1234-5678', 'b@test.com', 'Beto')
+    c = cargar(otro, '351 412 3456', 'B@TEST.com', 'Carla')
+    cargar(vendedor, '351 999 0000', 'd@test.com', 'Dora')
+    e = cargar(vendedor, '0261 15 555-1234', 'sin email', 'Eva')
+    f = cargar(otro, '261 555 1234', 'sin email', 'Fede')
+    cargar(otro, '0', 'sin email', 'Gina')
+    cargar(otro, '0', 'sin email', 'Hugo')
+
+    # a y b comparten teléfono, b y c email: los tres van juntos
+    assert grupos_duplicados() == [[a, b, c], [e, f]]
+
+    destino = io.StringIO()
+    assert reportar_duplicados(destino) == (2, 5)
+    filas = list(csv.DictReader(io.StringIO(destino.getvalue())))
+    assert [(fila['grupo'], fila['apellido_nombre'], fila['vendedor']) for fila in filas] == [
+        ('1', 'Ana', 'vendedor@test.com'), ('1', 'Beto', 'otro@test.com'), ('1', 'Carla', 'otro@test.com'),
+        ('2', 'Eva', 'vendedor@test.com'), ('2', 'Fede', 'otro@test.com'),
+    ]
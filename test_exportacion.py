@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del motor de exportación en modo streaming
+"""
+
+import io
+import os
+from datetime import date, datetime, timedelta
+
+import openpyxl
+import pytest
+
+from models import db, Usuario
+from exportacion import generar_libro_admin
+from conftest import crear_contacto
+
+
+def test_libro_admin_tiene_las_cuatro_hojas(app, cache_dir):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    otro = Usuario(email='otro@test.com', password='x')
+    db.session.add_all([vendedor, otro])
+    db.session.commit()
+    db.session.add_all([
+        crear_contacto(vendedor, 'vendido', datetime(2025, 6, 10)),
+        crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2)),
+        crear_contacto(otro, 'cerrado', datetime(2025, 7, 3), promocion='osde'),
+    ])
+    db.session.commit()
+
+    salida = io.BytesIO()
+    assert generar_libro_admin(salida) == 3
+
+    wb = openpyxl.load_workbook(io.BytesIO(salida.getvalue()))
+    assert wb.sheetnames == ["Base de Datos", "Resumen Mensual", "Estadísticas de Campos", "Ranking de Usuarios"]
+
+    ws = wb["Base de Datos"]
+    assert ws['A1'].value == "CONTACTOS CARGADOS EN JUNE 2025"
+    assert ws['A2'].value == "Origen"
+    assert ws['K3'].value == "vendido"
+    assert ws['K3'].fill.start_color.rgb.endswith("BDD7EE")
+    # La fecha de carga es una fecha de Excel, no texto, así se ordena cronológicamente
+    assert ws['O3'].value == datetime(2025, 6, 10)
+    assert ws['O3'].number_format == 'DD/MM/YYYY'
+    assert ws['A5'].value == "CONTACTOS CARGADOS EN JULY 2025"
+    assert "A1:P1" in ws.merged_cells
+    assert ws.column_dimensions['C'].width == 30
+
+    resumen = wb["Resumen Mensual"]
+    assert [c.value for c in resumen[4]] == ["June 2025", 1, 1, 0, 0, "100.0%"]
+    assert [c.value for c in resumen[5]] == ["July 2025", 2, 0, 1, 1, "0.0%"]
+
+    estadisticas = wb["Estadísticas de Campos"]
+    assert estadisticas['A4'].value == "DISTRIBUCIÓN DE ORIGEN"
+    assert [c.value for c in estadisticas[5]] == ["Origen", "Propio", 3, "100.0%"]
+    promociones = {estadisticas.cell(row=r, column=2).value: estadisticas.cell(row=r, column=3).value
+                   for r in range(1, estadisticas.max_row + 1)
+                   if estadisticas.cell(row=r, column=1).value == "¿Por qué no toma la cobertura?"}
+    assert promociones == {"No especificado": 2, "Osde": 1}
+
+    ranking = wb["Ranking de Usuarios"]
+    assert [c.value for c in ranking[4]] == [1, "vendedor@test.com", 1, 2, "50.0%"]
+    assert ranking['A4'].fill.start_color.rgb.endswith("FFD700")
+
+
+def test_trabajo_de_exportacion_genera_el_archivo(app, cache_dir):
+    import trabajos_exportacion
+    from models import TrabajoExportacion
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add(crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2)))
+    trabajo = TrabajoExportacion(usuario_id=vendedor.id, tipo='usuario')
+    db.session.add(trabajo)
+    db.session.commit()
+    trabajo_id = trabajo.id
+
+    trabajos_exportacion.ejecutar_trabajo(app, trabajo_id)
+
+    db.session.expire_all()
+    trabajo = db.session.get(TrabajoExportacion, trabajo_id)
+    assert trabajo.estado == 'completado'
+    assert trabajo.filas_escritas == 1
+    assert trabajo.hoja_actual == "Mis Contactos"
+    wb = openpyxl.load_workbook(trabajo.archivo)
+    assert wb["Mis Contactos"]['E2'].value == "Juan Pérez"
+
+    # Un trabajo ya completado no se vuelve a ejecutar
+    trabajos_exportacion.ejecutar_trabajo(app, trabajo_id)
+    assert db.session.get(TrabajoExportacion, trabajo_id).estado == 'completado'
+
+
+def test_trabajo_en_curso_da_latido_y_solo_se_reencola_sin_latido(app, cache_dir, monkeypatch):
+    import trabajos_exportacion
+    from models import TrabajoExportacion, get_argentina_time
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    trabajo = TrabajoExportacion(usuario_id=vendedor.id, tipo='usuario')
+    db.session.add(trabajo)
+    db.session.commit()
+    trabajo_id = trabajo.id
+
+    # Con cada llamada de progreso pasan más de INTERVALO_LATIDO segundos
+    monkeypatch.setattr(trabajos_exportacion, 'INTERVALO_LATIDO', 0)
+    latidos = []
+
+    def generar(usuario_id, destino, progreso):
+        for filas in (0, 1000, 2000):
+            progreso("Mis Contactos", filas)
+            latidos.append(db.session.execute(
+                db.select(TrabajoExportacion.filas_escritas, TrabajoExportacion.updated_at)
+                .filter_by(id=trabajo_id)).one())
+        return 2000
+
+    monkeypatch.setattr(trabajos_exportacion, 'generar_libro_usuario', generar)
+    trabajos_exportacion.ejecutar_trabajo(app, trabajo_id)
+    assert [filas for filas, _ in latidos] == [0, 1000, 2000]
+    assert latidos[0][1] <= latidos[1][1] <= latidos[2][1]
+
+    # Al reiniciar, solo vuelve a la cola el trabajo cuyo último latido es viejo
+    ahora = get_argentina_time()
+    en_curso = TrabajoExportacion(usuario_id=vendedor.id, tipo='usuario', estado='en_proceso',
+                                  created_at=ahora - timedelta(hours=1), updated_at=ahora - timedelta(minutes=1))
+    abandonado = TrabajoExportacion(usuario_id=vendedor.id, tipo='usuario', estado='en_proceso',
+                                    created_at=ahora - timedelta(hours=1), updated_at=ahora - timedelta(minutes=11))
+    db.session.add_all([en_curso, abandonado])
+    db.session.commit()
+    encolados = []
+
+    class Pool:
+        def submit(self, funcion, app, trabajo_id):
+            encolados.append(trabajo_id)
+
+    monkeypatch.setattr(trabajos_exportacion, '_get_executor', lambda app: Pool())
+    trabajos_exportacion.reanudar_trabajos(app)
+    assert encolados == [abandonado.id]
+    assert db.session.get(TrabajoExportacion, en_curso.id).estado == 'en_proceso'
+
+
+def test_cache_se_invalida_al_modificar_contactos(app, cache_dir):
+    from cache_exportacion import libro_en_cache, version_actual
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    contacto = crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2))
+    db.session.add(contacto)
+    db.session.commit()
+
+    generaciones = []
+
+    def generar(destino):
+        generaciones.append(destino)
+        generar_libro_admin(destino)
+
+    version = version_actual()
+    primera = libro_en_cache('contactos', generar)
+    assert libro_en_cache('contactos', generar) == primera
+    assert len(generaciones) == 1
+
+    contacto.estado = 'vendido'
+    db.session.commit()
+    assert version_actual() == version + 1
+
+    segunda = libro_en_cache('contactos', generar)
+    assert segunda != primera
+    assert len(generaciones) == 2
+    # La versión anterior se descarta al guardar la nueva
+    assert sorted(p.name for p in cache_dir.iterdir()) == [f"contactos_v{version + 1}.xlsx"]
+
+
+def test_solo_se_recalculan_los_meses_modificados(app, cache_dir, monkeypatch):
+    import exportacion
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    junio = crear_contacto(vendedor, 'abierto', datetime(2025, 6, 10))
+    db.session.add_all([junio, crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2))])
+    db.session.commit()
+    generar_libro_admin(io.BytesIO())
+
+    construidos = []
+    construir = exportacion.BloqueMes.construir.__func__
+    monkeypatch.setattr(exportacion.BloqueMes, 'construir',
+                        classmethod(lambda cls, mes, version: construidos.append(mes) or construir(cls, mes, version)))
+
+    junio.estado = 'vendido'
+    db.session.commit()
+    salida = io.BytesIO()
+    assert generar_libro_admin(salida) == 2
+    assert construidos == ['2025-06']
+
+    wb = openpyxl.load_workbook(io.BytesIO(salida.getvalue()))
+    assert wb["Base de Datos"]['K3'].value == "vendido"
+    assert wb["Base de Datos"]['K7'].value == "abierto"
+    assert [c.value for c in wb["Resumen Mensual"][4]] == ["June 2025", 1, 1, 0, 0, "100.0%"]
+
+
+def test_el_libro_admin_informa_progreso_mientras_prepara_los_meses(app, cache_dir, monkeypatch):
+    import exportacion
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add_all([crear_contacto(vendedor, 'abierto', datetime(2025, mes, 2)) for mes in (5, 6, 7)])
+    db.session.commit()
+
+    llamadas = []
+    construir = exportacion.BloqueMes.construir.__func__
+    monkeypatch.setattr(exportacion.BloqueMes, 'construir',
+                        classmethod(lambda cls, mes, version: llamadas.append(mes) or construir(cls, mes, version)))
+    guardar = openpyxl.Workbook.save
+    monkeypatch.setattr(openpyxl.Workbook, 'save', lambda wb, destino: llamadas.append('save') or guardar(wb, destino))
+
+    generar_libro_admin(io.BytesIO(), lambda hoja, filas: llamadas.append((hoja, filas)))
+    # Un aviso al empezar y otro después de cada mes reconstruido
+    assert llamadas[:7] == [("Base de Datos", 0), '2025-05', ("Base de Datos", 0), '2025-06', ("Base de Datos", 0),
+                            '2025-07', ("Base de Datos", 0)]
+    assert llamadas[-2:] == [("Ranking de Usuarios", 3), 'save']
+
+
+def test_un_bloque_viejo_no_borra_uno_mas_nuevo(app, cache_dir):
+    import exportacion
+
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add(crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2)))
+    db.session.commit()
+
+    def archivos():
+        return sorted(os.listdir(exportacion.BLOQUES_DIR))
+
+    exportacion.BloqueMes.construir('2025-07', 5)
+    # Un proceso más lento termina de construir una versión anterior
+    exportacion.BloqueMes.construir('2025-07', 4)
+    assert {'2025-07_v5.json', '2025-07_v5.jsonl'} <= set(archivos())
+    assert exportacion.BloqueMes.cargar('2025-07', 5).filas == 1
+
+    exportacion.BloqueMes.construir('2025-07', 6)
+    assert archivos() == ['2025-07_v6.json', '2025-07_v6.jsonl']
+
+
+def test_sin_cache_el_libro_se_genera_en_memoria(app, cache_dir):
+    from cache_exportacion import abrir_libro
+
+    app.config['EXPORTACION_CACHE_MAX_MB'] = 0
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add(crear_contacto(vendedor, 'abierto', datetime(2025, 7, 2)))
+    db.session.commit()
+
+    with abrir_libro('contactos', generar_libro_admin) as archivo:
+        wb = openpyxl.load_workbook(archivo)
+    assert wb["Base de Datos"]['E3'].value == "Juan Pérez"
+    assert not cache_dir.exists()
+
+
+def test_csv_se_genera_por_bloques(app, monkeypatch):
+    import exportacion
+    from exportacion import consultar_contactos_admin, generar_csv
+
+    monkeypatch.setattr(exportacion, 'TAMANO_LOTE', 2)
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add_all([crear_contacto(vendedor, 'abierto', datetime(2025, 7, d)) for d in range(1, 6)])
+    db.session.commit()
+
+    bloques = list(generar_csv(consultar_contactos_admin(), con_usuario=True))
+    # Encabezado, dos bloques completos y el resto
+    assert len(bloques) == 4
+    lineas = b''.join(bloques).decode('utf-8').splitlines()
+    assert lineas[0].endswith("Usuario cargador")
+    assert lineas[1] == "propio,osde,No especificado,privado,Juan Pérez,juan@test.com,35,123456789,2,310,abierto,,sin conyuge,,01/07/2025,vendedor@test.com"
+    assert len(lineas) == 6
+
+
+def test_exportacion_columnar_tiene_tipos(app, monkeypatch):
+    pytest.importorskip('pyarrow')
+    import pandas as pd
+    import exportacion
+    from exportacion import generar_columnar
+
+    monkeypatch.setattr(exportacion, 'TAMANO_LOTE', 2)
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add_all([
+        crear_contacto(vendedor, 'abierto', datetime(2025, 7, 1)),
+        crear_contacto(vendedor, 'vendido', datetime(2025, 7, 2), conyuge='con conyuge', conyuge_edad=40),
+        crear_contacto(vendedor, 'cerrado', datetime(2025, 7, 3), origen='guardia'),
+    ])
+    db.session.commit()
+
+    for formato, leer in (('parquet', pd.read_parquet), ('feather', pd.read_feather)):
+        salida = io.BytesIO()
+        assert generar_columnar(salida, formato) == 3
+        df = leer(io.BytesIO(salida.getvalue()))
+        assert list(df['estado']) == ['abierto', 'vendido', 'cerrado']
+        assert isinstance(df['estado'].dtype, pd.CategoricalDtype)
+        assert df['edad_titular'].tolist() == [35, 35, 35]
+        assert df['conyuge_edad'].isna().tolist() == [True, False, True]
+        assert df['created_at'].iloc[2] == pd.Timestamp(2025, 7, 3)
+        assert df['fecha'].iloc[0] == date(2025, 7, 1)
+        assert df['grupo_familiar'].tolist() == [2, 2, 2]
+        assert df['usuario_email'].iloc[0] == 'vendedor@test.com'
+
+
+def test_estilos_que_el_libro_ya_tiene():
+    from openpyxl.styles import Font, NamedStyle
+    from estilos_exportacion import aplicar_estilo, registrar_estilos
+
+    wb = openpyxl.Workbook()
+    wb.add_named_style(NamedStyle('titulo', font=Font(size=30)))
+    registrar_estilos(wb)
+    ws = wb.active
+    # Como cell.style = 'titulo', se usa el estilo del libro
+    aplicar_estilo(ws['A1'], 'titulo')
+    ws['B1'].style = 'titulo'
+    assert ws['A1']._style == ws['B1']._style
+    assert ws['A1'].font.size == 30
+    aplicar_estilo(ws['A2'], 'encabezado')
+    assert ws['A2'].font.bold
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de los planes de consulta: las consultas de las rutas no deben recorrer
+la tabla de contactos completa cuando filtran u ordenan por columnas indexadas
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from models import db, Usuario, Contacto
+from exportacion import consultar_contactos_admin, consultar_contactos_usuario, filtro_mes
+from listado_contactos import pagina_contactos, pagina_contactos_usuario
+from duplicados_contactos import contactos_existentes
+from conftest import crear_contacto
+
+
+def planes(funcion):
+    """Pasos de EXPLAIN QUERY PLAN de cada SELECT que ejecuta la función"""
+    resultado = []
+
+    def explicar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            filas = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            resultado.append([fila[-1] for fila in filas])
+
+    event.listen(db.engine, 'before_cursor_execute', explicar)
+    try:
+        funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', explicar)
+    assert resultado, 'La función no ejecutó consultas'
+    return resultado
+
+
+def pasos_contacto(funcion):
+    """Pasos de los planes que leen la tabla contacto"""
+    return [paso for plan in planes(funcion) for paso in plan if paso.split()[1:2] == ['contacto']]
+
+
+@pytest.fixture
+def vendedor(app):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    db.session.add(vendedor)
+    db.session.commit()
+    db.session.add_all([
+        crear_contacto(vendedor, 'abierto', datetime(2025, 7, 1)),
+        crear_contacto(vendedor, 'cerrado', datetime(2025, 7, 2)),
+        crear_contacto(vendedor, 'vendido', datetime(2025, 6, 2)),
+    ])
+    db.session.commit()
+    return vendedor
+
+
+@pytest.mark.parametrize('descripcion, consulta, indice', [
+    ('/usuario/contactos', lambda v: pagina_contactos_usuario(v.id, limite=1), 'ix_contacto_usuario_created_at'),
+    ('tabla del admin por estado', lambda v: pagina_contactos(filtros={'estado': 'abierto'}),
+     'ix_contacto_estado_created_at'),
+    ('tabla del admin por vendedor', lambda v: pagina_contactos(filtros={'usuario_id': str(v.id)}),
+     'ix_contacto_usuario_created_at'),
+    ('tabla del admin por fechas', lambda v: pagina_contactos(filtros={'desde': '2025-07-01'}),
+     'ix_contacto_created_at'),
+    ('exportación de un vendedor', lambda v: consultar_contactos_usuario(v.id).all(),
+     'ix_contacto_usuario_created_at'),
+    ('bloque mensual de la exportación', lambda v: consultar_contactos_admin().filter(filtro_mes('2025-07')).all(),
+     'ix_contacto_created_at'),
+    ('bloque sin fecha', lambda v: consultar_contactos_admin().filter(filtro_mes('sin-fecha')).all(),
+     'ix_contacto_created_at'),
+    ('búsqueda por email', lambda v: pagina_contactos(filtros={'email': 'juan@'}), 'ix_contacto_correo_normalizado'),
+])
+def test_consultas_filtradas_buscan_por_indice(vendedor, descripcion, consulta, indice):
+    pasos = pasos_contacto(lambda: consulta(vendedor))
+    assert pasos, descripcion
+    for paso in pasos:
+        assert paso.startswith('SEARCH contacto USING') and indice in paso, f'{descripcion}: {paso}'
+
+
+def test_consultas_sin_filtro_no_ordenan_en_memoria(vendedor):
+    # La paginación siguiente y el listado completo del admin recorren el índice ya ordenado
+    _, cursor = pagina_contactos_usuario(vendedor.id, limite=1)
+    for consulta in (lambda: pagina_contactos_usuario(vendedor.id, cursor=cursor, limite=1),
+                     lambda: pagina_contactos(limite=1),
+                     lambda: consultar_contactos_admin().all()):
+        pasos = [paso for plan in planes(consulta) for paso in plan]
+        assert not any(paso == 'SCAN contacto' for paso in pasos), pasos
+        assert not any('TEMP B-TREE' in paso for paso in pasos), pasos
+
+
+def test_busqueda_por_nombre_usa_el_indice_de_texto(vendedor):
+    def pasos(usuario):
+        return [paso for plan in planes(lambda: pagina_contactos(filtros={'nombre': 'juan'}, usuario=usuario))
+                for paso in plan]
+
+    # El admin lee por clave primaria los contactos que encontró el índice de texto
+    admin = pasos(None)
+    assert any(paso.startswith('SCAN contacto_fts VIRTUAL TABLE') for paso in admin), admin
+    assert [paso for paso in admin if paso.split()[1:2] == ['contacto']] == \
+        ['SEARCH contacto USING INTEGER PRIMARY KEY (rowid=?)']
+    # Un vendedor recorre sus contactos en orden y descarta los que no encontró el índice
+    propios = pasos(vendedor)
+    assert any(paso.startswith('SCAN contacto_fts VIRTUAL TABLE') for paso in propios), propios
+    assert [paso for paso in propios if paso.split()[1:2] == ['contacto']] == \
+        ['SEARCH contacto USING INDEX ix_contacto_usuario_created_at (usuario_id=?)']
+
+
+def test_contactos_repetidos_se_buscan_por_las_claves(vendedor):
+    pasos = pasos_contacto(lambda: contactos_existentes('+54 9 11 1234-5678', 'juan@test.com'))
+    # Una búsqueda en cada índice (MULTI-INDEX OR), sin recorrer la tabla
+    assert pasos == [
+        'SEARCH contacto USING INDEX ix_contacto_telefono_normalizado (telefono_normalizado=?)',
+        'SEARCH contacto USING INDEX ix_contacto_correo_normalizado (correo_normalizado=?)',
+    ]
+
+
+def test_verificacion_de_dueno_usa_la_clave_primaria(vendedor):
+    contacto_id = db.session.query(Contacto.id).first()[0]
+    pasos = pasos_contacto(lambda: Contacto.query.filter_by(id=contacto_id, usuario_id=vendedor.id).first())
+    assert pasos == ['SEARCH contacto USING INTEGER PRIMARY KEY (rowid=?)']
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del listado paginado de contactos del admin y del vendedor
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models import db, Usuario
+from listado_contactos import pagina_contactos, pagina_contactos_usuario, ParametroInvalido
+from conftest import crear_contacto
+
+
+def recorrer(**parametros):
+    """Todas las páginas seguidas, como las pide la tabla con "Cargar más" """
+    ids, cursor = [], None
+    while True:
+        contactos, cursor = pagina_contactos(cursor=cursor, limite=2, **parametros)
+        ids.extend(c['id'] for c in contactos)
+        if cursor is None:
+            return ids
+
+
+def test_paginas_por_fecha_sin_repetir_ni_saltear(contactos):
+    ids, _, _ = contactos
+    # Más nuevos primero; los empates se ordenan por id y los sin fecha van al final
+    assert recorrer() == [ids[4], ids[2], ids[1], ids[0], ids[3]]
+    assert recorrer(direccion='asc') == [ids[3], ids[0], ids[1], ids[2], ids[4]]
+
+
+def test_filtros_y_orden_por_usuario(contactos):
+    ids, vendedor, otro = contactos
+    assert recorrer(filtros={'estado': 'abierto', 'usuario_id': str(vendedor.id)}) == [ids[4], ids[0]]
+    assert recorrer(filtros={'origen': 'wise'}) == [ids[2]]
+    assert recorrer(filtros={'desde': '2025-07-01', 'hasta': '2025-07-03'}) == [ids[2], ids[1], ids[0]]
+    assert recorrer(orden='usuario', direccion='asc') == [ids[2], ids[3], ids[0], ids[1], ids[4]]
+
+    contactos_pagina, _ = pagina_contactos(limite=1)
+    assert contactos_pagina[0]['usuario_email'] == 'vendedor@test.com'
+
+
+def test_parametros_invalidos(contactos):
+    with pytest.raises(ParametroInvalido):
+        pagina_contactos(orden='telefono')
+    with pytest.raises(ParametroInvalido):
+        pagina_contactos(cursor='no-es-un-cursor')
+    with pytest.raises(ParametroInvalido):
+        pagina_contactos(filtros={'desde': '01/07/2025'})
+    with pytest.raises(ParametroInvalido):
+        pagina_contactos(filtros={'estado': 'perdido'})
+
+
+def test_estadisticas_del_panel_se_actualizan_al_escribir(contactos):
+    from estadisticas import estadisticas_panel
+
+    ids, vendedor, _ = contactos
+    assert estadisticas_panel() == {
+        'total': 5, 'abiertos': 3, 'cerrados': 1, 'hoy': 0,
+        'por_estado': {'abierto': 3, 'cerrado': 1, 'vendido': 1},
+    }
+
+    db.session.add(crear_contacto(vendedor, 'cerrado', datetime.now()))
+    db.session.commit()
+    datos = estadisticas_panel()
+    assert (datos['total'], datos['cerrados'], datos['hoy']) == (6, 2, 1)
+
+
+def test_tabla_de_estadisticas_sigue_los_cambios(contactos):
+    from sqlalchemy import func
+    from models import Contacto, EstadisticaContacto
+    from estadisticas import reconstruir_estadisticas
+    from opciones import id_de
+
+    def grupos():
+        return sorted(tuple(fila) for fila in db.session.query(
+            EstadisticaContacto.mes, EstadisticaContacto.usuario_id, EstadisticaContacto.estado,
+            EstadisticaContacto.origen_id, EstadisticaContacto.cobertura_id, EstadisticaContacto.cobertura_otra,
+            EstadisticaContacto.promocion_id, EstadisticaContacto.privado_desregulado, EstadisticaContacto.cantidad))
+
+    ids, vendedor, otro = contactos
+    db.session.expire_all()
+    primero = db.session.get(Contacto, ids[0])
+    primero.estado = 'vendido'
+    primero.cobertura_actual, primero.cobertura_actual_otra = 'otros', 'Galeno'
+    db.session.delete(db.session.get(Contacto, ids[2]))
+    db.session.commit()
+
+    despues = grupos()
+    assert sum(fila[-1] for fila in despues) == 4
+    propio, wise = id_de('origen', 'propio'), id_de('origen', 'wise')
+    otros, osde = id_de('cobertura', 'otros'), id_de('cobertura', 'osde')
+    assert ('2025-07', vendedor.id, 'vendido', propio, otros, 'Galeno', 0, 'privado', 1) in despues
+    assert ('2025-07', otro.id, 'abierto', wise, osde, '', 0, 'privado', 1) not in despues
+
+    # La reconstrucción desde los contactos da el mismo resultado
+    reconstruir_estadisticas()
+    assert grupos() == despues
+    assert db.session.query(func.sum(EstadisticaContacto.cantidad)).scalar() == Contacto.query.count()
+
+
+def test_opciones_se_leen_de_sus_tablas(contactos):
+    import opciones
+    from models import Contacto
+
+    ids, vendedor, _ = contactos
+    assert opciones.catalogo('origen').choices()[0] == ('propio', 'Propio')
+    with pytest.raises(opciones.OpcionInvalida):
+        opciones.id_de('promocion', 'promocion cualquiera')
+    with pytest.raises(ParametroInvalido):
+        pagina_contactos(filtros={'origen': 'referido'})
+
+    # Una opción nueva se agrega con una fila, sin cambiar código
+    nueva = opciones.agregar_opcion('origen', 'Referido', 'Referido')
+    assert opciones.catalogo('origen').choices()[-1] == ('referido', 'Referido')
+    contacto = db.session.get(Contacto, ids[0])
+    contacto.origen = 'referido'
+    db.session.commit()
+    assert contacto.origen_id == nueva
+    assert recorrer(filtros={'origen': 'referido'}) == [ids[0]]
+    with pytest.raises(opciones.OpcionInvalida):
+        opciones.agregar_opcion('origen', 'referido', 'Otra vez')
+
+
+def test_opciones_agregadas_por_otro_proceso(contactos):
+    import opciones
+    from models import Promocion
+
+    assert 'promocion nueva' not in opciones.catalogo('promocion').por_clave
+    # Otro proceso ("flask agregar-opcion") inserta la fila sin tocar este catálogo
+    db.session.add(Promocion(clave='promocion nueva', etiqueta='Promocion nueva', orden=99))
+    db.session.commit()
+    assert 'promocion nueva' not in opciones.catalogo('promocion').por_clave
+    opciones.actualizar()
+    assert opciones.catalogo('promocion').choices()[-1] == ('promocion nueva', 'Promocion nueva')
+
+
+def test_busqueda_usa_una_sola_consulta_y_el_total_se_guarda(contactos):
+    from sqlalchemy import event
+    from listado_contactos import contar_contactos
+
+    ids, vendedor, otro = contactos
+    admin = Usuario(email='admin@test.com', password='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    # Más vendedores en el resultado no deben sumar consultas
+    for i in range(5):
+        usuario = Usuario(email=f'vendedor{i}@test.com', password='x')
+        db.session.add(usuario)
+        db.session.flush()
+        db.session.add(crear_contacto(usuario, 'abierto', datetime(2025, 7, 10)))
+    db.session.commit()
+    db.session.expire_all()
+    assert admin.is_admin
+    assert contar_contactos({'nombre': 'pérez'}, admin) == 10
+
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resultado, _ = pagina_contactos(filtros={'nombre': 'pérez'}, usuario=admin)
+        pagina, _ = pagina_contactos(limite=50)
+        # El total ya calculado solo cuesta leer la versión de los datos
+        total = contar_contactos({'nombre': 'pérez'}, admin)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+
+    assert len(resultado) == len(pagina) == total == 10
+    assert {c['usuario_email'] for c in resultado} >= {'vendedor@test.com', 'otro@test.com', 'vendedor4@test.com'}
+    assert len(sentencias) == 3
+
+    propios, _ = pagina_contactos(filtros={'nombre': 'pérez'}, usuario=vendedor)
+    assert len(propios) == 3 and {c['usuario_email'] for c in propios} == {None}
+    assert contar_contactos({'nombre': 'pérez'}, vendedor) == 3
+
+    # Una escritura cambia la versión y el total se vuelve a contar
+    db.session.add(crear_contacto(vendedor, 'abierto', datetime(2025, 7, 11)))
+    db.session.commit()
+    assert contar_contactos({'nombre': 'pérez'}, admin) == 11
+    assert contar_contactos({'nombre': 'pérez', 'estado': 'cerrado'}, admin) == 1
+
+
+def test_busqueda_por_prefijo_sin_acentos_y_al_dia(contactos):
+    from models import Contacto
+
+    ids, vendedor, _ = contactos
+
+    def buscar(usuario=None, **filtros):
+        return [c['id'] for c in pagina_contactos(filtros=filtros, usuario=usuario)[0]]
+
+    # Sin acentos ni mayúsculas, por el comienzo de cada palabra y en cualquier orden
+    assert sorted(buscar(nombre='PEREZ ju')) == sorted(ids)
+    assert buscar(nombre='erez') == []
+    assert buscar(nombre='juan@test') == []
+    assert buscar(nombre='-') == []
+    # Páginas acotadas, más nuevos primero
+    assert recorrer(filtros={'nombre': 'perez'}) == [ids[4], ids[2], ids[1], ids[0], ids[3]]
+
+    # Los triggers mantienen el índice al modificar y borrar contactos
+    contacto = db.session.get(Contacto, ids[0])
+    contacto.apellido_nombre = 'María Gómez'
+    contacto.telefono = '+54 9 11 1234-5678'
+    db.session.delete(db.session.get(Contacto, ids[4]))
+    db.session.commit()
+    assert buscar(nombre='gomez maria') == [ids[0]]
+    assert buscar(telefono='5678') == [ids[0]]
+    assert buscar(nombre='perez') == [ids[2], ids[1], ids[3]]
+    assert buscar(vendedor, nombre='gomez') == [ids[0]]
+    assert buscar(vendedor, nombre='perez') == [ids[1]]
+    # El vendedor no puede pedir los contactos de otro
+    assert buscar(vendedor, nombre='perez', usuario_id=str(ids[2])) == [ids[1]]
+
+
+def test_busqueda_por_email_con_claves_normalizadas(contactos):
+    from models import Contacto
+    from busqueda_contactos import normalizar
+
+    ids, vendedor, otro = contactos
+    contacto = db.session.get(Contacto, ids[2])
+    contacto.apellido_nombre = '  Núñez   MARÍA '
+    contacto.correo_electronico = 'María.Núñez@Test.com'
+    db.session.commit()
+
+    # Las claves se calculan al guardar
+    assert (contacto.apellido_nombre_normalizado, contacto.correo_normalizado) == \
+        ('nunez maria', 'maria.nunez@test.com')
+    assert normalizar(' Pérez\tJUAN ') == 'perez juan'
+
+    def buscar(email, usuario=None):
+        return [c['id'] for c in pagina_contactos(filtros={'email': email}, usuario=usuario)[0]]
+
+    assert buscar('MARIA.NÚÑ') == [ids[2]]
+    assert buscar('juan@') == [ids[4], ids[1], ids[0], ids[3]]
+    # Por el comienzo del email, no por cualquier parte
+    assert buscar('test.com') == []
+    assert buscar('juan', vendedor) == [ids[4], ids[1], ids[0]]
+    assert buscar('maria', vendedor) == []
+
+
+def test_mis_contactos_por_paginas(contactos):
+    ids, vendedor, otro = contactos
+    recorridos, cursor = [], None
+    while True:
+        pagina, cursor = pagina_contactos_usuario(vendedor.id, cursor=cursor, limite=2)
+        recorridos.extend(c['id'] for c in pagina)
+        if cursor is None:
+            break
+    assert recorridos == [ids[4], ids[1], ids[0]]
+    assert [c['id'] for c in pagina_contactos_usuario(otro.id)[0]] == [ids[2], ids[3]]
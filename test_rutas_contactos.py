@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de las rutas JSON de contactos y de exportaciones con el cliente de
+la aplicación: cada vendedor solo ve lo suyo y las páginas tienen un tope
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models import db, Usuario, TrabajoExportacion
+from archivo_contactos import archivar_contactos
+from listado_contactos import LIMITE_MAXIMO
+from conftest import crear_contacto
+
+
+@pytest.fixture
+def gestor(monkeypatch):
+    """La aplicación real con una base en memoria, sin las tareas de arranque.
+
+    Las pruebas preparan los datos dentro de un app_context propio: cada
+    solicitud del cliente tiene que abrir el suyo, o Flask-Login reusaría el
+    usuario de la solicitud anterior (g._login_user).
+    """
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    import gestor as modulo
+    aplicacion = modulo.gestor
+    # La base se elige al importar gestor: nunca correr contra instance/contactos.db
+    assert aplicacion.config['SQLALCHEMY_DATABASE_URI'] == 'sqlite://'
+    monkeypatch.setattr(modulo, '_aplicacion_preparada', True)
+    monkeypatch.setitem(aplicacion.config, 'TESTING', True)
+    monkeypatch.setitem(aplicacion.config, 'WTF_CSRF_ENABLED', False)
+    with aplicacion.app_context():
+        db.drop_all()
+        db.create_all()
+    yield aplicacion
+    with aplicacion.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def usuarios(gestor):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    otro = Usuario(email='otro@test.com', password='x')
+    admin = Usuario(email='admin@test.com', password='x', is_admin=True)
+    with gestor.app_context():
+        db.session.add_all([vendedor, otro, admin])
+        db.session.commit()
+        return vendedor.id, otro.id, admin.id
+
+
+def cliente(gestor, usuario_id):
+    """Cliente con la sesión iniciada por el usuario"""
+    cliente = gestor.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(usuario_id)
+        sesion['_fresh'] = True
+    return cliente
+
+
+def cargar(gestor, usuario_id, cantidad, estado='abierto', created_at=datetime(2025, 7, 1)):
+    with gestor.app_context():
+        usuario = db.session.get(Usuario, usuario_id)
+        contactos = [crear_contacto(usuario, estado, created_at) for _ in range(cantidad)]
+        db.session.add_all(contactos)
+        db.session.commit()
+        return [c.id for c in contactos]
+
+
+def ids(respuesta):
+    assert respuesta.status_code == 200
+    return sorted(c['id'] for c in respuesta.get_json()['contactos'])
+
+
+def test_un_vendedor_solo_ve_sus_contactos(gestor, usuarios):
+    vendedor, otro, admin = usuarios
+    propios = cargar(gestor, vendedor, 2)
+    ajenos = cargar(gestor, otro, 2)
+    # Contactos viejos que pasan al archivo
+    archivado_propio = cargar(gestor, vendedor, 1, 'vendido', datetime(2023, 1, 1))
+    archivado_ajeno = cargar(gestor, otro, 1, 'vendido', datetime(2023, 1, 1))
+    with gestor.app_context():
+        assert archivar_contactos(ahora=datetime(2025, 7, 10)) == 2
+
+    de_vendedor = cliente(gestor, vendedor)
+    assert ids(de_vendedor.get('/usuario/contactos')) == propios
+    assert ids(de_vendedor.get('/contactos/buscar')) == propios
+    # Filtrar por otro vendedor o pedir el archivo no amplía lo que ve
+    assert ids(de_vendedor.get(f'/contactos/buscar?usuario_id={otro}')) == propios
+    respuesta = de_vendedor.get('/contactos/buscar?archivo=1')
+    assert ids(respuesta) == propios
+    assert respuesta.get_json()['total'] == len(propios)
+
+    de_admin = cliente(gestor, admin)
+    assert ids(de_admin.get('/contactos/buscar')) == propios + ajenos
+    assert ids(de_admin.get('/contactos/buscar?archivo=1')) == sorted(
+        propios + ajenos + archivado_propio + archivado_ajeno)
+
+    # Sin sesión no se ve nada
+    assert gestor.test_client().get('/contactos/buscar').status_code == 302
+
+
+def test_las_paginas_tienen_un_tope(gestor, usuarios):
+    vendedor, _, admin = usuarios
+    cargar(gestor, vendedor, LIMITE_MAXIMO + 5)
+
+    for usuario, ruta in ((vendedor, '/usuario/contactos'), (admin, '/contactos/buscar')):
+        datos = cliente(gestor, usuario).get(f'{ruta}?limite=100000').get_json()
+        assert len(datos['contactos']) == LIMITE_MAXIMO
+        assert datos['siguiente'] is not None
+        assert len(cliente(gestor, usuario).get(f'{ruta}?limite=0').get_json()['contactos']) == 1
+
+
+def test_exportaciones_de_otro_usuario_no_se_ven(gestor, usuarios, tmp_path):
+    vendedor, otro, _ = usuarios
+    archivo = tmp_path / 'mis_contactos.xlsx'
+    archivo.write_bytes(b'xlsx')
+    with gestor.app_context():
+        trabajo = TrabajoExportacion(usuario_id=vendedor, tipo='usuario', estado='completado',
+                                     archivo=str(archivo), nombre_archivo='mis_contactos.xlsx')
+        db.session.add(trabajo)
+        db.session.commit()
+        estado_url = f'/trabajos_exportacion/{trabajo.id}'
+
+    de_vendedor = cliente(gestor, vendedor)
+    assert de_vendedor.get(estado_url).get_json()['trabajo']['estado'] == 'completado'
+    assert de_vendedor.get(f'{estado_url}/descargar').data == b'xlsx'
+
+    de_otro = cliente(gestor, otro)
+    assert de_otro.get(estado_url).status_code == 404
+    assert de_otro.get(f'{estado_url}/descargar').status_code == 404
+    # Un vendedor no puede pedir la exportación del admin
+    assert de_otro.post('/trabajos_exportacion', data={'tipo': 'admin'}).status_code == 403
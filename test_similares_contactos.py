@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de los contactos parecidos: bloques, puntajes y grupos guardados para
+revisar o descargar
+"""
+
+import io
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from models import db, Usuario, Contacto
+from similares_contactos import (VENTANA_BLOQUE, agrupar_similares, generar_libro_similares, grupos_similares,
+                                 pagina_similares, pares_candidatos, resumen_similares, nombres_ordenados)
+from conftest import crear_contacto
+
+
+def test_los_pares_candidatos_no_crecen_con_el_cuadrado():
+    # 500 "juan perez" distintos: todos en un mismo bloque de nombre
+    contactos = pd.DataFrame({
+        'id': range(1, 501),
+        'nombre': ['juan perez'] * 500,
+        'correo': [f'juan{i}@test{i}.com' for i in range(500)],
+        'telefono': [f'+5411{i:08d}' for i in range(500)],
+    })
+    contactos = contactos.assign(nombre_ordenado=nombres_ordenados(contactos['nombre']))
+    a, b = pares_candidatos(contactos)
+    assert (a < b).all()
+    assert len(set(zip(a.tolist(), b.tolist()))) == len(a) <= 500 * VENTANA_BLOQUE
+    # Mismo nombre pero nada más en común: no son el mismo cliente
+    assert grupos_similares(contactos) == []
+
+
+@pytest.fixture
+def vendedores(app):
+    vendedor = Usuario(email='vendedor@test.com', password='x')
+    otro = Usuario(email='otro@test.com', password='x')
+    db.session.add_all([vendedor, otro])
+    db.session.commit()
+    return vendedor, otro
+
+
+def cargar(usuario, nombre, correo, telefono):
+    contacto = crear_contacto(usuario, 'abierto', datetime(2025, 7, 1), apellido_nombre=nombre,
+                              correo_electronico=correo, telefono=telefono)
+    db.session.add(contacto)
+    db.session.commit()
+    return contacto.id
+
+
+def test_grupos_de_contactos_parecidos(vendedores):
+    vendedor, otro = vendedores
+    a = cargar(vendedor, 'Juan Pérez', 'juan.perez@gmail.com', '+54 9 11 1234-5678')
+    # Nombre al revés y email con un error de tipeo
+    b = cargar(otro, 'Perez Juan', 'juan.perez@gmial.com', '11 1234 5678')
+    # Nombre con un error de tipeo, mismo email y sin teléfono
+    c = cargar(otro, 'Juan Peres', 'Juan.Perez@gmail.com', '0')
+    # Homónimo: otro email y otro teléfono
+    cargar(vendedor, 'Juan Pérez', 'jperez@hotmail.com', '351 412 3456')
+    d = cargar(vendedor, 'Ana María Gómez', 'anagomez@yahoo.com.ar', '0261 15 555-1234')
+    # Mismo teléfono sin característica
+    e = cargar(otro, 'Gomez Ana Maria', 'sin email', '15 555-1234')
+    cargar(otro, 'Carla Díaz', 'carla@test.com', '11 4444 0000')
+
+    assert agrupar_similares() == (2, 5)
+    assert resumen_similares()[0] == 2
+    grupos = pagina_similares(1)
+    assert [[fila.id for fila in grupo] for grupo in grupos] == [[a, b, c], [d, e]]
+    # Puntaje: el mayor parecido de cada uno con otro del grupo
+    assert [fila.puntaje for fila in grupos[0]] == pytest.approx([0.93, 0.93, 0.81], abs=0.01)
+
+    # Un grupo al que le queda un solo contacto no se muestra
+    db.session.delete(db.session.get(Contacto, e))
+    db.session.commit()
+    assert [[fila.id for fila in grupo] for grupo in pagina_similares(1)] == [[a, b, c]]
+
+    destino = io.BytesIO()
+    assert generar_libro_similares(destino) == 4
+    ws = openpyxl.load_workbook(destino).active
+    filas = list(ws.iter_rows(min_row=2, values_only=True))
+    assert [(fila[0], fila[2], fila[3]) for fila in filas] == [
+        (1, a, 'vendedor@test.com'), (1, b, 'otro@test.com'), (1, c, 'otro@test.com'), (2, d, 'vendedor@test.com'),
+    ]
+
+    # Cada cálculo reemplaza al anterior
+    assert agrupar_similares() == (1, 3)
+    assert agrupar_similares(umbral=0.95) == (0, 0)
+    assert resumen_similares() == (0, None)
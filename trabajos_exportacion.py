@@ -0,0 +1,164 @@
+"""
+Exportaciones a Excel en segundo plano.
+
+Cada pedido de exportación se guarda como un TrabajoExportacion en la base de
+datos y lo ejecuta un pool de hilos, de modo que la generación del archivo no
+bloquea al worker que atiende la solicitud. Los trabajos que quedaron
+pendientes al reiniciar el proceso se vuelven a encolar al iniciar la app.
+
+Mientras corre, el trabajo renueva updated_at (su latido) cada
+INTERVALO_LATIDO; solo se vuelve a encolar un trabajo "en_proceso" cuyo
+latido tiene más de TIEMPO_ABANDONO, no uno que simplemente tarda.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+from models import db, Contacto, TrabajoExportacion, get_argentina_time
+from exportacion import generar_libro_admin, generar_libro_usuario
+from cache_exportacion import libro_en_cache, limpiar_archivos_temporales
+
+# Un trabajo "en_proceso" sin latido durante este tiempo se considera abandonado
+TIEMPO_ABANDONO = timedelta(minutes=10)
+# Segundos entre dos latidos de un trabajo en curso
+INTERVALO_LATIDO = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Progreso fila a fila de los trabajos que corren en este proceso.
+# En la base de datos se guarda al cambiar de hoja y con cada latido.
+_progreso = {}
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXPORTACION_WORKERS', 1),
+                thread_name_prefix='exportacion'
+            )
+        return _executor
+
+
+def encolar_trabajo(app, usuario, tipo):
+    """Crea un trabajo de exportación y lo envía al pool de hilos"""
+    trabajo = TrabajoExportacion(usuario_id=usuario.id, tipo=tipo, estado='pendiente')
+    db.session.add(trabajo)
+    db.session.commit()
+    logging.info(f"Trabajo de exportación {trabajo.id} ({tipo}) encolado para {usuario.email}")
+    _get_executor(app).submit(ejecutar_trabajo, app, trabajo.id)
+    return trabajo
+
+
+def _reclamar_trabajo(trabajo_id):
+    """Marca el trabajo como en proceso solo si sigue pendiente (evita ejecuciones duplicadas)"""
+    reclamados = (TrabajoExportacion.query
+                  .filter_by(id=trabajo_id, estado='pendiente')
+                  .update({'estado': 'en_proceso', 'updated_at': get_argentina_time()}))
+    db.session.commit()
+    return reclamados == 1
+
+
+def ejecutar_trabajo(app, trabajo_id):
+    """Genera el archivo de un trabajo; se ejecuta dentro de un hilo del pool"""
+    with app.app_context():
+        try:
+            if not _reclamar_trabajo(trabajo_id):
+                return
+
+            trabajo = db.session.get(TrabajoExportacion, trabajo_id)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            prefijo = "contactos" if trabajo.tipo == 'admin' else "mis_contactos"
+            nombre_archivo = f"{prefijo}_{timestamp}.xlsx"
+            usuario_id = trabajo.usuario_id
+
+            ultimo_latido = time.monotonic()
+
+            def progreso(hoja, filas):
+                nonlocal ultimo_latido
+                anterior = _progreso.get(trabajo_id)
+                _progreso[trabajo_id] = (hoja, filas)
+                if anterior is None or anterior[0] != hoja or time.monotonic() - ultimo_latido >= INTERVALO_LATIDO:
+                    # La lectura que puede estar abierta es de esta misma conexión, así que
+                    # confirmar no espera a que termine la hoja
+                    trabajo.hoja_actual = hoja
+                    trabajo.filas_escritas = filas
+                    trabajo.updated_at = get_argentina_time()
+                    db.session.commit()
+                    ultimo_latido = time.monotonic()
+
+            generadas = []
+
+            def generar(destino):
+                if trabajo.tipo == 'admin':
+                    generadas.append(generar_libro_admin(destino, progreso))
+                else:
+                    generadas.append(generar_libro_usuario(usuario_id, destino, progreso))
+
+            if trabajo.tipo == 'admin':
+                archivo = libro_en_cache('contactos', generar)
+                consulta_total = Contacto.query
+            else:
+                archivo = libro_en_cache(f'mis_contactos_{usuario_id}', generar)
+                consulta_total = Contacto.query.filter_by(usuario_id=usuario_id)
+            # Si el libro ya estaba en caché no se escribió ninguna fila nueva
+            filas = generadas[0] if generadas else consulta_total.count()
+
+            trabajo.estado = 'completado'
+            trabajo.filas_escritas = filas
+            trabajo.archivo = archivo
+            trabajo.nombre_archivo = nombre_archivo
+            trabajo.finished_at = get_argentina_time()
+            trabajo.updated_at = trabajo.finished_at
+            db.session.commit()
+            logging.info(f"Trabajo de exportación {trabajo_id} completado: {filas} filas")
+
+        except Exception as e:
+            logging.error(f"Error en trabajo de exportación {trabajo_id}: {str(e)}")
+            db.session.rollback()
+            trabajo = db.session.get(TrabajoExportacion, trabajo_id)
+            if trabajo:
+                trabajo.estado = 'error'
+                trabajo.error = str(e)
+                trabajo.finished_at = get_argentina_time()
+                db.session.commit()
+        finally:
+            _progreso.pop(trabajo_id, None)
+            db.session.remove()
+
+
+def estado_trabajo(trabajo):
+    """Estado del trabajo para la respuesta JSON, con el progreso en vivo si corre en este proceso"""
+    datos = trabajo.to_dict()
+    en_vivo = _progreso.get(trabajo.id)
+    if en_vivo and trabajo.estado == 'en_proceso':
+        datos['hoja_actual'], datos['filas_escritas'] = en_vivo
+    return datos
+
+
+def reanudar_trabajos(app):
+    """Vuelve a encolar los trabajos pendientes y los que dejaron de dar latido tras un reinicio"""
+    limite = get_argentina_time() - TIEMPO_ABANDONO
+    abandonados = (TrabajoExportacion.query
+                   .filter(TrabajoExportacion.estado == 'en_proceso',
+                           TrabajoExportacion.updated_at < limite)
+                   .update({'estado': 'pendiente'}))
+    db.session.commit()
+    if abandonados:
+        logging.info(f"{abandonados} trabajo(s) de exportación abandonados vuelven a estar pendientes")
+
+    pendientes = [t.id for t in TrabajoExportacion.query.filter_by(estado='pendiente').all()]
+    for trabajo_id in pendientes:
+        _get_executor(app).submit(ejecutar_trabajo, app, trabajo_id)
+    if pendientes:
+        logging.info(f"Reanudando {len(pendientes)} trabajo(s) de exportación")
+
+
+def limpiar_en_segundo_plano(app):
+    """Elimina los archivos temporales viejos desde el pool de exportaciones, fuera de las solicitudes"""
+    _get_executor(app).submit(limpiar_archivos_temporales)
@@ -58,14 +58,7 @@ try:
     application.config['DEBUG'] = False
     application.config['TESTING'] = False
     
-    # Asegurar que la base de datos se cree
-    with application.app_context():
-        try:
-            from models import db
-            db.create_all()
-            print("Base de datos SQLite creada/verificada exitosamente")
-        except Exception as e:
-            print(f"Error al crear base de datos: {e}")
+    # La base nueva la crea gestor.py al importarse; una base existente se actualiza con "flask db upgrade"
     
 except Exception as e:
     print(f"Error cargando la aplicación: {e}")